@@ -0,0 +1 @@
+"""Benchmarks offline de lemonade_conversation (ver README.md)."""
@@ -0,0 +1,113 @@
+"""Microbenchmark de la serialización del cuerpo de /chat/completions.
+
+Compara json.dumps del payload completo (lo que hacía aiohttp con `json=`)
+con json_bytes, el encoder de Home Assistant (orjson) con el que el cliente
+serializa el cuerpo una vez por petición y lo reutiliza en los reintentos.
+
+    python -m benchmarks.bench_payload --history 20 --icl 4 --repeat 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import sys
+import time
+import types
+from pathlib import Path
+
+_PKG_DIR = Path(__file__).resolve().parent.parent / "custom_components" / "lemonade_conversation"
+
+
+def _load_encoding() -> types.ModuleType:
+    # encoding.py no tiene imports relativos: se carga por ruta para no arrastrar
+    # el __init__ de la integración (el benchmark corre incluso sin HA instalado)
+    spec = importlib.util.spec_from_file_location("lemonade_encoding", _PKG_DIR / "encoding.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+encoding = _load_encoding()
+
+
+def _tools_schema() -> list[dict]:
+    """Esquema de tamaño similar al real sin importar tools.py (que requiere HA)."""
+    props = {f"param_{i}": {"type": "string", "description": f"Descripción del parámetro {i} " * 3} for i in range(6)}
+    return [
+        {
+            "type": "function",
+            "function": {
+                "name": f"tool_{n}",
+                "description": "Herramienta de Home Assistant para consultar o actuar sobre entidades. " * 2,
+                "parameters": {"type": "object", "properties": props, "additionalProperties": False},
+            },
+        }
+        for n in range(4)
+    ]
+
+
+def build_payload(history: int, icl: int) -> dict:
+    system = "Eres un asistente útil para Home Assistant. " * 40
+    examples = [(f"¿Está encendida la luz {i}?", f"Sí, la luz {i} está encendida al 80 %.") for i in range(icl)]
+    turns = []
+    for i in range(history):
+        turns.append({"role": "user", "content": f"Pregunta número {i} sobre el estado de la casa"})
+        turns.append({"role": "assistant", "content": f"Respuesta número {i}: todo en orden. " * 4})
+    user = {"role": "user", "content": "¿Qué luces hay encendidas en la cocina?"}
+
+    return {
+        "model": "bench-model",
+        "temperature": 0.3,
+        "top_p": 1.0,
+        "messages": [{"role": "system", "content": system}]
+        + [m for u, a in examples for m in ({"role": "user", "content": u}, {"role": "assistant", "content": a})]
+        + turns
+        + [user],
+        "tools": _tools_schema(),
+        "tool_choice": "auto",
+        "max_tokens": 512,
+    }
+
+
+def _time(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmark de serialización de payloads")
+    parser.add_argument("--history", type=int, default=12, help="Turnos de historial")
+    parser.add_argument("--icl", type=int, default=4, help="Ejemplos ICL")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    payload = build_payload(args.history, args.icl)
+    encoders = {"fallback": encoding.json_bytes}
+    try:
+        import orjson
+
+        # Lo que usa Home Assistant en homeassistant.helpers.json.json_bytes
+        encoders["orjson"] = lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    except ImportError:
+        pass
+
+    for label, encoder in encoders.items():
+        body = encoder(payload)
+        assert json.loads(body) == payload, "Los cuerpos no coinciden"
+        print(f"Encoder {label}; cuerpo de {len(body) / 1024:.1f} KiB")
+        results = (
+            ("json.dumps (anterior)", _time(lambda: json.dumps(payload).encode(), args.repeat)),
+            ("json_bytes", _time(lambda: encoder(payload), args.repeat)),
+        )
+        baseline = results[0][1]
+        for name, secs in results:
+            print(f"  {name:<22} {secs * 1e6:9.1f} µs  {baseline / secs:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Microbenchmark del parser SSE con generaciones largas.
+
+Compara el parser anterior (`async for` línea a línea sobre el StreamReader,
+decode + json.loads por línea y respuesta acumulada con +=) con SSEDecoder
+sobre `iter_any()` (un await por paquete) y una lista de deltas. El stream se
+trocea en paquetes de tamaño aleatorio para reproducir la fragmentación TCP;
+el lector asíncrono se emula para no depender de aiohttp.
+
+    python -m benchmarks.bench_sse --tokens 20000 --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import random
+import time
+from pathlib import Path
+
+# sse.py no tiene imports relativos: se carga por ruta para no arrastrar el
+# __init__ de la integración (y así el benchmark corre incluso sin HA instalado)
+_SSE_PATH = Path(__file__).resolve().parent.parent / "custom_components" / "lemonade_conversation" / "sse.py"
+_spec = importlib.util.spec_from_file_location("lemonade_sse", _SSE_PATH)
+sse = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(sse)
+
+
+def build_stream(tokens: int) -> bytes:
+    parts = []
+    for i in range(tokens):
+        chunk = {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion.chunk",
+            "model": "bench-model",
+            "choices": [{"index": 0, "delta": {"content": f"palabra{i % 97} "}, "finish_reason": None}],
+        }
+        parts.append(f"data: {json.dumps(chunk)}\n\n".encode())
+    parts.append(b"data: [DONE]\n\n")
+    return b"".join(parts)
+
+
+def split_packets(raw: bytes, seed: int = 7, low: int = 64, high: int = 4096) -> list[bytes]:
+    rnd = random.Random(seed)
+    packets, i = [], 0
+    while i < len(raw):
+        n = rnd.randint(low, high)
+        packets.append(raw[i : i + n])
+        i += n
+    return packets
+
+
+async def _iter_lines(packets: list[bytes]):
+    """Como `async for line in resp.content`: un await por línea."""
+    pending = b""
+    for packet in packets:
+        pending += packet
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            await asyncio.sleep(0)
+            yield line + b"\n"
+
+
+async def _iter_any(packets: list[bytes]):
+    """Como `resp.content.iter_any()`: un await por paquete recibido."""
+    for packet in packets:
+        await asyncio.sleep(0)
+        yield packet
+
+
+async def legacy_parse(packets: list[bytes]) -> str:
+    """Réplica del parser anterior."""
+    text = ""
+    async for raw_line in _iter_lines(packets):
+        if not raw_line:
+            continue
+        try:
+            line = raw_line.decode("utf-8").strip()
+        except Exception:  # noqa: BLE001
+            continue
+        if not line.startswith("data:"):
+            continue
+        data_str = line[5:].strip()
+        if not data_str or data_str == "[DONE]":
+            continue
+        try:
+            chunk = json.loads(data_str)
+        except Exception:  # noqa: BLE001
+            continue
+        content = ((chunk.get("choices") or [{}])[0].get("delta") or {}).get("content")
+        if content:
+            text += content
+    return text
+
+
+async def decoder_parse(packets: list[bytes]) -> str:
+    decoder = sse.SSEDecoder()
+    parts: list[str] = []
+    async for packet in _iter_any(packets):
+        for data in decoder.feed(packet):
+            if data == "[DONE]":
+                continue
+            content = ((sse.json_loads(data).get("choices") or [{}])[0].get("delta") or {}).get("content")
+            if content:
+                parts.append(content)
+    return "".join(parts)
+
+
+def _best_of(fn, packets: list[bytes], repeat: int) -> tuple[float, str]:
+    best, result = float("inf"), ""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = asyncio.run(fn(packets))
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmark del parser SSE")
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    raw = build_stream(args.tokens)
+    packets = split_packets(raw)
+    print(f"{args.tokens} eventos, {len(raw) / 1024:.0f} KiB en {len(packets)} paquetes")
+    print(f"JSON: {getattr(sse.json_loads, '__module__', '?')}.{getattr(sse.json_loads, '__name__', '?')}")
+
+    legacy_s, legacy_text = _best_of(legacy_parse, packets, args.repeat)
+    new_s, new_text = _best_of(decoder_parse, packets, args.repeat)
+    assert legacy_text == new_text, "Los parsers no coinciden"
+
+    for name, secs in (("anterior", legacy_s), ("SSEDecoder", new_s)):
+        print(f"{name:<12} {secs * 1000:8.1f} ms  {args.tokens / secs:10.0f} eventos/s")
+    print(f"speedup      {legacy_s / new_s:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
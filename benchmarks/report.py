@@ -0,0 +1,96 @@
+"""Agregación y presentación de los resultados de los benchmarks."""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from typing import Any
+
+STAGES = ("admission", "icl", "prompt_build", "llm", "tool", "response")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Percentil por rango más cercano."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[idx]
+
+
+def _pcts(values: list[float]) -> dict[str, float]:
+    return {f"p{p}": round(percentile(values, p), 2) for p in (50, 95, 99)}
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    turns: int
+    wall_s: float
+    latencies_ms: list[float] = field(default_factory=list)
+    traces: list[dict[str, Any]] = field(default_factory=list)
+    stub_requests: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def throughput(self) -> float:
+        return self.turns / self.wall_s if self.wall_s else 0.0
+
+    def stage_ms(self, stage: str) -> list[float]:
+        """Tiempo total por turno dedicado a una etapa (suma de sus spans)."""
+        return [sum(s["ms"] for s in t["spans"] if s["name"] == stage) for t in self.traces]
+
+    def overhead_ms(self) -> list[float]:
+        """Tiempo del turno fuera de las llamadas al LLM: lo que cuesta la integración."""
+        return [t["total_ms"] - sum(s["ms"] for s in t["spans"] if s["name"] == "llm") for t in self.traces]
+
+    def ttft_ms(self) -> list[float]:
+        return [s["ttft_ms"] for t in self.traces for s in t["spans"] if s["name"] == "llm" and "ttft_ms" in s]
+
+    def outcomes(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for trace in self.traces:
+            counts[trace["outcome"]] = counts.get(trace["outcome"], 0) + 1
+        return counts
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "turns": self.turns,
+            "wall_s": round(self.wall_s, 3),
+            "throughput_turns_s": round(self.throughput, 2),
+            "latency_ms": _pcts(self.latencies_ms),
+            "ttft_ms": _pcts(self.ttft_ms()),
+            "overhead_ms": _pcts(self.overhead_ms()),
+            "stages_ms": {stage: _pcts(self.stage_ms(stage)) for stage in STAGES},
+            "outcomes": self.outcomes(),
+            "stub_requests": dict(self.stub_requests),
+        }
+
+
+def format_table(results: list[ScenarioResult]) -> str:
+    header = (
+        f"{'escenario':<24} {'turnos':>6} {'turn/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} "
+        f"{'ttft50':>8} {'ovh50':>7} {'ovh95':>7} {'build50':>8} {'tool50':>7} {'cola95':>7}"
+    )
+    lines = [header, "-" * len(header)]
+    for res in results:
+        lat = _pcts(res.latencies_ms)
+        ovh = _pcts(res.overhead_ms())
+        lines.append(
+            f"{res.name:<24} {res.turns:>6} {res.throughput:>7.2f} {lat['p50']:>8.1f} {lat['p95']:>8.1f} "
+            f"{lat['p99']:>8.1f} {percentile(res.ttft_ms(), 50):>8.1f} {ovh['p50']:>7.2f} {ovh['p95']:>7.2f} "
+            f"{percentile(res.stage_ms('prompt_build'), 50):>8.2f} {percentile(res.stage_ms('tool'), 50):>7.2f} "
+            f"{percentile(res.stage_ms('admission'), 95):>7.1f}"
+        )
+    lines.append("")
+    lines.append("Tiempos en ms. ovh = tiempo del turno fuera del LLM; cola = espera de admisión.")
+    return "\n".join(lines)
+
+
+def to_json(results: list[ScenarioResult], meta: dict[str, Any]) -> str:
+    return json.dumps(
+        {"meta": meta, "scenarios": [res.summary() for res in results]},
+        ensure_ascii=False,
+        indent=2,
+    )
+
@@ -0,0 +1,77 @@
+"""Ejecuta los escenarios end-to-end contra el stub y muestra el informe.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --scenario fast_path --scenario chat_stream --turns 200
+    python -m benchmarks.run --entities 5000 --areas 80 --json resultados.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import platform
+import sys
+from pathlib import Path
+
+# Permite importar custom_components.lemonade_conversation desde la raíz del repo
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from .report import ScenarioResult, format_table, to_json  # noqa: E402
+from .scenarios import SCENARIOS, async_run_scenario  # noqa: E402
+from .stub_server import StubConfig, StubServer  # noqa: E402
+from .synthetic_hass import async_synthetic_hass  # noqa: E402
+
+
+async def async_main(args: argparse.Namespace) -> int:
+    selected = [s for s in SCENARIOS if not args.scenario or s.name in args.scenario]
+    unknown = set(args.scenario or ()) - {s.name for s in SCENARIOS}
+    if unknown:
+        print(f"Escenarios desconocidos: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    base_cfg = StubConfig(ttft_ms=args.ttft_ms, tokens_per_s=args.tokens_per_s, reply_tokens=args.reply_tokens)
+    results: list[ScenarioResult] = []
+    async with async_synthetic_hass(areas=args.areas, entities=args.entities) as (hass, home):
+        print(f"Registro sintético: {len(home.areas)} áreas, {len(home.entity_ids)} entidades")
+        async with StubServer(StubConfig()) as stub:
+            for scenario in selected:
+                print(f"- {scenario.name}: {scenario.description}")
+                results.append(
+                    await async_run_scenario(
+                        hass, stub, scenario, base_cfg=base_cfg, turns=args.turns, warmup=args.warmup
+                    )
+                )
+
+    print()
+    print(format_table(results))
+    if args.json:
+        meta = {
+            "python": platform.python_version(),
+            "areas": args.areas,
+            "entities": args.entities,
+            "turns": args.turns,
+            "ttft_ms": args.ttft_ms,
+            "tokens_per_s": args.tokens_per_s,
+        }
+        Path(args.json).write_text(to_json(results, meta), encoding="utf-8")
+        print(f"\nResultados guardados en {args.json}")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks end-to-end de lemonade_conversation")
+    parser.add_argument("--scenario", action="append", help="Escenario a ejecutar (repetible; por defecto todos)")
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--areas", type=int, default=40)
+    parser.add_argument("--entities", type=int, default=3000)
+    parser.add_argument("--ttft-ms", type=float, default=150.0)
+    parser.add_argument("--tokens-per-s", type=float, default=40.0)
+    parser.add_argument("--reply-tokens", type=int, default=24)
+    parser.add_argument("--json", help="Guardar el resumen en este fichero JSON")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(async_main(args)))
+
+
+if __name__ == "__main__":
+    main()
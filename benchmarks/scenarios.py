@@ -0,0 +1,185 @@
+"""Escenarios end-to-end: cada uno fija opciones del agente, comportamiento del stub y carga."""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import itertools
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any
+
+from homeassistant.components.conversation import ConversationInput
+from homeassistant.core import Context, HomeAssistant
+
+from custom_components.lemonade_conversation.const import (
+    CONF_ALLOWED_DOMAINS,
+    CONF_CONTROL_MODE,
+    CONF_ENABLE_FAST_PATH,
+    CONF_ENABLE_TOOLS,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_MODEL_SUPPORTS_TOOLS,
+    CONF_QUEUE_MAX_SIZE,
+    CONF_RESPONSE_CACHE_SIZE,
+    CONF_STREAM,
+    CONF_TOOL_FOLLOW_UP_MODE,
+    CONTROL_MODE_LLM,
+    DEFAULT_ALLOWED_DOMAINS,
+    MODEL_TOOLS_ON,
+    TOOL_FOLLOW_UP_DIRECT,
+    TOOL_FOLLOW_UP_LLM,
+)
+from custom_components.lemonade_conversation.conversation import LemonadeConversationAgent
+
+from .report import ScenarioResult
+from .stub_server import StubConfig, StubServer
+from .synthetic_hass import make_config_entry
+
+_BASE_OPTIONS: dict[str, Any] = {
+    CONF_CONTROL_MODE: CONTROL_MODE_LLM,
+    CONF_ENABLE_TOOLS: True,
+    CONF_MODEL_SUPPORTS_TOOLS: MODEL_TOOLS_ON,
+    CONF_ALLOWED_DOMAINS: DEFAULT_ALLOWED_DOMAINS,
+    CONF_STREAM: False,
+    CONF_TOOL_FOLLOW_UP_MODE: TOOL_FOLLOW_UP_DIRECT,
+    CONF_RESPONSE_CACHE_SIZE: 0,
+}
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    prompts: list[str]
+    options: dict[str, Any] = field(default_factory=dict)
+    stub: dict[str, Any] = field(default_factory=dict)
+    concurrency: int = 1
+    # Con device_id el turno cuenta como interactivo (satélite de voz)
+    interactive: bool = True
+
+
+SCENARIOS: tuple[Scenario, ...] = (
+    Scenario(
+        name="chat_plain",
+        description="Charla sin tools ni stream: coste base de un turno",
+        prompts=["Cuéntame un dato curioso sobre el café"],
+        options={CONF_ENABLE_TOOLS: False},
+    ),
+    Scenario(
+        name="chat_stream",
+        description="Charla con stream SSE hacia el ChatLog",
+        prompts=["Cuéntame un dato curioso sobre el café"],
+        options={CONF_ENABLE_TOOLS: False, CONF_STREAM: True},
+    ),
+    Scenario(
+        name="tool_get_state_direct",
+        description="get_state con respuesta directa (una sola llamada al LLM)",
+        prompts=["¿Está encendida la luz de la cocina?"],
+        stub={"tool_call": {"name": "get_state", "arguments": {"entity_id": "light.bench_light_0"}}},
+    ),
+    Scenario(
+        name="tool_list_stream_llm",
+        description="list_entities por área en stream, con segunda llamada al LLM para redactar",
+        prompts=["¿Qué luces hay encendidas en la cocina?"],
+        options={CONF_STREAM: True, CONF_TOOL_FOLLOW_UP_MODE: TOOL_FOLLOW_UP_LLM},
+        stub={"tool_call": {"name": "list_entities", "arguments": {"domain": "light", "area": "Cocina"}}},
+    ),
+    Scenario(
+        name="fast_path",
+        description="Orden simple resuelta localmente sin LLM",
+        prompts=["enciende la luz cocina", "apaga la luz salón"],
+        options={CONF_ENABLE_FAST_PATH: True},
+    ),
+    Scenario(
+        name="response_cache",
+        description="Consulta de solo lectura repetida: la primera va al LLM, el resto a la caché",
+        prompts=["¿Qué luces hay en el salón?"],
+        options={CONF_RESPONSE_CACHE_SIZE: 64, CONF_TOOL_FOLLOW_UP_MODE: TOOL_FOLLOW_UP_LLM},
+        stub={"tool_call": {"name": "list_entities", "arguments": {"domain": "light", "area": "Salón"}}},
+    ),
+    Scenario(
+        name="burst_automations",
+        description="Ráfaga de automatizaciones concurrentes contra el control de admisión",
+        prompts=["Resume el estado de la casa en una frase"],
+        options={CONF_ENABLE_TOOLS: False, CONF_MAX_CONCURRENT_REQUESTS: 2, CONF_QUEUE_MAX_SIZE: 64},
+        concurrency=16,
+        interactive=False,
+    ),
+)
+
+
+def _conversation_input(agent_id: str, text: str, *, interactive: bool) -> ConversationInput:
+    """ConversationInput compatible con varias versiones de HA (los campos han ido cambiando)."""
+    values = {
+        "text": text,
+        "context": Context(),
+        "conversation_id": uuid.uuid4().hex,
+        "device_id": "bench_satellite" if interactive else None,
+        "satellite_id": None,
+        "language": "es",
+        "agent_id": agent_id,
+        "extra_system_prompt": None,
+    }
+    names = {f.name for f in dataclasses.fields(ConversationInput)}
+    return ConversationInput(**{k: v for k, v in values.items() if k in names})
+
+
+async def async_run_scenario(
+    hass: HomeAssistant,
+    stub: StubServer,
+    scenario: Scenario,
+    *,
+    base_cfg: StubConfig,
+    turns: int,
+    warmup: int = 1,
+) -> ScenarioResult:
+    # La app del stub guarda una referencia a su StubConfig: se actualiza en sitio
+    cfg = dataclasses.replace(base_cfg, **scenario.stub, requests={})
+    for f in dataclasses.fields(cfg):
+        setattr(stub.cfg, f.name, getattr(cfg, f.name))
+
+    entry = make_config_entry(hass, stub.base_url, {**_BASE_OPTIONS, **scenario.options})
+    agent = LemonadeConversationAgent(hass, entry)
+    unsubs = [agent.entity_index.async_setup()]
+    if agent.response_cache is not None:
+        unsubs.append(agent.response_cache.async_setup())
+
+    traces: list[dict[str, Any]] = []
+    unsubs.append(agent.metrics.async_add_listener(lambda: traces.append(agent.metrics.last_turn)))
+
+    prompts = itertools.cycle(scenario.prompts)
+    limiter = asyncio.Semaphore(scenario.concurrency)
+    latencies: list[float] = []
+
+    async def _turn(record: bool) -> None:
+        async with limiter:
+            user_input = _conversation_input(entry.entry_id, next(prompts), interactive=scenario.interactive)
+            started = time.perf_counter()
+            await agent.async_process(user_input)
+            if record:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    try:
+        for _ in range(warmup):
+            await _turn(record=False)
+        traces.clear()
+        stub.cfg.requests.clear()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(_turn(record=True) for _ in range(turns)))
+        wall_s = time.perf_counter() - started
+    finally:
+        for unsub in unsubs:
+            unsub()
+        await agent.async_shutdown()
+        await hass.config_entries.async_remove(entry.entry_id)
+
+    return ScenarioResult(
+        name=scenario.name,
+        turns=turns,
+        wall_s=wall_s,
+        latencies_ms=latencies,
+        traces=traces,
+        stub_requests=dict(stub.cfg.requests),
+    )
@@ -0,0 +1,264 @@
+"""Servidor OpenAI-compatible falso que imita a Lemonade para los benchmarks.
+
+Responde /models, /chat/completions (con y sin stream, con tool_calls),
+/responses, /completions y /embeddings con una latencia sintética
+controlada: TTFT fijo más `1 / tokens_per_s` por token generado.
+
+Uso independiente:
+
+    python -m benchmarks.stub_server --port 8765 --ttft-ms 150 --tokens-per-s 40
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiohttp import web
+
+MODEL_ID = "bench-model"
+EMBEDDING_MODEL_ID = "bench-embed"
+
+
+@dataclass
+class StubConfig:
+    """Comportamiento del stub; los escenarios lo cambian entre ejecuciones."""
+
+    ttft_ms: float = 150.0
+    tokens_per_s: float = 40.0
+    reply_tokens: int = 24
+    # Si hay tools y el último mensaje es del usuario, se responde con esta llamada
+    tool_call: dict[str, Any] | None = None
+    # Trocear los argumentos en varios deltas (ejercita el ensamblado de tool_calls)
+    tool_call_fragments: int = 3
+    embedding_dim: int = 256
+    requests: dict[str, int] = field(default_factory=dict)
+
+    def count(self, path: str) -> None:
+        self.requests[path] = self.requests.get(path, 0) + 1
+
+
+def _estimate_tokens(value: Any) -> int:
+    return max(1, len(json.dumps(value, ensure_ascii=False)) // 4)
+
+
+def _reply_words(cfg: StubConfig) -> list[str]:
+    base = "De acuerdo, esta es una respuesta sintética generada por el servidor de pruebas".split()
+    return [base[i % len(base)] + " " for i in range(cfg.reply_tokens)]
+
+
+def _wants_tool_call(cfg: StubConfig, body: dict[str, Any]) -> bool:
+    messages = body.get("messages") or []
+    return bool(cfg.tool_call and body.get("tools") and messages and messages[-1].get("role") == "user")
+
+
+def _usage(body: dict[str, Any], completion_tokens: int) -> dict[str, int]:
+    prompt = _estimate_tokens(body.get("messages") or body.get("input") or body.get("prompt") or "")
+    return {
+        "prompt_tokens": prompt,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt + completion_tokens,
+    }
+
+
+async def _decode_delay(cfg: StubConfig, tokens: int) -> None:
+    if cfg.tokens_per_s > 0:
+        await asyncio.sleep(tokens / cfg.tokens_per_s)
+
+
+def _chunk(delta: dict[str, Any], finish_reason: str | None = None) -> bytes:
+    payload = {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": MODEL_ID,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode()
+
+
+async def handle_models(request: web.Request) -> web.Response:
+    cfg: StubConfig = request.app["cfg"]
+    cfg.count("models")
+    return web.json_response(
+        {
+            "object": "list",
+            "data": [
+                {
+                    "id": MODEL_ID,
+                    "object": "model",
+                    "recipe": "llamacpp",
+                    "labels": ["tool-calling"],
+                    "context_length": 8192,
+                },
+                {"id": EMBEDDING_MODEL_ID, "object": "model", "recipe": "llamacpp", "labels": ["embeddings"]},
+            ],
+        }
+    )
+
+
+async def handle_chat(request: web.Request) -> web.StreamResponse:
+    cfg: StubConfig = request.app["cfg"]
+    cfg.count("chat")
+    body = await request.json()
+    await asyncio.sleep(cfg.ttft_ms / 1000)
+
+    tool_call = cfg.tool_call if _wants_tool_call(cfg, body) else None
+    words = [] if tool_call else _reply_words(cfg)
+    completion_tokens = _estimate_tokens(tool_call) if tool_call else len(words)
+
+    if not body.get("stream"):
+        await _decode_delay(cfg, completion_tokens)
+        message: dict[str, Any] = {"role": "assistant", "content": "".join(words).strip()}
+        if tool_call:
+            message["content"] = None
+            message["tool_calls"] = [
+                {
+                    "id": "call_bench_0",
+                    "type": "function",
+                    "function": {"name": tool_call["name"], "arguments": json.dumps(tool_call["arguments"])},
+                }
+            ]
+        return web.json_response(
+            {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion",
+                "model": MODEL_ID,
+                "choices": [
+                    {"index": 0, "message": message, "finish_reason": "tool_calls" if tool_call else "stop"}
+                ],
+                "usage": _usage(body, completion_tokens),
+            }
+        )
+
+    resp = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    await resp.prepare(request)
+    await resp.write(_chunk({"role": "assistant"}))
+    if tool_call:
+        arguments = json.dumps(tool_call["arguments"])
+        step = max(1, math.ceil(len(arguments) / max(1, cfg.tool_call_fragments)))
+        await resp.write(
+            _chunk(
+                {
+                    "tool_calls": [
+                        {
+                            "index": 0,
+                            "id": "call_bench_0",
+                            "type": "function",
+                            "function": {"name": tool_call["name"], "arguments": ""},
+                        }
+                    ]
+                }
+            )
+        )
+        for start in range(0, len(arguments), step):
+            await _decode_delay(cfg, 1)
+            await resp.write(
+                _chunk({"tool_calls": [{"index": 0, "function": {"arguments": arguments[start : start + step]}}]})
+            )
+        await resp.write(_chunk({}, "tool_calls"))
+    else:
+        for word in words:
+            await resp.write(_chunk({"content": word}))
+            await _decode_delay(cfg, 1)
+        await resp.write(_chunk({}, "stop"))
+    if (body.get("stream_options") or {}).get("include_usage"):
+        usage = {"id": "chatcmpl-bench", "object": "chat.completion.chunk", "choices": [], "usage": _usage(body, completion_tokens)}
+        await resp.write(f"data: {json.dumps(usage)}\n\n".encode())
+    await resp.write(b"data: [DONE]\n\n")
+    await resp.write_eof()
+    return resp
+
+
+async def handle_responses(request: web.Request) -> web.Response:
+    cfg: StubConfig = request.app["cfg"]
+    cfg.count("responses")
+    body = await request.json()
+    words = _reply_words(cfg)
+    await asyncio.sleep(cfg.ttft_ms / 1000)
+    await _decode_delay(cfg, len(words))
+    return web.json_response({"id": "resp-bench", "output_text": "".join(words).strip(), "usage": _usage(body, len(words))})
+
+
+async def handle_completions(request: web.Request) -> web.Response:
+    cfg: StubConfig = request.app["cfg"]
+    cfg.count("completions")
+    body = await request.json()
+    words = _reply_words(cfg)
+    await asyncio.sleep(cfg.ttft_ms / 1000)
+    await _decode_delay(cfg, len(words))
+    return web.json_response(
+        {"id": "cmpl-bench", "choices": [{"index": 0, "text": "".join(words).strip()}], "usage": _usage(body, len(words))}
+    )
+
+
+async def handle_embeddings(request: web.Request) -> web.Response:
+    """Vectores deterministas derivados del hash del texto (misma entrada, mismo vector)."""
+    cfg: StubConfig = request.app["cfg"]
+    cfg.count("embeddings")
+    body = await request.json()
+    inputs = body.get("input") or []
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    data = []
+    for idx, text in enumerate(inputs):
+        seed = hashlib.sha256(str(text).encode()).digest()
+        vector = [((seed[i % len(seed)] ^ (i * 31)) % 255) / 127.0 - 1.0 for i in range(cfg.embedding_dim)]
+        data.append({"object": "embedding", "index": idx, "embedding": vector})
+    return web.json_response({"object": "list", "data": data, "model": body.get("model")})
+
+
+def create_app(cfg: StubConfig | None = None) -> web.Application:
+    app = web.Application()
+    app["cfg"] = cfg or StubConfig()
+    for prefix in ("", "/api/v1"):
+        app.router.add_get(f"{prefix}/models", handle_models)
+        app.router.add_post(f"{prefix}/chat/completions", handle_chat)
+        app.router.add_post(f"{prefix}/responses", handle_responses)
+        app.router.add_post(f"{prefix}/completions", handle_completions)
+        app.router.add_post(f"{prefix}/embeddings", handle_embeddings)
+    return app
+
+
+class StubServer:
+    """Arranca el stub en un puerto libre de localhost dentro del loop actual."""
+
+    def __init__(self, cfg: StubConfig | None = None) -> None:
+        self.cfg = cfg or StubConfig()
+        self._runner: web.AppRunner | None = None
+        self.base_url = ""
+
+    async def __aenter__(self) -> StubServer:
+        self._runner = web.AppRunner(create_app(self.cfg))
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # noqa: SLF001
+        self.base_url = f"http://127.0.0.1:{port}/api/v1"
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft-ms", type=float, default=150.0)
+    parser.add_argument("--tokens-per-s", type=float, default=40.0)
+    parser.add_argument("--reply-tokens", type=int, default=24)
+    args = parser.parse_args()
+    cfg = StubConfig(ttft_ms=args.ttft_ms, tokens_per_s=args.tokens_per_s, reply_tokens=args.reply_tokens)
+    web.run_app(create_app(cfg), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Home Assistant en memoria con un registro sintético de áreas y entidades.
+
+Se apoya en `pytest-homeassistant-custom-component` para arrancar una
+instancia real de HA (registros, bus, estados) sin configuración en disco.
+Los servicios de los dominios controlables se registran como no-op para que
+`call_service` mida solo nuestro coste.
+"""
+
+from __future__ import annotations
+
+import random
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.const import ATTR_FRIENDLY_NAME
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.helpers import area_registry as ar, entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry, async_test_home_assistant
+
+# Nombres realistas para que el fast path y las consultas por área resuelvan
+AREA_NAMES = (
+    "Cocina", "Salón", "Dormitorio", "Baño", "Despacho", "Garaje", "Jardín", "Pasillo",
+    "Terraza", "Comedor", "Entrada", "Lavadero", "Trastero", "Ático", "Sótano", "Buhardilla",
+)
+DOMAINS = {
+    "light": ("Luz", ("on", "off")),
+    "switch": ("Enchufe", ("on", "off")),
+    "fan": ("Ventilador", ("on", "off")),
+    "sensor": ("Temperatura", None),
+    "binary_sensor": ("Movimiento", ("on", "off")),
+    "cover": ("Persiana", ("open", "closed")),
+}
+CONTROLLABLE = ("light", "switch", "fan", "cover")
+
+
+@dataclass
+class SyntheticHome:
+    areas: dict[str, str]  # area_id -> nombre
+    entity_ids: list[str]
+    service_calls: int = 0
+
+
+def _area_names(count: int) -> list[str]:
+    names = list(AREA_NAMES[:count])
+    for idx in range(len(names), count):
+        names.append(f"{AREA_NAMES[idx % len(AREA_NAMES)]} {idx // len(AREA_NAMES) + 1}")
+    return names
+
+
+async def async_populate(hass: HomeAssistant, *, areas: int, entities: int, seed: int = 1234) -> SyntheticHome:
+    """Crea `areas` áreas y `entities` entidades repartidas entre dominios y áreas."""
+    rnd = random.Random(seed)
+    area_reg = ar.async_get(hass)
+    area_map: dict[str, str] = {}
+    for name in _area_names(areas):
+        area = area_reg.async_create(name)
+        area_map[area.id] = name
+    area_ids = list(area_map)
+
+    ent_reg = er.async_get(hass)
+    domains = list(DOMAINS)
+    entity_ids: list[str] = []
+    for idx in range(entities):
+        domain = domains[idx % len(domains)]
+        noun, states = DOMAINS[domain]
+        area_id = area_ids[idx % len(area_ids)]
+        # El primer dispositivo de cada tipo y área lleva el nombre "corto" (p. ej. "Luz Cocina")
+        ordinal = idx // (len(domains) * len(area_ids))
+        friendly = f"{noun} {area_map[area_id]}" + (f" {ordinal + 1}" if ordinal else "")
+        entry = ent_reg.async_get_or_create(
+            domain, "bench", f"{domain}_{idx}", suggested_object_id=f"bench_{domain}_{idx}"
+        )
+        ent_reg.async_update_entity(entry.entity_id, area_id=area_id)
+        state = rnd.choice(states) if states else f"{rnd.uniform(17, 26):.1f}"
+        attrs: dict[str, Any] = {ATTR_FRIENDLY_NAME: friendly}
+        if domain == "sensor":
+            attrs.update({"unit_of_measurement": "°C", "device_class": "temperature"})
+        if domain == "light":
+            attrs.update({"brightness": rnd.randint(0, 255), "color_mode": "brightness"})
+        hass.states.async_set(entry.entity_id, state, attrs)
+        entity_ids.append(entry.entity_id)
+
+    home = SyntheticHome(areas=area_map, entity_ids=entity_ids)
+
+    async def _noop(call: ServiceCall) -> None:
+        home.service_calls += 1
+
+    for domain in CONTROLLABLE:
+        for service in ("turn_on", "turn_off", "toggle", "open_cover", "close_cover"):
+            if not hass.services.has_service(domain, service):
+                hass.services.async_register(domain, service, _noop)
+    await hass.async_block_till_done()
+    return home
+
+
+@asynccontextmanager
+async def async_synthetic_hass(*, areas: int, entities: int) -> AsyncIterator[tuple[HomeAssistant, SyntheticHome]]:
+    async with async_test_home_assistant() as hass:
+        home = await async_populate(hass, areas=areas, entities=entities)
+        try:
+            yield hass, home
+        finally:
+            await hass.async_stop(force=True)
+
+
+def make_config_entry(hass: HomeAssistant, base_url: str, options: dict[str, Any]) -> MockConfigEntry:
+    from custom_components.lemonade_conversation.const import (
+        CONF_BASE_URL,
+        CONF_MODEL,
+        DOMAIN,
+    )
+
+    from .stub_server import MODEL_ID
+
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title="Lemonade bench",
+        data={CONF_BASE_URL: base_url, CONF_MODEL: MODEL_ID},
+        options={CONF_MODEL: MODEL_ID, **options},
+    )
+    entry.add_to_hass(hass)
+    return entry
@@ -1,13 +1,201 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import logging
+import random
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Any, Dict, List
 
-from aiohttp import ClientSession, ClientTimeout
+from aiohttp import ClientConnectionError, ClientError, ClientResponse, ClientResponseError, ClientSession, ClientTimeout
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
-from .const import ENDPOINT_CHAT, ENDPOINT_RESPONSES, ENDPOINT_COMPLETIONS
+from .const import (
+    ENDPOINT_CHAT,
+    ENDPOINT_COMPLETIONS,
+    ENDPOINT_RESPONSES,
+    LOAD_BALANCING_LATENCY,
+    LOAD_BALANCING_LEAST_OUTSTANDING,
+)
+from .encoding import json_bytes
+from .models import ModelCatalog, ModelInfo, async_get_catalog
+from .sse import SSEDecoder, json_loads
+
+
+_LOGGER = logging.getLogger(__name__)
+
+_MODELS_TIMEOUT = 15
+# 429/5xx transitorios: Lemonade devuelve 503 mientras carga un modelo
+_RETRYABLE_STATUS = frozenset((429, 502, 503, 504))
+_MAX_RETRIES = 4
+_RETRY_BASE_DELAY = 0.25
+_RETRY_MAX_DELAY = 4.0
+_HEALTH_CHECK_TIMEOUT = 5
+_PROBE_TIMEOUT = 60  # el primer uso puede incluir la carga del modelo
+_PROBE_TOOL_MAX_TOKENS = 32  # lo justo para que el modelo emita la llamada a ping
+_PROBE_TOOL = {
+    "type": "function",
+    "function": {"name": "ping", "description": "ping", "parameters": {"type": "object", "properties": {}}},
+}
+_LATENCY_ALPHA = 0.2
+
+
+class LemonadeUnavailableError(HomeAssistantError):
+    """El servidor Lemonade no responde (reintentos agotados o circuito abierto)."""
+
+
+class CircuitBreaker:
+    """Circuit breaker simple: tras N fallos de conexión seguidos corta durante reset_timeout.
+
+    Pasado ese tiempo deja pasar una única petición de prueba (half-open); si
+    funciona se cierra, si falla vuelve a abrirse. Una prueba que no llega a
+    resolverse (cancelada, por ejemplo) caduca tras otro reset_timeout para
+    que el circuito nunca quede abierto para siempre.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probe_started: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self._opened_at < self.reset_timeout:
+            return False
+        if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+            return False
+        self._probe_started = now
+        return True
+
+    def release_probe(self) -> None:
+        """Libera la prueba half-open en curso sin resolverla (la siguiente petición vuelve a probar)."""
+        self._probe_started = None
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probe_started is not None or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+        self._probe_started = None
+
+
+def _is_complete_json(text: str) -> bool:
+    text = text.strip()
+    if not text.endswith("}"):
+        return False
+    try:
+        json.loads(text)
+    except ValueError:
+        return False
+    return True
+
+
+class ToolCallAssembler:
+    """Reconstruye tool_calls a partir de los fragmentos `delta.tool_calls` del stream.
+
+    Una llamada se entrega en cuanto sus argumentos forman un JSON completo,
+    cuando empieza la siguiente o al cerrar el stream.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[int, dict[str, Any]] = {}
+        self._emitted: set[int] = set()
+        self._last_index: int | None = None
+
+    def add(self, fragments: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        done: list[dict[str, Any]] = []
+        for frag in fragments:
+            idx = frag.get("index")
+            if not isinstance(idx, int):
+                current = self._calls.get(self._last_index) if self._last_index is not None else None
+                if current is None or (frag.get("id") and frag.get("id") != current.get("id")):
+                    idx = len(self._calls)
+                else:
+                    idx = self._last_index
+            if idx != self._last_index:
+                done.extend(self._complete_pending(exclude=idx))
+                self._last_index = idx
+            if idx in self._emitted:
+                continue
+
+            call = self._calls.setdefault(idx, {"id": None, "type": "function", "function": {"name": "", "arguments": ""}})
+            if frag.get("id"):
+                call["id"] = frag["id"]
+            fn = frag.get("function") or {}
+            if fn.get("name"):
+                call["function"]["name"] = fn["name"]
+            if fn.get("arguments"):
+                call["function"]["arguments"] += fn["arguments"]
+                if call["function"]["name"] and _is_complete_json(call["function"]["arguments"]):
+                    self._emitted.add(idx)
+                    done.append(call)
+        return done
+
+    def flush(self) -> list[dict[str, Any]]:
+        return self._complete_pending()
+
+    def _complete_pending(self, exclude: int | None = None) -> list[dict[str, Any]]:
+        done: list[dict[str, Any]] = []
+        for idx in sorted(self._calls):
+            if idx == exclude or idx in self._emitted:
+                continue
+            call = self._calls[idx]
+            if not call["function"]["name"]:
+                continue
+            if not call["function"]["arguments"]:
+                call["function"]["arguments"] = "{}"
+            self._emitted.add(idx)
+            done.append(call)
+        return done
+
+
+class Backend:
+    """Un servidor Lemonade del pool: salud (circuit breaker), carga y latencia."""
+
+    def __init__(self, base_url: str) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.breaker = CircuitBreaker()
+        self.outstanding = 0
+        # Media móvil exponencial del tiempo hasta recibir cabeceras (s); None = sin medir
+        self.latency: float | None = None
+
+    def observe_latency(self, seconds: float) -> None:
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += _LATENCY_ALPHA * (seconds - self.latency)
+
+    def score(self, strategy: str) -> tuple[float, float]:
+        latency = self.latency or 0.0
+        if strategy == LOAD_BALANCING_LATENCY:
+            # Latencia esperada si se encola detrás de las peticiones en curso
+            return latency * (self.outstanding + 1), self.outstanding
+        return self.outstanding, latency
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "healthy": not self.breaker.is_open,
+            "outstanding": self.outstanding,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+        }
 
 
 class LemonadeClient:
@@ -18,12 +206,20 @@ class LemonadeClient:
         api_key: str | None = None,
         verify_ssl: bool = True,
         timeout: int = 45,
+        extra_base_urls: list[str] | None = None,
+        load_balancing: str = LOAD_BALANCING_LEAST_OUTSTANDING,
     ) -> None:
         self.hass = hass
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key or ""
         self.verify_ssl = verify_ssl
         self.timeout = timeout
+        self.load_balancing = load_balancing
+        self.backends = [Backend(self.base_url)]
+        for url in extra_base_urls or ():
+            if url.rstrip("/") not in (b.base_url for b in self.backends):
+                self.backends.append(Backend(url))
+        self._rr = 0
 
     @property
     def _headers(self) -> dict[str, str]:
@@ -38,37 +234,255 @@ class LemonadeClient:
     def _session(self) -> ClientSession:
         return async_get_clientsession(self.hass, verify_ssl=self.verify_ssl)
 
+    @property
+    def backend_stats(self) -> list[dict[str, Any]]:
+        return [b.stats for b in self.backends]
+
+    def _pick_backend(self, tried: set[Backend]) -> Backend | None:
+        """Backend sano con mejor puntuación, o uno caído cuyo circuito admite una prueba."""
+        # Rotar el punto de partida reparte los empates entre backends ociosos
+        self._rr = (self._rr + 1) % len(self.backends)
+        ordered = self.backends[self._rr:] + self.backends[: self._rr]
+        untried = [b for b in ordered if b not in tried]
+        healthy = [b for b in untried if not b.breaker.is_open]
+        if healthy:
+            return min(healthy, key=lambda b: b.score(self.load_balancing))
+        for backend in untried:
+            if backend.breaker.allow():
+                return backend
+        # Todos los sanos ya se probaron en esta ronda: repetir con el mejor
+        healthy = [b for b in ordered if not b.breaker.is_open]
+        return min(healthy, key=lambda b: b.score(self.load_balancing)) if healthy else None
+
+    async def _async_open(
+        self, method: str, path: str, payload: dict[str, Any] | None, timeout: float
+    ) -> tuple[Backend, ClientResponse]:
+        """Abre una petición con reintentos dentro de un plazo total de `timeout` segundos.
+
+        Reintenta con backoff exponencial con jitter ante errores de conexión y
+        respuestas 429/502/503/504 (p. ej. Lemonade cargando un modelo). Las
+        peticiones no llegan a procesarse en esos casos, por lo que reintentar
+        un POST es seguro. Si hay varios backends, el reintento va primero a
+        otro que no se haya probado, sin esperar. Los fallos de conexión
+        alimentan el circuit breaker de cada backend.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        # Se serializa una vez para todos los reintentos
+        body = json_bytes(payload) if payload is not None else None
+        tried: set[Backend] = set()
+        attempt = 0
+        while True:
+            backend = self._pick_backend(tried)
+            if backend is None:
+                raise LemonadeUnavailableError("Ningún servidor Lemonade disponible; circuito abierto")
+            remaining = deadline - loop.time()
+            started = loop.time()
+            backend.outstanding += 1
+            try:
+                resp = await self._session().request(
+                    method,
+                    f"{backend.base_url}{path}",
+                    headers=self._headers,
+                    data=body,
+                    timeout=ClientTimeout(total=remaining),
+                )
+            except (ClientConnectionError, asyncio.TimeoutError) as err:
+                backend.outstanding -= 1
+                backend.breaker.record_failure()
+                error: Exception = err
+            except BaseException:
+                # Cancelación u otro error ajeno al servidor: no dice nada de su salud
+                backend.outstanding -= 1
+                backend.breaker.release_probe()
+                raise
+            else:
+                if resp.status not in _RETRYABLE_STATUS:
+                    backend.breaker.record_success()
+                    backend.observe_latency(loop.time() - started)
+                    if resp.status >= 400:
+                        backend.outstanding -= 1
+                        resp.release()
+                        resp.raise_for_status()
+                    return backend, resp
+                backend.outstanding -= 1
+                backend.breaker.record_failure()
+                resp.release()
+                error = LemonadeUnavailableError(f"Lemonade respondió {resp.status}")
+
+            tried.add(backend)
+            if len(tried) < len(self.backends) and loop.time() < deadline:
+                _LOGGER.debug("Failover de %s %s: %s falló (%s)", method.upper(), path, backend.base_url, error)
+                continue
+            tried.clear()
+            attempt += 1
+            delay = min(_RETRY_MAX_DELAY, _RETRY_BASE_DELAY * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+            if attempt > _MAX_RETRIES or loop.time() + delay >= deadline:
+                if isinstance(error, LemonadeUnavailableError):
+                    raise error
+                raise LemonadeUnavailableError(f"Lemonade no disponible ({backend.base_url}): {error}") from error
+            _LOGGER.debug("Reintentando %s %s en %.2f s (%s)", method.upper(), path, delay, error)
+            await asyncio.sleep(delay)
+
+    @asynccontextmanager
+    async def _async_request(
+        self, method: str, path: str, payload: dict[str, Any] | None, timeout: float
+    ) -> AsyncIterator[ClientResponse]:
+        backend, resp = await self._async_open(method, path, payload, timeout)
+        try:
+            async with resp:
+                yield resp
+        finally:
+            backend.outstanding -= 1
+
+    async def async_health_check(self) -> None:
+        """Sondea /models en cada backend; abre o cierra su circuito según el resultado."""
+
+        async def _probe(backend: Backend) -> None:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            try:
+                async with self._session().get(
+                    f"{backend.base_url}/models",
+                    headers=self._headers,
+                    timeout=ClientTimeout(total=_HEALTH_CHECK_TIMEOUT),
+                ) as resp:
+                    resp.raise_for_status()
+            except (ClientError, asyncio.TimeoutError) as err:
+                if not backend.breaker.is_open:
+                    _LOGGER.debug("Health check de %s falló: %s", backend.base_url, err)
+                backend.breaker.record_failure()
+            else:
+                backend.breaker.record_success()
+                backend.observe_latency(loop.time() - started)
+
+        await asyncio.gather(*(_probe(b) for b in self.backends))
+
+    async def async_warm_up(
+        self,
+        model: str,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None,
+        timeout: float,
+    ) -> dict[str, float | None]:
+        """Petición de 1 token a cada backend sano: carga `model` y deja el prefijo en su caché.
+
+        Cada servidor carga y cachea por su cuenta, así que no se balancea: se
+        envía a todos. No hay reintentos ni cuenta para el circuit breaker (una
+        carga lenta no es una caída). Devuelve la duración en ms por backend,
+        o None si falló.
+        """
+        payload: dict[str, Any] = {"model": model, "messages": messages, "max_tokens": 1, "temperature": 0}
+        if tools:
+            payload["tools"] = tools
+        body = json_bytes(payload)
+
+        async def _warm(backend: Backend) -> float | None:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            backend.outstanding += 1
+            try:
+                async with self._session().post(
+                    f"{backend.base_url}/chat/completions",
+                    headers=self._headers,
+                    data=body,
+                    timeout=ClientTimeout(total=timeout),
+                ) as resp:
+                    resp.raise_for_status()
+                    await resp.read()
+            except (ClientError, asyncio.TimeoutError) as err:
+                _LOGGER.debug("Warm-up de %s en %s falló: %s", model, backend.base_url, err)
+                return None
+            finally:
+                backend.outstanding -= 1
+            return (loop.time() - started) * 1000
+
+        healthy = [b for b in self.backends if not b.breaker.is_open]
+        results = await asyncio.gather(*(_warm(b) for b in healthy))
+        return {b.base_url: ms for b, ms in zip(healthy, results)}
+
+    @property
+    def catalog(self) -> ModelCatalog:
+        return async_get_catalog(self.hass, self.base_url)
+
+    async def _async_fetch_models(self) -> Any:
+        async with self._async_request("get", "/models", None, _MODELS_TIMEOUT) as resp:
+            return await resp.json()
+
+    async def async_get_models(self, *, force: bool = False) -> list[ModelInfo]:
+        """Modelos del servidor desde el catálogo compartido (una descarga de /models por TTL)."""
+        return await self.catalog.async_get_models(self._async_fetch_models, force=force)
+
     async def async_list_models(self) -> list[str]:
-        url = f"{self.base_url}/models"
-        async with self._session().get(url, headers=self._headers, timeout=ClientTimeout(total=15)) as resp:
-            resp.raise_for_status()
-            data = await resp.json()
-        models: list[str] = []
-        if isinstance(data, dict) and "data" in data and isinstance(data["data"], list):
-            for item in data["data"]:
-                mid = item.get("id")
-                if isinstance(mid, str):
-                    models.append(mid)
-        if not models and isinstance(data, list):
-            models = [str(m) for m in data]
-        return models
-
-    async def async_list_models_detailed(self) -> List[Dict[str, str]]:
+        return [m.id for m in await self.async_get_models()]
+
+    async def async_list_models_detailed(self, *, force: bool = False) -> List[Dict[str, str]]:
         """Devuelve lista de modelos con id y recipe para mostrar en selector."""
-        url = f"{self.base_url}/models"
-        async with self._session().get(url, headers=self._headers, timeout=ClientTimeout(total=15)) as resp:
-            resp.raise_for_status()
+        return [{"id": m.id, "recipe": m.recipe} for m in await self.async_get_models(force=force)]
+
+    async def async_probe_capabilities(self, model: str) -> ModelInfo:
+        """Sondea con peticiones mínimas si `model` hace tool calling y si el servidor hace streaming.
+
+        Los servidores OpenAI-compatibles aceptan `tools` con cualquier modelo,
+        así que un 2xx no prueba nada: solo cuenta como soporte una respuesta
+        que de verdad traiga `tool_calls`. Si el modelo contesta con texto el
+        resultado queda como desconocido.
+        """
+        probe = {
+            "model": model,
+            "messages": [{"role": "user", "content": "ping"}],
+            "max_tokens": 1,
+        }
+        tool_calling: bool | None = None
+        try:
+            async with self._async_request(
+                "post",
+                "/chat/completions",
+                {
+                    **probe,
+                    "messages": [{"role": "user", "content": "Call the ping tool."}],
+                    "max_tokens": _PROBE_TOOL_MAX_TOKENS,
+                    "tools": [_PROBE_TOOL],
+                    "tool_choice": "auto",
+                },
+                _PROBE_TIMEOUT,
+            ) as resp:
+                data = await resp.json()
+            choices = data.get("choices") if isinstance(data, dict) else None
+            message = (choices[0].get("message") or {}) if choices and isinstance(choices[0], dict) else {}
+            if message.get("tool_calls"):
+                tool_calling = True
+        except ValueError:
+            pass
+        except ClientResponseError as err:
+            if 400 <= err.status < 500:
+                tool_calling = False
+
+        streaming: bool | None = None
+        try:
+            async with self._async_request("post", "/chat/completions", {**probe, "stream": True}, _PROBE_TIMEOUT) as resp:
+                streaming = resp.headers.get("Content-Type", "").startswith("text/event-stream")
+                await resp.read()
+        except ClientResponseError as err:
+            if 400 <= err.status < 500:
+                streaming = False
+
+        self.catalog.record_probe(model, tool_calling=tool_calling, streaming=streaming)
+        return self.catalog.get(model) or ModelInfo(id=model)
+
+    async def async_embeddings(
+        self,
+        *,
+        model: str,
+        inputs: list[str],
+        request_timeout: int | None = None,
+    ) -> list[list[float]]:
+        """Embeddings OpenAI-compatibles (/embeddings), en el mismo orden que inputs."""
+        payload = {"model": model, "input": inputs}
+        async with self._async_request("post", "/embeddings", payload, request_timeout or self.timeout) as resp:
             data = await resp.json()
-        models: List[Dict[str, str]] = []
-        if isinstance(data, dict) and "data" in data and isinstance(data["data"], list):
-            for item in data["data"]:
-                mid = item.get("id")
-                recipe = item.get("recipe", "unknown")
-                if isinstance(mid, str):
-                    models.append({"id": mid, "recipe": recipe})
-        if not models and isinstance(data, list):
-            models = [{"id": str(m), "recipe": "unknown"} for m in data]
-        return models
+        items = sorted(data.get("data") or [], key=lambda item: item.get("index", 0))
+        return [item.get("embedding") or [] for item in items]
 
     async def async_chat(
         self,
@@ -84,10 +498,9 @@ class LemonadeClient:
         stream: bool = False,
         request_timeout: int | None = None,
     ) -> dict[str, Any]:
-        timeout = ClientTimeout(total=request_timeout or self.timeout)
+        timeout = request_timeout or self.timeout
 
         if endpoint == ENDPOINT_RESPONSES:
-            url = f"{self.base_url}/responses"
             payload: dict[str, Any] = {
                 "model": model,
                 "input": messages,
@@ -101,24 +514,98 @@ class LemonadeClient:
             if max_tokens is not None:
                 payload["max_output_tokens"] = max_tokens
 
-            async with self._session().post(url, headers=self._headers, json=payload, timeout=timeout) as resp:
-                resp.raise_for_status()
+            async with self._async_request("post", "/responses", payload, timeout) as resp:
                 return await resp.json()
 
         if endpoint == ENDPOINT_COMPLETIONS:
-            url = f"{self.base_url}/completions"
             prompt = "\n".join(f"{m.get('role','user').upper()}: {m.get('content','')}" for m in messages)
             payload = {"model": model, "prompt": prompt, "temperature": temperature, "top_p": top_p}
             if max_tokens is not None:
                 payload["max_tokens"] = max_tokens
 
-            async with self._session().post(url, headers=self._headers, json=payload, timeout=timeout) as resp:
-                resp.raise_for_status()
+            async with self._async_request("post", "/completions", payload, timeout) as resp:
                 data = await resp.json()
                 text = data.get("choices", [{}])[0].get("text", "")
                 return {"choices": [{"message": {"content": text}}]}
 
-        url = f"{self.base_url}/chat/completions"
+        payload = self._build_chat_payload(
+            model=model,
+            messages=messages,
+            tools=tools,
+            tool_choice=tool_choice,
+            temperature=temperature,
+            top_p=top_p,
+            max_tokens=max_tokens,
+            stream=stream,
+        )
+
+        if not stream:
+            async with self._async_request("post", "/chat/completions", payload, timeout) as resp:
+                return await resp.json()
+
+        parts: list[str] = []
+        tool_calls: list[dict[str, Any]] = []
+        usage: dict[str, Any] | None = None
+        async for event in self._async_iter_stream(payload, timeout):
+            if "content" in event:
+                parts.append(event["content"])
+            elif "tool_call" in event:
+                tool_calls.append(event["tool_call"])
+            elif "usage" in event:
+                usage = event["usage"]
+
+        message: dict[str, Any] = {"content": "".join(parts)}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        result: dict[str, Any] = {"choices": [{"message": message}]}
+        if usage:
+            result["usage"] = usage
+        return result
+
+    async def async_chat_stream(
+        self,
+        *,
+        model: str,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        tool_choice: str | dict[str, Any] | None = None,
+        temperature: float = 0.3,
+        top_p: float = 1.0,
+        max_tokens: int | None = None,
+        request_timeout: int | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Itera la respuesta de /chat/completions a medida que llega.
+
+        Emite eventos normalizados: {"content": "..."} por cada fragmento de texto
+        y {"tool_call": {...}} por cada tool call ya completa. Si el servidor
+        informa del consumo, un último {"usage": {...}}.
+        """
+        payload = self._build_chat_payload(
+            model=model,
+            messages=messages,
+            tools=tools,
+            tool_choice=tool_choice,
+            temperature=temperature,
+            top_p=top_p,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+
+        async for event in self._async_iter_stream(payload, request_timeout or self.timeout):
+            yield event
+
+    @staticmethod
+    def _build_chat_payload(
+        *,
+        model: str,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None,
+        tool_choice: str | dict[str, Any] | None,
+        temperature: float,
+        top_p: float,
+        max_tokens: int | None,
+        stream: bool,
+    ) -> dict[str, Any]:
         payload: dict[str, Any] = {
             "model": model,
             "temperature": temperature,
@@ -133,35 +620,50 @@ class LemonadeClient:
             payload["max_tokens"] = max_tokens
         if stream:
             payload["stream"] = True
+            # Pide el chunk final con `usage` (tokens de entrada/salida) para las métricas
+            payload["stream_options"] = {"include_usage": True}
+        return payload
 
-        if not stream:
-            async with self._session().post(url, headers=self._headers, json=payload, timeout=timeout) as resp:
-                resp.raise_for_status()
-                return await resp.json()
+    async def _async_iter_stream(self, payload: dict[str, Any], timeout: float) -> AsyncIterator[dict[str, Any]]:
+        assembler = ToolCallAssembler()
+        decoder = SSEDecoder()
+        # Solo se reintenta hasta recibir la respuesta; una vez empezado el stream no
+        async with self._async_request("post", "/chat/completions", payload, timeout) as resp:
+            async for raw in resp.content.iter_any():
+                for event in self._stream_events(decoder.feed(raw), assembler):
+                    yield event
+            for event in self._stream_events(decoder.flush(), assembler):
+                yield event
+
+        for call in assembler.flush():
+            yield {"tool_call": call}
 
-        assistant_text = ""
-        async with self._session().post(url, headers=self._headers, json=payload, timeout=timeout) as resp:
-            resp.raise_for_status()
-            async for raw_line in resp.content:
-                if not raw_line:
-                    continue
-                try:
-                    line = raw_line.decode("utf-8").strip()
-                except Exception:
-                    continue
-                if not line.startswith("data:"):
-                    continue
-                data_str = line[5:].strip()
-                if not data_str or data_str == "[DONE]":
-                    continue
-                try:
-                    chunk = json.loads(data_str)
-                except Exception:
-                    continue
-                choices = chunk.get("choices") or []
-                if not choices:
-                    continue
-                delta = choices[0].get("delta") or {}
-                assistant_text += delta.get("content") or ""
-
-        return {"choices": [{"message": {"content": assistant_text}}]}
+    @staticmethod
+    def _stream_events(datas: list[str], assembler: ToolCallAssembler) -> list[dict[str, Any]]:
+        """Convierte el `data` de los eventos SSE en eventos normalizados."""
+        events: list[dict[str, Any]] = []
+        for data in datas:
+            if not data or data == "[DONE]":
+                continue
+            try:
+                chunk = json_loads(data)
+            except ValueError:
+                _LOGGER.debug("Evento SSE con JSON inválido: %.200s", data)
+                continue
+            if not isinstance(chunk, dict):
+                continue
+            if chunk.get("usage"):
+                events.append({"usage": chunk["usage"]})
+            choices = chunk.get("choices") or []
+            if not choices:
+                continue
+            delta = choices[0].get("delta") or {}
+            content = delta.get("content")
+            if content:
+                events.append({"content": content})
+            fragments = delta.get("tool_calls")
+            if fragments:
+                events.extend({"tool_call": call} for call in assembler.add(fragments))
+            if choices[0].get("finish_reason"):
+                events.extend({"tool_call": call} for call in assembler.flush())
+        return events
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+
+from .entity_index import EntityIndex
+from .fastpath import normalize
+
+# Tools de solo lectura cuyas respuestas pueden cachearse
+READ_ONLY_TOOLS = frozenset(("list_areas", "list_entities", "get_state"))
+
+
+def entities_read(tool_name: str, result: dict[str, Any]) -> set[str]:
+    """Entity ids cuyo estado influyó en el resultado (ya parseado) de una tool de lectura."""
+    if tool_name == "get_state":
+        entity_id = result.get("entity_id")
+        return {entity_id} if isinstance(entity_id, str) else set()
+    if tool_name != "list_entities":
+        return set()
+    columns = result.get("columns") or []
+    if "entity_id" not in columns:
+        return set()
+    col = columns.index("entity_id")
+    return {row[col] for row in result.get("rows") or [] if len(row) > col}
+
+
+@dataclass
+class _CachedReply:
+    text: str
+    entity_ids: frozenset[str]
+    generation: int
+
+
+class ResponseCache:
+    """Caché LRU de respuestas a consultas de solo lectura.
+
+    La clave es el texto normalizado, el idioma y el área desde la que se
+    pregunta (el prompt la incluye, así que la respuesta puede depender de
+    ella). Cada entrada recuerda qué entidades leyeron sus tools y se invalida
+    en cuanto cualquiera de ellas cambia de estado, o si cambian los registros
+    (generation del EntityIndex).
+    """
+
+    def __init__(self, hass: HomeAssistant, entity_index: EntityIndex, *, max_entries: int) -> None:
+        self.hass = hass
+        self.entity_index = entity_index
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str, str], _CachedReply] = OrderedDict()
+        self._by_entity: dict[str, set[tuple[str, str, str]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @callback
+    def async_setup(self) -> CALLBACK_TYPE:
+        return self.hass.bus.async_listen(EVENT_STATE_CHANGED, self._handle_state_changed)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+    def get(self, text: str, language: str, area: str | None = None) -> str | None:
+        key = (normalize(text), language, area or "")
+        entry = self._entries.get(key)
+        if entry is None or entry.generation != self.entity_index.generation:
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.text
+
+    def put(self, text: str, language: str, area: str | None, reply: str, entity_ids: set[str]) -> None:
+        key = (normalize(text), language, area or "")
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = _CachedReply(reply, frozenset(entity_ids), self.entity_index.generation)
+        for entity_id in entity_ids:
+            self._by_entity.setdefault(entity_id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: tuple[str, str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for entity_id in entry.entity_ids:
+            keys = self._by_entity.get(entity_id)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._by_entity[entity_id]
+
+    @callback
+    def _handle_state_changed(self, event: Event) -> None:
+        keys = self._by_entity.get(event.data.get("entity_id"))
+        if not keys:
+            return
+        for key in list(keys):
+            self._drop(key)
+            self.invalidations += 1
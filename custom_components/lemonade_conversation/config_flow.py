@@ -16,6 +16,7 @@ from homeassistant.helpers.selector import (
     SelectSelector,
     SelectSelectorConfig,
     SelectSelectorMode,
+    TimeSelector,
 )
 from homeassistant.helpers import config_validation as cv
 
@@ -26,6 +27,11 @@ from .const import (
     CONF_API_KEY,
     CONF_MODEL,
     CONF_VERIFY_SSL,
+    CONF_EXTRA_BASE_URLS,
+    CONF_LOAD_BALANCING,
+    LOAD_BALANCING_LEAST_OUTSTANDING,
+    LOAD_BALANCING_LATENCY,
+    DEFAULT_LOAD_BALANCING,
     CONF_ENDPOINT,
     ENDPOINT_CHAT,
     ENDPOINT_RESPONSES,
@@ -41,11 +47,20 @@ from .const import (
     CONF_TIMEOUT,
     CONF_STREAM,
     CONF_REFRESH_SYSTEM_EVERY_TURN,
+    CONF_HISTORY_MAX_CONVERSATIONS,
+    CONF_HISTORY_MAX_KB,
+    CONF_HISTORY_TTL,
+    CONF_PROMPT_TOKEN_BUDGET,
+    CONF_PROMPT_LAYOUT,
+    PROMPT_LAYOUT_CLASSIC,
+    PROMPT_LAYOUT_STABLE,
     # Tools
     CONF_ENABLE_TOOLS,
     CONF_ALLOWED_DOMAINS,
     CONF_TOOL_ITER_LIMIT,
     CONF_TOOL_FOLLOW_UP_MODE,
+    CONF_TOOL_CONCURRENCY,
+    CONF_TOOL_TIMEOUT,
     TOOL_FOLLOW_UP_LLM,
     TOOL_FOLLOW_UP_DIRECT,
     # Control mode
@@ -54,16 +69,34 @@ from .const import (
     CONTROL_MODE_ASSIST,
     CONTROL_MODE_LLM,
     DEFAULT_CONTROL_MODE,
+    CONF_ENABLE_FAST_PATH,
+    DEFAULT_ENABLE_FAST_PATH,
+    CONF_RESPONSE_CACHE_SIZE,
+    DEFAULT_RESPONSE_CACHE_SIZE,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_QUEUE_MAX_SIZE,
+    CONF_QUEUE_TIMEOUT,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_QUEUE_MAX_SIZE,
+    DEFAULT_QUEUE_TIMEOUT,
     # Estado manual tools
     CONF_MODEL_SUPPORTS_TOOLS,
+    MODEL_TOOLS_AUTO,
+    MODEL_TOOLS_ON,
+    MODEL_TOOLS_OFF,
+    DEFAULT_MODEL_SUPPORTS_TOOLS,
     # ICL
     CONF_ENABLE_ICL,
     CONF_ICL_MAX_EXAMPLES,
     CONF_ICL_AUTO_CAPTURE,
     CONF_ICL_CLEAR,
+    CONF_ICL_SAVE_DELAY,
+    CONF_ICL_EMBEDDING_MODEL,
+    DATA_AGENT,
     DEFAULT_ENABLE_ICL,
     DEFAULT_ICL_MAX_EXAMPLES,
     DEFAULT_ICL_AUTO_CAPTURE,
+    DEFAULT_ICL_SAVE_DELAY,
     # Defaults
     DEFAULT_AGENT_NAME,
     DEFAULT_SYSTEM_PROMPT,
@@ -77,9 +110,27 @@ from .const import (
     DEFAULT_ALLOWED_DOMAINS,
     DEFAULT_TOOL_ITER_LIMIT,
     DEFAULT_TOOL_FOLLOW_UP_MODE,
+    DEFAULT_TOOL_CONCURRENCY,
+    DEFAULT_TOOL_TIMEOUT,
     DEFAULT_REFRESH_SYSTEM_EVERY_TURN,
+    DEFAULT_HISTORY_MAX_CONVERSATIONS,
+    DEFAULT_HISTORY_MAX_KB,
+    DEFAULT_HISTORY_TTL,
+    DEFAULT_PROMPT_TOKEN_BUDGET,
+    DEFAULT_PROMPT_LAYOUT,
+    CONF_SUMMARIZE_HISTORY,
+    DEFAULT_SUMMARIZE_HISTORY,
+    CONF_WARMUP,
+    CONF_KEEPALIVE_INTERVAL,
+    CONF_ACTIVE_HOURS_START,
+    CONF_ACTIVE_HOURS_END,
+    DEFAULT_WARMUP,
+    DEFAULT_KEEPALIVE_INTERVAL,
+    DEFAULT_ACTIVE_HOURS_START,
+    DEFAULT_ACTIVE_HOURS_END,
 )
 from .api import LemonadeClient
+from .models import tools_option
 from .icl import ICLStore
 
 ENDPOINT_OPTIONS = [ENDPOINT_CHAT, ENDPOINT_RESPONSES, ENDPOINT_COMPLETIONS]
@@ -107,7 +158,8 @@ class LemonadeConfigFlow(ConfigFlow, domain=DOMAIN):
 
             client = LemonadeClient(self.hass, base_url, api_key, verify_ssl)
             try:
-                md = await client.async_list_models_detailed()
+                # Forzar la descarga: aquí se validan también la URL y la API key
+                md = await client.async_list_models_detailed(force=True)
                 if not md:
                     errors["base"] = "no_models"
                 else:
@@ -159,7 +211,7 @@ class LemonadeConfigFlow(ConfigFlow, domain=DOMAIN):
                 CONF_ENDPOINT: self._endpoint,
                 CONF_CONTROL_MODE: DEFAULT_CONTROL_MODE,
                 CONF_ENABLE_TOOLS: DEFAULT_ENABLE_TOOLS,
-                CONF_MODEL_SUPPORTS_TOOLS: False,
+                CONF_MODEL_SUPPORTS_TOOLS: DEFAULT_MODEL_SUPPORTS_TOOLS,
                 CONF_TOOL_FOLLOW_UP_MODE: DEFAULT_TOOL_FOLLOW_UP_MODE,
                 CONF_ALLOWED_DOMAINS: DEFAULT_ALLOWED_DOMAINS,
                 CONF_TOOL_ITER_LIMIT: DEFAULT_TOOL_ITER_LIMIT,
@@ -237,7 +289,10 @@ class LemonadeOptionsFlowHandler(OptionsFlow):
                     SelectSelectorConfig(options=[CONTROL_MODE_NONE, CONTROL_MODE_ASSIST, CONTROL_MODE_LLM], mode=SelectSelectorMode.DROPDOWN)
                 ),
                 vol.Optional(CONF_ENABLE_TOOLS, default=opts.get(CONF_ENABLE_TOOLS, True)): BooleanSelector(),
-                vol.Optional(CONF_MODEL_SUPPORTS_TOOLS, default=opts.get(CONF_MODEL_SUPPORTS_TOOLS, False)): BooleanSelector(),
+                vol.Optional(CONF_ENABLE_FAST_PATH, default=opts.get(CONF_ENABLE_FAST_PATH, DEFAULT_ENABLE_FAST_PATH)): BooleanSelector(),
+                vol.Optional(CONF_MODEL_SUPPORTS_TOOLS, default=tools_option(opts.get(CONF_MODEL_SUPPORTS_TOOLS, DEFAULT_MODEL_SUPPORTS_TOOLS))): SelectSelector(
+                    SelectSelectorConfig(options=[MODEL_TOOLS_AUTO, MODEL_TOOLS_ON, MODEL_TOOLS_OFF], mode=SelectSelectorMode.DROPDOWN)
+                ),
                 vol.Optional(CONF_TOOL_FOLLOW_UP_MODE, default=opts.get(CONF_TOOL_FOLLOW_UP_MODE, DEFAULT_TOOL_FOLLOW_UP_MODE)): SelectSelector(
                     SelectSelectorConfig(options=[TOOL_FOLLOW_UP_LLM, TOOL_FOLLOW_UP_DIRECT], mode=SelectSelectorMode.DROPDOWN)
                 ),
@@ -247,6 +302,12 @@ class LemonadeOptionsFlowHandler(OptionsFlow):
                 vol.Optional(CONF_TOOL_ITER_LIMIT, default=opts.get(CONF_TOOL_ITER_LIMIT, DEFAULT_TOOL_ITER_LIMIT)): NumberSelector(
                     NumberSelectorConfig(min=1, max=5, step=1, mode="slider")
                 ),
+                vol.Optional(CONF_TOOL_CONCURRENCY, default=opts.get(CONF_TOOL_CONCURRENCY, DEFAULT_TOOL_CONCURRENCY)): NumberSelector(
+                    NumberSelectorConfig(min=1, max=16, step=1, mode="slider")
+                ),
+                vol.Optional(CONF_TOOL_TIMEOUT, default=opts.get(CONF_TOOL_TIMEOUT, DEFAULT_TOOL_TIMEOUT)): NumberSelector(
+                    NumberSelectorConfig(min=1, max=60, step=1, mode="box")
+                ),
             }
         )
         if user_input is not None:
@@ -264,6 +325,10 @@ class LemonadeOptionsFlowHandler(OptionsFlow):
                     NumberSelectorConfig(min=0, max=20, step=1, mode="slider")
                 ),
                 vol.Optional(CONF_ICL_AUTO_CAPTURE, default=opts.get(CONF_ICL_AUTO_CAPTURE, False)): BooleanSelector(),
+                vol.Optional(CONF_ICL_SAVE_DELAY, default=opts.get(CONF_ICL_SAVE_DELAY, DEFAULT_ICL_SAVE_DELAY)): NumberSelector(
+                    NumberSelectorConfig(min=0, max=600, step=5, mode="box")
+                ),
+                vol.Optional(CONF_ICL_EMBEDDING_MODEL, default=opts.get(CONF_ICL_EMBEDDING_MODEL, "")): TextSelector(TextSelectorConfig(type="text")),
                 vol.Optional(CONF_ICL_CLEAR, default=False): BooleanSelector(),
             }
         )
@@ -271,7 +336,9 @@ class LemonadeOptionsFlowHandler(OptionsFlow):
             new_opts = {**opts, **user_input}
             if user_input.get(CONF_ICL_CLEAR):
                 try:
-                    store = ICLStore(self.hass, self._entry.entry_id)
+                    # Usar el store del agente vivo para que un guardado diferido pendiente no reescriba lo borrado
+                    agent = self.hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get(DATA_AGENT)
+                    store = agent.icl_store if agent is not None else ICLStore(self.hass, self._entry.entry_id)
                     await store.async_clear()
                 except Exception:
                     pass
@@ -287,6 +354,12 @@ class LemonadeOptionsFlowHandler(OptionsFlow):
                     TextSelectorConfig(type="text", multiline=True)
                 ),
                 vol.Optional(CONF_REFRESH_SYSTEM_EVERY_TURN, default=opts.get(CONF_REFRESH_SYSTEM_EVERY_TURN, DEFAULT_REFRESH_SYSTEM_EVERY_TURN)): BooleanSelector(),
+                vol.Optional(CONF_PROMPT_LAYOUT, default=opts.get(CONF_PROMPT_LAYOUT, DEFAULT_PROMPT_LAYOUT)): SelectSelector(
+                    SelectSelectorConfig(options=[PROMPT_LAYOUT_CLASSIC, PROMPT_LAYOUT_STABLE], mode=SelectSelectorMode.DROPDOWN)
+                ),
+                vol.Optional(CONF_PROMPT_TOKEN_BUDGET, default=opts.get(CONF_PROMPT_TOKEN_BUDGET, DEFAULT_PROMPT_TOKEN_BUDGET)): NumberSelector(
+                    NumberSelectorConfig(min=0, max=131072, step=256, mode="box")
+                ),
             }
         )
         if user_input is not None:
@@ -314,6 +387,38 @@ class LemonadeOptionsFlowHandler(OptionsFlow):
                     NumberSelectorConfig(min=5, max=120, step=5, mode="box")
                 ),
                 vol.Optional(CONF_STREAM, default=opts.get(CONF_STREAM, DEFAULT_STREAM)): BooleanSelector(),
+                vol.Optional(CONF_RESPONSE_CACHE_SIZE, default=opts.get(CONF_RESPONSE_CACHE_SIZE, DEFAULT_RESPONSE_CACHE_SIZE)): NumberSelector(
+                    NumberSelectorConfig(min=0, max=1024, step=1, mode="box")
+                ),
+                vol.Optional(CONF_HISTORY_MAX_CONVERSATIONS, default=opts.get(CONF_HISTORY_MAX_CONVERSATIONS, DEFAULT_HISTORY_MAX_CONVERSATIONS)): NumberSelector(
+                    NumberSelectorConfig(min=1, max=1000, step=1, mode="box")
+                ),
+                vol.Optional(CONF_HISTORY_MAX_KB, default=opts.get(CONF_HISTORY_MAX_KB, DEFAULT_HISTORY_MAX_KB)): NumberSelector(
+                    NumberSelectorConfig(min=64, max=65536, step=64, mode="box")
+                ),
+                vol.Optional(CONF_HISTORY_TTL, default=opts.get(CONF_HISTORY_TTL, DEFAULT_HISTORY_TTL)): NumberSelector(
+                    NumberSelectorConfig(min=0, max=1440, step=5, mode="box")
+                ),
+                vol.Optional(CONF_SUMMARIZE_HISTORY, default=opts.get(CONF_SUMMARIZE_HISTORY, DEFAULT_SUMMARIZE_HISTORY)): BooleanSelector(),
+                vol.Optional(CONF_MAX_CONCURRENT_REQUESTS, default=opts.get(CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS)): NumberSelector(
+                    NumberSelectorConfig(min=1, max=32, step=1, mode="box")
+                ),
+                vol.Optional(CONF_QUEUE_MAX_SIZE, default=opts.get(CONF_QUEUE_MAX_SIZE, DEFAULT_QUEUE_MAX_SIZE)): NumberSelector(
+                    NumberSelectorConfig(min=0, max=256, step=1, mode="box")
+                ),
+                vol.Optional(CONF_QUEUE_TIMEOUT, default=opts.get(CONF_QUEUE_TIMEOUT, DEFAULT_QUEUE_TIMEOUT)): NumberSelector(
+                    NumberSelectorConfig(min=1, max=300, step=1, mode="box")
+                ),
+                vol.Optional(CONF_EXTRA_BASE_URLS, default=opts.get(CONF_EXTRA_BASE_URLS, "")): TextSelector(TextSelectorConfig(type="text")),
+                vol.Optional(CONF_LOAD_BALANCING, default=opts.get(CONF_LOAD_BALANCING, DEFAULT_LOAD_BALANCING)): SelectSelector(
+                    SelectSelectorConfig(options=[LOAD_BALANCING_LEAST_OUTSTANDING, LOAD_BALANCING_LATENCY], mode=SelectSelectorMode.DROPDOWN)
+                ),
+                vol.Optional(CONF_WARMUP, default=opts.get(CONF_WARMUP, DEFAULT_WARMUP)): BooleanSelector(),
+                vol.Optional(CONF_KEEPALIVE_INTERVAL, default=opts.get(CONF_KEEPALIVE_INTERVAL, DEFAULT_KEEPALIVE_INTERVAL)): NumberSelector(
+                    NumberSelectorConfig(min=0, max=120, step=1, mode="box")
+                ),
+                vol.Optional(CONF_ACTIVE_HOURS_START, default=opts.get(CONF_ACTIVE_HOURS_START, DEFAULT_ACTIVE_HOURS_START)): TimeSelector(),
+                vol.Optional(CONF_ACTIVE_HOURS_END, default=opts.get(CONF_ACTIVE_HOURS_END, DEFAULT_ACTIVE_HOURS_END)): TimeSelector(),
             }
         )
         if user_input is not None:
@@ -1,10 +1,23 @@
 DOMAIN = "lemonade_conversation"
 
+# Claves de hass.data[DOMAIN][entry_id]
+DATA_AGENT = "agent"
+
+# Clave de hass.data con los catálogos de modelos, compartidos por URL base
+DATA_MODEL_CATALOGS = f"{DOMAIN}_model_catalogs"
+
 # Conexión
 CONF_BASE_URL = "base_url"
 CONF_API_KEY = "api_key"
 CONF_VERIFY_SSL = "verify_ssl"
 
+# Pool de servidores adicionales (URLs separadas por comas) y reparto de carga
+CONF_EXTRA_BASE_URLS = "extra_base_urls"
+CONF_LOAD_BALANCING = "load_balancing"
+LOAD_BALANCING_LEAST_OUTSTANDING = "least_outstanding"
+LOAD_BALANCING_LATENCY = "latency"
+DEFAULT_LOAD_BALANCING = LOAD_BALANCING_LEAST_OUTSTANDING
+
 # Endpoints OpenAI-compatibles
 CONF_ENDPOINT = "endpoint"
 ENDPOINT_CHAT = "chat_completions"
@@ -26,6 +39,19 @@ CONF_TIMEOUT = "timeout"
 CONF_STREAM = "stream"
 CONF_REFRESH_SYSTEM_EVERY_TURN = "refresh_system_every_turn"
 
+# Disposición del prompt: clásica (hora en el system) o prefijo estable (cacheable)
+CONF_PROMPT_LAYOUT = "prompt_layout"
+PROMPT_LAYOUT_CLASSIC = "classic"
+PROMPT_LAYOUT_STABLE = "stable_prefix"
+
+# Presupuesto de tokens del prompt (0 = sin límite)
+CONF_PROMPT_TOKEN_BUDGET = "prompt_token_budget"
+
+# Historial en memoria (LRU + TTL)
+CONF_HISTORY_MAX_CONVERSATIONS = "history_max_conversations"
+CONF_HISTORY_MAX_KB = "history_max_kb"
+CONF_HISTORY_TTL = "history_ttl"  # minutos
+
 # Tools / seguridad
 CONF_ENABLE_TOOLS = "enable_tools"
 CONF_ALLOWED_DOMAINS = "allowed_domains"
@@ -33,6 +59,8 @@ CONF_TOOL_ITER_LIMIT = "tool_iteration_limit"
 CONF_TOOL_FOLLOW_UP_MODE = "tool_follow_up_mode"
 TOOL_FOLLOW_UP_LLM = "llm"
 TOOL_FOLLOW_UP_DIRECT = "direct"
+CONF_TOOL_CONCURRENCY = "tool_concurrency"
+CONF_TOOL_TIMEOUT = "tool_timeout"  # segundos por tool call
 
 # Control mode (inspirado en home-llm)
 CONF_CONTROL_MODE = "control_mode"
@@ -41,14 +69,51 @@ CONTROL_MODE_ASSIST = "assist"      # deja control al pipeline local si aplica
 CONTROL_MODE_LLM = "llm_tools"      # tools desde el LLM
 DEFAULT_CONTROL_MODE = CONTROL_MODE_LLM
 
-# Estado manual del soporte de tools por modelo
+# Atajo local para órdenes simples (sin LLM)
+CONF_ENABLE_FAST_PATH = "enable_fast_path"
+DEFAULT_ENABLE_FAST_PATH = False
+
+# Control de admisión delante del LLM
+CONF_MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
+CONF_QUEUE_MAX_SIZE = "queue_max_size"
+CONF_QUEUE_TIMEOUT = "queue_timeout"  # segundos de espera máxima en cola
+DEFAULT_MAX_CONCURRENT_REQUESTS = 2
+DEFAULT_QUEUE_MAX_SIZE = 8
+DEFAULT_QUEUE_TIMEOUT = 30
+
+# Resumen en segundo plano de los turnos que salen del historial
+CONF_SUMMARIZE_HISTORY = "summarize_history"
+DEFAULT_SUMMARIZE_HISTORY = False
+
+# Precarga y keep-alive del modelo
+CONF_WARMUP = "warmup"
+CONF_KEEPALIVE_INTERVAL = "keepalive_interval"  # minutos; 0 = solo al arrancar
+CONF_ACTIVE_HOURS_START = "active_hours_start"
+CONF_ACTIVE_HOURS_END = "active_hours_end"  # igual al inicio = todo el día
+DEFAULT_WARMUP = False
+DEFAULT_KEEPALIVE_INTERVAL = 10
+DEFAULT_ACTIVE_HOURS_START = "07:00:00"
+DEFAULT_ACTIVE_HOURS_END = "23:00:00"
+
+# Caché de respuestas a consultas de solo lectura (0 = desactivada)
+CONF_RESPONSE_CACHE_SIZE = "response_cache_size"
+DEFAULT_RESPONSE_CACHE_SIZE = 0
+
+# Soporte de tools del modelo: auto (etiquetas de /models o sondeo) o fijado a mano.
+# Las entries antiguas guardan un booleano: True = on, False = off.
 CONF_MODEL_SUPPORTS_TOOLS = "model_supports_tools"
+MODEL_TOOLS_AUTO = "auto"
+MODEL_TOOLS_ON = "on"
+MODEL_TOOLS_OFF = "off"
+DEFAULT_MODEL_SUPPORTS_TOOLS = MODEL_TOOLS_AUTO
 
 # ICL (few-shot dinámico)
 CONF_ENABLE_ICL = "enable_icl"
 CONF_ICL_MAX_EXAMPLES = "icl_max_examples"
 CONF_ICL_AUTO_CAPTURE = "icl_auto_capture"
 CONF_ICL_CLEAR = "icl_clear"  # acción: borrar ejemplos almacenados
+CONF_ICL_SAVE_DELAY = "icl_save_delay"  # segundos; 0 = guardar en cada ejemplo
+CONF_ICL_EMBEDDING_MODEL = "icl_embedding_model"  # vacío = sin búsqueda semántica
 
 # Defaults
 DEFAULT_AGENT_NAME = "Lemonade Assistant"
@@ -67,6 +132,11 @@ DEFAULT_MAX_HISTORY = 6
 DEFAULT_TIMEOUT = 45
 DEFAULT_STREAM = False
 DEFAULT_REFRESH_SYSTEM_EVERY_TURN = True
+DEFAULT_PROMPT_LAYOUT = PROMPT_LAYOUT_CLASSIC
+DEFAULT_PROMPT_TOKEN_BUDGET = 0
+DEFAULT_HISTORY_MAX_CONVERSATIONS = 100
+DEFAULT_HISTORY_MAX_KB = 1024
+DEFAULT_HISTORY_TTL = 60
 
 # Dominios permitidos por defecto
 DEFAULT_ALLOWED_DOMAINS = [
@@ -87,6 +157,8 @@ DEFAULT_ALLOWED_DOMAINS = [
 DEFAULT_ENABLE_TOOLS = True
 DEFAULT_TOOL_ITER_LIMIT = 1
 DEFAULT_TOOL_FOLLOW_UP_MODE = TOOL_FOLLOW_UP_DIRECT
+DEFAULT_TOOL_CONCURRENCY = 4
+DEFAULT_TOOL_TIMEOUT = 10
 
 # Control mode
 DEFAULT_CONTROL_MODE = CONTROL_MODE_LLM
@@ -95,3 +167,4 @@ DEFAULT_CONTROL_MODE = CONTROL_MODE_LLM
 DEFAULT_ENABLE_ICL = False
 DEFAULT_ICL_MAX_EXAMPLES = 4
 DEFAULT_ICL_AUTO_CAPTURE = False
+DEFAULT_ICL_SAVE_DELAY = 30
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import timedelta
 from typing import Any
 
 from homeassistant.components.conversation import (
@@ -15,13 +19,26 @@ from homeassistant.components.conversation import (
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import intent
+from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.util import dt as dt_util
 
+try:
+    from homeassistant.components.conversation import ChatLog, async_get_chat_log
+    from homeassistant.helpers import chat_session
+except ImportError:  # Home Assistant sin ChatLog: el streaming solo se acumula
+    ChatLog = Any
+    async_get_chat_log = None
+    chat_session = None
+
 from .const import (
+    DOMAIN,
+    DATA_AGENT,
     CONF_API_KEY,
     CONF_BASE_URL,
     CONF_MODEL,
     CONF_VERIFY_SSL,
+    CONF_EXTRA_BASE_URLS,
+    CONF_LOAD_BALANCING,
     CONF_AGENT_NAME,
     CONF_SYSTEM_PROMPT,
     CONF_TEMPERATURE,
@@ -35,29 +52,153 @@ from .const import (
     CONF_STREAM,
     CONF_ENDPOINT,
     CONF_MODEL_SUPPORTS_TOOLS,
+    DEFAULT_MODEL_SUPPORTS_TOOLS,
+    MODEL_TOOLS_AUTO,
+    MODEL_TOOLS_ON,
     CONF_TOOL_FOLLOW_UP_MODE,
+    CONF_TOOL_CONCURRENCY,
+    CONF_TOOL_TIMEOUT,
     TOOL_FOLLOW_UP_LLM,
     TOOL_FOLLOW_UP_DIRECT,
     CONF_CONTROL_MODE,
     CONTROL_MODE_NONE,
     CONTROL_MODE_ASSIST,
     CONTROL_MODE_LLM,
+    CONF_ENABLE_FAST_PATH,
+    DEFAULT_ENABLE_FAST_PATH,
+    CONF_RESPONSE_CACHE_SIZE,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_QUEUE_MAX_SIZE,
+    CONF_QUEUE_TIMEOUT,
     CONF_ENABLE_ICL,
     CONF_ICL_MAX_EXAMPLES,
     CONF_ICL_AUTO_CAPTURE,
+    CONF_ICL_SAVE_DELAY,
+    CONF_ICL_EMBEDDING_MODEL,
     CONF_REFRESH_SYSTEM_EVERY_TURN,
+    CONF_HISTORY_MAX_CONVERSATIONS,
+    CONF_HISTORY_MAX_KB,
+    CONF_HISTORY_TTL,
+    CONF_PROMPT_TOKEN_BUDGET,
+    CONF_PROMPT_LAYOUT,
+    PROMPT_LAYOUT_STABLE,
     DEFAULT_SYSTEM_PROMPT,
     DEFAULT_ENDPOINT,
+    ENDPOINT_RESPONSES,
+    DEFAULT_HISTORY_MAX_CONVERSATIONS,
+    DEFAULT_HISTORY_MAX_KB,
+    DEFAULT_HISTORY_TTL,
+    DEFAULT_PROMPT_TOKEN_BUDGET,
+    DEFAULT_PROMPT_LAYOUT,
+    DEFAULT_TOOL_CONCURRENCY,
+    DEFAULT_TOOL_TIMEOUT,
+    DEFAULT_ICL_SAVE_DELAY,
+    DEFAULT_RESPONSE_CACHE_SIZE,
+    DEFAULT_LOAD_BALANCING,
+    DEFAULT_MAX_TOKENS,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_QUEUE_MAX_SIZE,
+    DEFAULT_QUEUE_TIMEOUT,
+    CONF_SUMMARIZE_HISTORY,
+    CONF_WARMUP,
+    CONF_KEEPALIVE_INTERVAL,
+    CONF_ACTIVE_HOURS_START,
+    CONF_ACTIVE_HOURS_END,
+    DEFAULT_KEEPALIVE_INTERVAL,
+    DEFAULT_ACTIVE_HOURS_START,
+    DEFAULT_ACTIVE_HOURS_END,
+)
+from .api import LemonadeClient, LemonadeUnavailableError
+from .history import ConversationStore
+from .cache import READ_ONLY_TOOLS, ResponseCache, entities_read
+from .entity_index import EntityIndex
+from .fastpath import FastPathMatch, FastPathMatcher
+from .icl import ICLCaptureQueue, ICLStore, ICLVectorIndex
+from .metrics import MetricsRecorder, TurnTrace
+from .models import tools_option
+from .prompt import assemble_prompt, system_message, truncate_text
+from .scheduler import (
+    PRIORITY_AUTOMATION,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_MAINTENANCE,
+    RequestScheduler,
+    SchedulerBusyError,
 )
-from .api import LemonadeClient
-from .icl import ICLStore
-from .tools import build_tools_schema, exec_tool_call
+from .summary import SUMMARY_INSTRUCTIONS, HistorySummarizer, summary_request
+from .tools import ToolResult, build_tools_schema, exec_tool_call
+from .warmup import ModelWarmer, parse_time
 
 _LOGGER = logging.getLogger(__name__)
 
+_HEALTH_CHECK_INTERVAL = timedelta(seconds=30)
+# Tope del resumen acumulado: mantiene acotado lo que ocupa en cada prompt
+_SUMMARY_MAX_TOKENS = 200
+_SUMMARY_MAX_INPUT_TOKENS = 2048
+_SUMMARY_LABEL = "Resumen de la conversación anterior"
+
+_AREA_TARGET_NOUNS = {
+    "light": "las luces",
+    "switch": "los interruptores",
+    "fan": "los ventiladores",
+    "cover": "las persianas",
+    "media_player": "los reproductores",
+}
+
+_PROMPT_RULES = (
+    "Hablas español de forma natural.\n"
+    "- Para consultas por área, NO pidas permiso. Consulta y responde: usa list_entities con domain='light' y area (nombre o id) y reporta el resultado.\n"
+    "- Si el área no existe o hay ambigüedad, pide aclaración.\n"
+    "- Solo pide confirmación antes de ejecutar acciones (call_service), no antes de consultar estado.\n"
+    "- Para actuar sobre un área completa, usa call_service con area_id (o area_name, que convertimos a area_id).\n"
+    "Evita acciones peligrosas salvo petición explícita y confirma cuando sea necesario.\n"
+)
+
+
+def _record_usage(span: dict[str, Any], usage: Any) -> None:
+    if isinstance(usage, dict):
+        for key in ("prompt_tokens", "completion_tokens"):
+            if isinstance(usage.get(key), int):
+                span[key] = usage[key]
+
+
+def async_get_agent_for_entry(hass: HomeAssistant, entry: ConfigEntry) -> LemonadeConversationAgent:
+    """Un único agente por entry: historial, ICL y cliente sobreviven entre llamadas."""
+    entry_data = hass.data.setdefault(DOMAIN, {}).setdefault(entry.entry_id, {})
+    agent = entry_data.get(DATA_AGENT)
+    if agent is None:
+        agent = LemonadeConversationAgent(hass, entry)
+        entry_data[DATA_AGENT] = agent
+    return agent
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities) -> None:
-    agent = LemonadeConversationAgent(hass, entry)
+    agent = async_get_agent_for_entry(hass, entry)
+    if agent.enable_icl:
+        # Precargar el Store de ICL fuera del camino de la primera petición
+        entry.async_create_background_task(
+            hass, agent.icl_store.async_ensure_loaded(), f"{DOMAIN}_icl_preload_{entry.entry_id}"
+        )
+    entry.async_create_background_task(hass, agent.async_probe_model(), f"{DOMAIN}_probe_{entry.entry_id}")
+    if agent.icl_auto_capture:
+        entry.async_create_background_task(
+            hass, agent.icl_capture.async_run(), f"{DOMAIN}_icl_capture_{entry.entry_id}"
+        )
+    if agent.summarizer is not None:
+        entry.async_create_background_task(
+            hass, agent.summarizer.async_run(), f"{DOMAIN}_summarizer_{entry.entry_id}"
+        )
+    entry.async_on_unload(agent.entity_index.async_setup())
+    if len(agent.client.backends) > 1:
+        # Pool de servidores: sondeo periódico para sacar y reincorporar backends
+        async def _async_health_check(_now=None) -> None:
+            await agent.client.async_health_check()
+
+        entry.async_create_background_task(hass, _async_health_check(), f"{DOMAIN}_health_{entry.entry_id}")
+        entry.async_on_unload(async_track_time_interval(hass, _async_health_check, _HEALTH_CHECK_INTERVAL))
+    if agent.response_cache is not None:
+        entry.async_on_unload(agent.response_cache.async_setup())
+    if agent.warmer is not None and (unsub := agent.warmer.async_setup(entry)) is not None:
+        entry.async_on_unload(unsub)
     async_set_agent(hass, entry, agent)
     _LOGGER.debug("LemonadeConversation: agente registrado para entry %s", entry.entry_id)
     entry.async_on_unload(lambda: async_unset_agent(hass, entry))
@@ -70,7 +211,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
 
 async def async_get_agent(hass: HomeAssistant, entry: ConfigEntry) -> AbstractConversationAgent:
     _LOGGER.debug("LemonadeConversation: async_get_agent solicitado para entry %s", entry.entry_id)
-    return LemonadeConversationAgent(hass, entry)
+    return async_get_agent_for_entry(hass, entry)
 
 
 class LemonadeConversationAgent(AbstractConversationAgent):
@@ -96,20 +237,26 @@ class LemonadeConversationAgent(AbstractConversationAgent):
         self.timeout: int = int(options.get(CONF_TIMEOUT, 45))
         self.stream: bool = bool(options.get(CONF_STREAM, False))
         self.refresh_system_every_turn: bool = bool(options.get(CONF_REFRESH_SYSTEM_EVERY_TURN, True))
+        self.prompt_layout: str = options.get(CONF_PROMPT_LAYOUT, DEFAULT_PROMPT_LAYOUT)
+        self.prompt_token_budget: int = int(options.get(CONF_PROMPT_TOKEN_BUDGET, DEFAULT_PROMPT_TOKEN_BUDGET))
 
         # Control & tools
         self.control_mode: str = options.get(CONF_CONTROL_MODE, CONTROL_MODE_LLM)
         self.enable_tools: bool = bool(options.get(CONF_ENABLE_TOOLS, True))
-        self.model_supports_tools: bool = bool(options.get(CONF_MODEL_SUPPORTS_TOOLS, False))
+        self.model_supports_tools: str = tools_option(options.get(CONF_MODEL_SUPPORTS_TOOLS, DEFAULT_MODEL_SUPPORTS_TOOLS))
         self.allowed_domains: list[str] = list(options.get(CONF_ALLOWED_DOMAINS) or [])
         self.tool_iter_limit: int = int(options.get(CONF_TOOL_ITER_LIMIT, 1))
         self.tool_follow_up_mode: str = options.get(CONF_TOOL_FOLLOW_UP_MODE, TOOL_FOLLOW_UP_DIRECT)
+        self.tool_timeout: float = float(options.get(CONF_TOOL_TIMEOUT, DEFAULT_TOOL_TIMEOUT))
+        # Esquema estático: se construye una vez por agente (se recrea al cambiar opciones)
+        self._tools_schema = build_tools_schema()
+        self._tool_semaphore = asyncio.Semaphore(int(options.get(CONF_TOOL_CONCURRENCY, DEFAULT_TOOL_CONCURRENCY)))
 
         # ICL
         self.enable_icl: bool = bool(options.get(CONF_ENABLE_ICL, False))
         self.icl_max_examples: int = int(options.get(CONF_ICL_MAX_EXAMPLES, 4))
         self.icl_auto_capture: bool = bool(options.get(CONF_ICL_AUTO_CAPTURE, False))
-        self._icl_store = ICLStore(hass, entry.entry_id)
+        self.icl_embedding_model: str = (options.get(CONF_ICL_EMBEDDING_MODEL) or "").strip()
 
         self._client = LemonadeClient(
             hass=self.hass,
@@ -117,16 +264,83 @@ class LemonadeConversationAgent(AbstractConversationAgent):
             api_key=self.api_key,
             verify_ssl=self.verify_ssl,
             timeout=self.timeout,
+            extra_base_urls=[u.strip() for u in (options.get(CONF_EXTRA_BASE_URLS) or "").split(",") if u.strip()],
+            load_balancing=options.get(CONF_LOAD_BALANCING, DEFAULT_LOAD_BALANCING),
         )
 
-        self._history: dict[str, list[dict[str, Any]]] = {}
-        self._conv_initialized: set[str] = set()
+        vector_index = None
+        if self.icl_embedding_model:
+            vector_index = ICLVectorIndex(hass, entry.entry_id, self._client, self.icl_embedding_model)
+        self._icl_store = ICLStore(
+            hass,
+            entry.entry_id,
+            save_delay=float(options.get(CONF_ICL_SAVE_DELAY, DEFAULT_ICL_SAVE_DELAY)),
+            vector_index=vector_index,
+        )
+        self.icl_capture = ICLCaptureQueue(self._icl_store)
+
+        self.entity_index = EntityIndex(hass)
+        # Atajo local para órdenes simples (opcional)
+        self._fast_path: FastPathMatcher | None = None
+        if options.get(CONF_ENABLE_FAST_PATH, DEFAULT_ENABLE_FAST_PATH):
+            self._fast_path = FastPathMatcher(hass, self.entity_index, self.allowed_domains)
+        cache_size = int(options.get(CONF_RESPONSE_CACHE_SIZE, DEFAULT_RESPONSE_CACHE_SIZE))
+        self.response_cache: ResponseCache | None = None
+        if cache_size > 0:
+            self.response_cache = ResponseCache(hass, self.entity_index, max_entries=cache_size)
+        self.metrics = MetricsRecorder()
+        self.scheduler = RequestScheduler(
+            max_concurrency=int(options.get(CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS)),
+            max_queue=int(options.get(CONF_QUEUE_MAX_SIZE, DEFAULT_QUEUE_MAX_SIZE)),
+            max_wait=float(options.get(CONF_QUEUE_TIMEOUT, DEFAULT_QUEUE_TIMEOUT)),
+        )
+        # Precarga/keep-alive: solo /chat/completions admite la petición de 1 token con tools
+        self.warmer: ModelWarmer | None = None
+        if options.get(CONF_WARMUP, False) and self.endpoint == DEFAULT_ENDPOINT:
+            keepalive = int(options.get(CONF_KEEPALIVE_INTERVAL, DEFAULT_KEEPALIVE_INTERVAL))
+            self.warmer = ModelWarmer(
+                hass,
+                self._client,
+                self.scheduler,
+                model=self.model,
+                build_prefix=self._warmup_prefix,
+                interval=timedelta(minutes=keepalive) if keepalive > 0 else None,
+                active_start=parse_time(options.get(CONF_ACTIVE_HOURS_START), DEFAULT_ACTIVE_HOURS_START),
+                active_end=parse_time(options.get(CONF_ACTIVE_HOURS_END), DEFAULT_ACTIVE_HOURS_END),
+            )
+
+        self._history = ConversationStore(
+            max_messages=2 * self.max_history,
+            max_conversations=int(options.get(CONF_HISTORY_MAX_CONVERSATIONS, DEFAULT_HISTORY_MAX_CONVERSATIONS)),
+            max_bytes=int(options.get(CONF_HISTORY_MAX_KB, DEFAULT_HISTORY_MAX_KB)) * 1024,
+            ttl=float(options.get(CONF_HISTORY_TTL, DEFAULT_HISTORY_TTL)) * 60,
+        )
+        # Resumen acumulado de los turnos descartados (fuera del camino de respuesta)
+        self.summarizer: HistorySummarizer | None = None
+        if options.get(CONF_SUMMARIZE_HISTORY, False) and self.endpoint != ENDPOINT_RESPONSES:
+            self.summarizer = HistorySummarizer(self._history, self._async_summarize)
 
         _LOGGER.debug(
             "Agent init: model=%s endpoint=%s control=%s enable_tools=%s model_supports_tools=%s stream=%s",
             self.model, self.endpoint, self.control_mode, self.enable_tools, self.model_supports_tools, self.stream
         )
 
+    @property
+    def icl_store(self) -> ICLStore:
+        return self._icl_store
+
+    @property
+    def client(self) -> LemonadeClient:
+        return self._client
+
+    @property
+    def history_stats(self) -> dict[str, Any]:
+        return self._history.stats
+
+    async def async_shutdown(self) -> None:
+        """Libera recursos del agente al descargar la entry."""
+        await self._icl_store.async_flush()
+
     @property
     def name(self) -> str:
         return self._display_name
@@ -135,13 +349,59 @@ class LemonadeConversationAgent(AbstractConversationAgent):
     def supported_languages(self) -> list[str]:
         return ["es", "en"]
 
+    @property
+    def supports_streaming(self) -> bool:
+        return self.stream
+
     @property
     def attribution(self) -> dict[str, Any] | None:
         return {"name": self._display_name, "brand": "Lemonade", "url": self.base_url}
 
+    @staticmethod
+    def _request_priority(user_input: ConversationInput) -> int:
+        """Voz (satélite) o usuario identificado = interactivo; el resto son automatizaciones."""
+        context = getattr(user_input, "context", None)
+        if getattr(user_input, "device_id", None) or getattr(context, "user_id", None):
+            return PRIORITY_INTERACTIVE
+        return PRIORITY_AUTOMATION
+
+    def _prompt_budget(self) -> int:
+        """Presupuesto configurado, recortado a la ventana de contexto del modelo si se conoce."""
+        info = self._client.catalog.get(self.model)
+        if info is None or not info.context_length:
+            return self.prompt_token_budget
+        available = max(256, info.context_length - int(self.max_tokens or DEFAULT_MAX_TOKENS))
+        return min(self.prompt_token_budget, available) if self.prompt_token_budget > 0 else available
+
+    async def async_probe_model(self) -> None:
+        """Carga el catálogo y sondea las capacidades del modelo si aún no se conocen."""
+        try:
+            await self._client.async_get_models()
+            info = self._client.catalog.get(self.model)
+            if self.model and self.endpoint == DEFAULT_ENDPOINT and (info is None or not info.probed):
+                async with self.scheduler.slot(PRIORITY_MAINTENANCE):
+                    info = await self._client.async_probe_capabilities(self.model)
+                _LOGGER.debug(
+                    "Capacidades de %s: tools=%s stream=%s ctx=%s",
+                    self.model, info.tool_calling, info.streaming, info.context_length,
+                )
+        except Exception as err:  # noqa: BLE001
+            _LOGGER.debug("No se pudieron sondear las capacidades de %s: %s", self.model, err)
+
+    def _warmup_prefix(self) -> tuple[list[dict[str, Any]], list[dict[str, Any]] | None]:
+        """Mismo prefijo (system prompt + tools) con el que empezará un turno real."""
+        messages = [system_message(self._compose_system_prompt(None)), {"role": "user", "content": "ping"}]
+        return messages, self._tools_schema if self._compute_tools_enabled() else None
+
     def _compute_tools_enabled(self) -> bool:
         enabled = not (self.control_mode in (CONTROL_MODE_NONE, CONTROL_MODE_ASSIST))
-        enabled = enabled and self.enable_tools and self.model_supports_tools
+        # La opción manual manda; en auto vale lo que anuncie /models o se haya sondeado
+        if self.model_supports_tools == MODEL_TOOLS_AUTO:
+            info = self._client.catalog.get(self.model)
+            supports_tools = bool(info and info.tool_calling)
+        else:
+            supports_tools = self.model_supports_tools == MODEL_TOOLS_ON
+        enabled = enabled and self.enable_tools and supports_tools
         _LOGGER.debug(
             "Tools check -> %s (control_mode=%s, enable_tools=%s, model_supports_tools=%s)",
             enabled, self.control_mode, self.enable_tools, self.model_supports_tools
@@ -150,6 +410,7 @@ class LemonadeConversationAgent(AbstractConversationAgent):
 
     async def async_process(self, user_input: ConversationInput) -> ConversationResult:
         response = intent.IntentResponse(language=user_input.language or "es")
+        trace = TurnTrace()
 
         try:
             text = (user_input.text or "").strip()
@@ -159,142 +420,239 @@ class LemonadeConversationAgent(AbstractConversationAgent):
 
             tools_enabled = self._compute_tools_enabled()
 
-            messages: list[dict[str, Any]] = []
-
-            # System prompt: 1 vez por conversación o cada turno según opción
-            if self.refresh_system_every_turn or conv_id not in self._conv_initialized:
-                sys_prompt = self._compose_system_prompt(user_input)
-                _LOGGER.debug("System prompt len=%d preview=%.120s...", len(sys_prompt), sys_prompt)
-                messages.append({"role": "system", "content": sys_prompt})
-                self._conv_initialized.add(conv_id)
-
-            # ICL examples
-            if self.enable_icl and self.icl_max_examples > 0:
-                exs = await self._icl_store.async_get_examples(text, self.icl_max_examples)
-                for ex in reversed(exs):
-                    messages.append({"role": "user", "content": ex["user"]})
-                    messages.append({"role": "assistant", "content": ex["assistant"]})
-
-            # Historial acotado
-            if conv_id in self._history:
-                hist = self._history[conv_id][-self.max_history * 2 :]
-                messages.extend(hist)
-
-            messages.append({"role": "user", "content": text})
-
-            tools = build_tools_schema() if tools_enabled else None
-            use_stream = self.stream and not tools_enabled and self.endpoint == DEFAULT_ENDPOINT
-
-            tool_iterations = 0
-            final_text: str | None = None
-
-            while True:
-                t0 = time.monotonic()
-                resp = await self._client.async_chat(
-                    endpoint=self.endpoint,
-                    model=self.model,
-                    messages=messages,
-                    tools=tools,
-                    tool_choice="auto" if tools else None,
-                    temperature=self.temperature,
-                    top_p=self.top_p,
-                    max_tokens=self.max_tokens,
-                    stream=use_stream,
-                )
-                dt_ms = (time.monotonic() - t0) * 1000
-                _LOGGER.debug("LLM call completada en %.0f ms (stream=%s, tools=%s)", dt_ms, use_stream, bool(tools))
-
-                tool_calls = None
-                assistant_text = None
-
-                if "choices" in resp:
-                    msg = (resp.get("choices") or [{}])[0].get("message") or {}
-                    tool_calls = msg.get("tool_calls")
-                    assistant_text = msg.get("content")
-                    messages.append({"role": "assistant", "content": assistant_text or "", "tool_calls": tool_calls})
-                elif "output_text" in resp:
-                    assistant_text = resp.get("output_text")
-                    messages.append({"role": "assistant", "content": assistant_text or ""})
-                elif "response" in resp or "output" in resp:
-                    response_obj = resp.get("response") or resp.get("output") or {}
-                    if isinstance(response_obj, dict) and "output_text" in response_obj:
-                        assistant_text = response_obj.get("output_text")
-                    else:
-                        assistant_text = json.dumps(resp)
-                    messages.append({"role": "assistant", "content": assistant_text or ""})
-                else:
-                    assistant_text = json.dumps(resp)
-
-                if tools and tool_calls:
-                    if tool_iterations >= self.tool_iter_limit:
-                        assistant_text = (assistant_text or "") + "\n[Aviso] Límite de iteraciones de herramientas."
-                        final_text = assistant_text
-                        break
-
-                    direct_reply: str | None = None
-                    for call in tool_calls:
-                        fn = call.get("function", {})
-                        name = fn.get("name")
-                        arguments = fn.get("arguments")
-                        tool_res = await exec_tool_call(
-                            self.hass,
-                            name,
-                            arguments,
-                            allowed_domains=self.allowed_domains,
-                            context=user_input.context,
-                        )
-                        messages.append(
-                            {
-                                "role": "tool",
-                                "tool_call_id": call.get("id"),
-                                "name": name,
-                                "content": tool_res,
-                            }
+            # Atajo determinista: órdenes simples sin ninguna llamada al LLM. Solo
+            # actúa donde el propio LLM podría hacerlo con sus tools.
+            if (
+                self._fast_path is not None
+                and tools_enabled
+                and self.control_mode == CONTROL_MODE_LLM
+                and (match := self._fast_path.match(text))
+            ):
+                fast_text = await self._async_run_fast_path(match, user_input)
+                if fast_text is not None:
+                    _LOGGER.debug("Fast-path: %s %s", match.tool_name, match.arguments)
+                    trace.outcome = "fast_path"
+                    return self._finish_turn(response, conv_id, text, fast_text)
+
+            # Las preguntas de seguimiento dependen del historial: solo se cachean turnos sin contexto previo.
+            # La clave incluye el área del satélite, que el prompt también recibe.
+            cache_eligible = self.response_cache is not None and conv_id not in self._history
+            cache_area = self._area_hint(user_input) if cache_eligible else None
+            if cache_eligible and (cached := self.response_cache.get(text, language, cache_area)) is not None:
+                _LOGGER.debug("Respuesta servida desde caché")
+                trace.outcome = "cache"
+                return self._finish_turn(response, conv_id, text, cached)
+
+            # Admisión: tope de concurrencia hacia el LLM, con prioridad para la voz
+            admission_started = time.monotonic()
+            async with self.scheduler.slot(self._request_priority(user_input)):
+                trace.add("admission", (time.monotonic() - admission_started) * 1000)
+
+                # ICL examples
+                exs: list[dict[str, Any]] = []
+                if self.enable_icl and self.icl_max_examples > 0:
+                    with trace.span("icl"):
+                        exs = await self._icl_store.async_get_examples(text, self.icl_max_examples)
+
+                with trace.span("prompt_build") as build_span:
+                    head: list[dict[str, Any]] = []
+                    summary = self._history.get_summary(conv_id) if self.summarizer is not None else ""
+
+                    # System prompt: 1 vez por conversación o cada turno según opción
+                    if self.refresh_system_every_turn or not self._history.is_initialized(conv_id):
+                        sys_prompt = self._compose_system_prompt(user_input)
+                        if summary and self.prompt_layout != PROMPT_LAYOUT_STABLE:
+                            # Un único mensaje system: el resumen va al final del prompt
+                            sys_prompt += f"{_SUMMARY_LABEL}: {summary}\n"
+                            summary = ""
+                        _LOGGER.debug("System prompt len=%d preview=%.120s...", len(sys_prompt), sys_prompt)
+                        head.append(system_message(sys_prompt))
+                        self._history.mark_initialized(conv_id)
+
+                    tools = self._tools_schema if tools_enabled else None
+                    budget = self._prompt_budget()
+
+                    # Historial acotado por turnos y, dentro de eso, por presupuesto de tokens
+                    messages = assemble_prompt(
+                        head=head,
+                        icl_examples=exs,
+                        history=self._history.get_messages(conv_id)[-self.max_history * 2 :],
+                        user_message=self._compose_user_message(user_input, text, summary),
+                        tools=tools,
+                        budget=budget,
+                        # Ningún mensaje de texto del historial ocupa más de 1/4 del presupuesto efectivo
+                        max_message_tokens=budget // 4,
+                        icl_after_history=self.prompt_layout == PROMPT_LAYOUT_STABLE,
+                    )
+                    build_span["messages"] = len(messages)
+
+                info = self._client.catalog.get(self.model)
+                use_stream = self.stream and self.endpoint == DEFAULT_ENDPOINT and not (info and info.streaming is False)
+
+                # Un único ChatLog por turno: cada iteración del bucle de tools es un mensaje más del asistente
+                with self._open_chat_log(user_input, use_stream) as chat_log:
+                    tool_iterations = 0
+                    final_text: str | None = None
+                    tools_used: list[str] = []
+                    # Llamadas del turno con su resultado, para la captura ICL
+                    calls_made: list[dict[str, Any]] = []
+                    read_entities: set[str] = set()
+                    capturable = True
+                    streamed_text = ""
+
+                    while True:
+                        tool_tasks: list[asyncio.Task[ToolResult]] = []
+                        with trace.span("llm", stream=use_stream) as llm_span:
+                            if use_stream:
+                                streamed_text, streamed_calls, tool_tasks = await self._async_stream_reply(
+                                    chat_log,
+                                    user_input,
+                                    messages,
+                                    tools,
+                                    start_tools=bool(tools) and tool_iterations < self.tool_iter_limit,
+                                    trace=trace,
+                                    llm_span=llm_span,
+                                )
+                                resp = {"choices": [{"message": {"content": streamed_text, "tool_calls": streamed_calls or None}}]}
+                            else:
+                                resp = await self._client.async_chat(
+                                    endpoint=self.endpoint,
+                                    model=self.model,
+                                    messages=messages,
+                                    tools=tools,
+                                    tool_choice="auto" if tools else None,
+                                    temperature=self.temperature,
+                                    top_p=self.top_p,
+                                    max_tokens=self.max_tokens,
+                                    stream=False,
+                                )
+                                _record_usage(llm_span, resp.get("usage"))
+                        _LOGGER.debug(
+                            "LLM call completada en %.0f ms (stream=%s, tools=%s)",
+                            trace.spans[-1].duration_ms, use_stream, bool(tools),
                         )
-                        if self.tool_follow_up_mode == TOOL_FOLLOW_UP_DIRECT:
-                            try:
-                                parsed = json.loads(tool_res)
-                            except Exception:
-                                parsed = {}
-                            if name == "call_service":
-                                direct_reply = self._format_service_ack(parsed)
-                            elif name == "get_state":
-                                direct_reply = self._format_get_state(parsed)
-
-                    tool_iterations += 1
-
-                    if self.tool_follow_up_mode == TOOL_FOLLOW_UP_DIRECT and direct_reply:
-                        final_text = direct_reply
-                        break
-
-                    use_stream = False
-                    continue
-
-                final_text = assistant_text or ""
-                break
 
-            self._append_history(conv_id, {"role": "user", "content": text})
-            self._append_history(conv_id, {"role": "assistant", "content": final_text or ""})
-
-            # Detectar pregunta para continuar la conversación
-            is_question = False
-            if final_text:
-                ft = final_text.strip()
-                is_question = ("?" in ft and (ft.endswith("?") or ft.endswith("?)"))) or "¿" in ft
+                        tool_calls = None
+                        assistant_text = None
+
+                        if "choices" in resp:
+                            msg = (resp.get("choices") or [{}])[0].get("message") or {}
+                            tool_calls = msg.get("tool_calls")
+                            assistant_text = msg.get("content")
+                            messages.append({"role": "assistant", "content": assistant_text or "", "tool_calls": tool_calls})
+                        elif "output_text" in resp:
+                            assistant_text = resp.get("output_text")
+                            messages.append({"role": "assistant", "content": assistant_text or ""})
+                        elif "response" in resp or "output" in resp:
+                            response_obj = resp.get("response") or resp.get("output") or {}
+                            if isinstance(response_obj, dict) and "output_text" in response_obj:
+                                assistant_text = response_obj.get("output_text")
+                            else:
+                                assistant_text = json.dumps(resp)
+                            messages.append({"role": "assistant", "content": assistant_text or ""})
+                        else:
+                            assistant_text = json.dumps(resp)
+
+                        if tools and tool_calls:
+                            if tool_iterations >= self.tool_iter_limit:
+                                assistant_text = (assistant_text or "") + "\n[Aviso] Límite de iteraciones de herramientas."
+                                final_text = assistant_text
+                                capturable = False
+                                break
+
+                            # Las tools de un mismo turno son independientes: se ejecutan en paralelo
+                            # (acotado por el semáforo) y sus resultados se agregan en el orden original.
+                            # Las ya lanzadas durante el stream solo se esperan.
+                            results = await asyncio.gather(
+                                *(
+                                    tool_tasks[idx] if idx < len(tool_tasks) else self._async_exec_tool(call, user_input, trace)
+                                    for idx, call in enumerate(tool_calls)
+                                )
+                            )
+
+                            direct_reply: str | None = None
+                            direct_error: str | None = None
+                            for call, tool_res in zip(tool_calls, results):
+                                fn = call.get("function", {})
+                                name = fn.get("name")
+                                tools_used.append(name)
+                                calls_made.append({"name": name, "arguments": fn.get("arguments"), "result": tool_res.content})
+                                if not tool_res.ok:
+                                    capturable = False
+                                read_entities |= entities_read(name, tool_res.data)
+                                messages.append(
+                                    {
+                                        "role": "tool",
+                                        "tool_call_id": call.get("id"),
+                                        "name": name,
+                                        # Nunca se recorta: un JSON cortado a medias confunde al modelo
+                                        "content": tool_res.content,
+                                    }
+                                )
+                                if self.tool_follow_up_mode == TOOL_FOLLOW_UP_DIRECT:
+                                    if name in ("call_service", "get_state") and not tool_res.ok:
+                                        # Fallo o timeout de la tool: nunca confirmarlo como hecho
+                                        direct_error = direct_error or self._format_tool_error(tool_res.data)
+                                    elif name == "call_service":
+                                        direct_reply = self._format_service_ack(tool_res.data)
+                                    elif name == "get_state":
+                                        direct_reply = self._format_get_state(tool_res.data)
+
+                            tool_iterations += 1
+
+                            if self.tool_follow_up_mode == TOOL_FOLLOW_UP_DIRECT and (direct_error or direct_reply):
+                                final_text = direct_error or direct_reply
+                                break
+
+                            continue
+
+                        final_text = assistant_text or ""
+                        break
 
-            # Armar IntentResponse con tipo correcto
-            if hasattr(response, "async_set_speech_plain"):
-                response.async_set_speech_plain(text=final_text or "")
-            elif hasattr(response, "async_set_speech"):
-                response.async_set_speech(final_text or "")
-            # Tipo de respuesta (ASK si pregunta, si no, ACTION_DONE)
-            if hasattr(intent, "IntentResponseType"):
-                response.response_type = intent.IntentResponseType.ASK if is_question else intent.IntentResponseType.ACTION_DONE
+                    # La respuesta final (plantilla DIRECT, aviso de límite) también llega al ChatLog y al TTS
+                    if chat_log is not None and final_text and final_text != streamed_text:
+                        pending = final_text
+                        if streamed_text and final_text.startswith(streamed_text):
+                            pending = final_text[len(streamed_text) :]
+                        await self._async_add_reply(chat_log, pending)
+
+            with trace.span("response"):
+                result = self._finish_turn(response, conv_id, text, final_text or "")
+
+            # Nunca cachear turnos que actuaron (call_service) ni respuestas sin consultar estado
+            if (
+                cache_eligible
+                and capturable
+                and final_text
+                and tools_used
+                and all(name in READ_ONLY_TOOLS for name in tools_used)
+            ):
+                self.response_cache.put(text, language, cache_area, final_text, read_entities)
+
+            # Captura ICL: solo encola (O(1)); el guardado ocurre en segundo plano
+            if self.icl_auto_capture and capturable and final_text:
+                self.icl_capture.enqueue(text, final_text, calls_made)
+
+            return result
+
+        except SchedulerBusyError as err:
+            _LOGGER.warning("Petición rechazada por el control de admisión: %s", err)
+            trace.outcome = "busy"
+            if hasattr(response, "async_set_error"):
+                response.async_set_error("unknown", "Estoy ocupado con otras peticiones; inténtalo de nuevo en unos segundos.")
+            return ConversationResult(response=response, conversation_id=user_input.conversation_id or "default")
 
-            return ConversationResult(response=response, conversation_id=conv_id)
+        except LemonadeUnavailableError as err:
+            # Servidor caído o saturado: sin traceback, ya lo registra el cliente
+            _LOGGER.warning("Lemonade no disponible: %s", err)
+            trace.outcome = "unavailable"
+            if hasattr(response, "async_set_error"):
+                response.async_set_error("unknown", "El servidor Lemonade no está disponible en este momento.")
+            return ConversationResult(response=response, conversation_id=user_input.conversation_id or "default")
 
         except Exception as err:  # noqa: BLE001
             _LOGGER.exception("Error en LemonadeConversationAgent: %s", err)
+            trace.outcome = "error"
             if hasattr(response, "async_set_error"):
                 try:
                     response.async_set_error("unknown", "Ocurrió un error procesando tu solicitud")
@@ -303,9 +661,179 @@ class LemonadeConversationAgent(AbstractConversationAgent):
                         response.async_set_speech_plain(text="Ocurrió un error procesando tu solicitud.")
             return ConversationResult(response=response, conversation_id=user_input.conversation_id or "default")
 
-    def _compose_system_prompt(self, user_input: ConversationInput) -> str:
-        now = dt_util.now()
-        area_hint = None
+        finally:
+            self.metrics.async_record(trace)
+            if self.warmer is not None and trace.outcome == "llm":
+                self.warmer.touch()
+
+    def _finish_turn(
+        self, response: intent.IntentResponse, conv_id: str, text: str, final_text: str
+    ) -> ConversationResult:
+        self._append_history(conv_id, {"role": "user", "content": text})
+        self._append_history(conv_id, {"role": "assistant", "content": final_text or ""})
+
+        # Detectar pregunta para continuar la conversación
+        is_question = False
+        if final_text:
+            ft = final_text.strip()
+            is_question = ("?" in ft and (ft.endswith("?") or ft.endswith("?)"))) or "¿" in ft
+
+        # Armar IntentResponse con tipo correcto
+        if hasattr(response, "async_set_speech_plain"):
+            response.async_set_speech_plain(text=final_text or "")
+        elif hasattr(response, "async_set_speech"):
+            response.async_set_speech(final_text or "")
+        # Tipo de respuesta (ASK si pregunta, si no, ACTION_DONE)
+        if hasattr(intent, "IntentResponseType"):
+            response.response_type = intent.IntentResponseType.ASK if is_question else intent.IntentResponseType.ACTION_DONE
+
+        return ConversationResult(response=response, conversation_id=conv_id)
+
+    async def _async_run_fast_path(self, match: FastPathMatch, user_input: ConversationInput) -> str | None:
+        """Ejecuta el match del atajo con los mismos tools y plantillas de respuesta directa.
+
+        Devuelve None para seguir por el LLM solo si no se llegó a actuar: tras
+        un call_service fallido o sin respuesta a tiempo el servicio pudo
+        ejecutarse igualmente, y el LLM lo repetiría.
+        """
+        tool_res = await self._async_exec_tool(
+            {"function": {"name": match.tool_name, "arguments": match.arguments}}, user_input
+        )
+        if not tool_res.ok:
+            return self._format_tool_error(tool_res.data) if match.tool_name == "call_service" else None
+        if match.tool_name == "call_service":
+            return self._format_service_ack(tool_res.data)
+        return self._format_get_state(tool_res.data)
+
+    async def _async_exec_tool(
+        self, call: dict[str, Any], user_input: ConversationInput, trace: TurnTrace | None = None
+    ) -> ToolResult:
+        """Ejecuta la tool de una tool call y anota su duración en la traza."""
+        fn = call.get("function", {})
+        name = fn.get("name")
+        started = time.monotonic()
+        try:
+            return await self._async_run_tool(name, fn.get("arguments"), user_input)
+        finally:
+            if trace is not None:
+                trace.add("tool", (time.monotonic() - started) * 1000, tool=name)
+
+    async def _async_run_tool(self, name: str | None, arguments: Any, user_input: ConversationInput) -> ToolResult:
+        """Ejecuta una tool aislando sus fallos: nunca lanza, los errores van en el resultado.
+
+        Si tarda más que tool_timeout se responde sin esperarla; la tarea sigue
+        en segundo plano (shield) para no cortar un servicio a medio ejecutar.
+        """
+        async with self._tool_semaphore:
+            task = self.hass.async_create_task(
+                exec_tool_call(
+                    self.hass,
+                    name,
+                    arguments,
+                    allowed_domains=self.allowed_domains,
+                    context=user_input.context,
+                    entity_index=self.entity_index,
+                )
+            )
+            try:
+                return ToolResult.from_content(await asyncio.wait_for(asyncio.shield(task), self.tool_timeout))
+            except TimeoutError:
+                _LOGGER.warning("Tool %s sigue en curso tras %.0f s; se responde sin esperarla", name, self.tool_timeout)
+                return ToolResult.error(f"{name} sigue en curso (tiempo agotado)")
+            except Exception as err:  # noqa: BLE001
+                _LOGGER.exception("Error ejecutando tool %s: %s", name, err)
+                return ToolResult.error(f"Error ejecutando {name}: {err}")
+
+    @contextmanager
+    def _open_chat_log(self, user_input: ConversationInput, enabled: bool) -> Iterator[ChatLog | None]:
+        """ChatLog de HA del turno (None sin streaming o en versiones sin ChatLog).
+
+        Se abre una sola vez por turno: abrirlo registra el mensaje del usuario.
+        """
+        if not enabled or async_get_chat_log is None or chat_session is None:
+            yield None
+            return
+        with (
+            chat_session.async_get_chat_session(self.hass, user_input.conversation_id) as session,
+            async_get_chat_log(self.hass, session, user_input) as chat_log,
+        ):
+            yield chat_log
+
+    async def _async_add_reply(self, chat_log: ChatLog, text: str) -> None:
+        """Agrega al ChatLog, como un mensaje más del asistente, un texto que no salió del stream."""
+
+        async def _deltas():
+            yield {"role": "assistant"}
+            yield {"content": text}
+
+        async for _content in chat_log.async_add_delta_content_stream(self.entry.entry_id, _deltas()):
+            pass
+
+    async def _async_stream_reply(
+        self,
+        chat_log: ChatLog | None,
+        user_input: ConversationInput,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None,
+        *,
+        start_tools: bool,
+        trace: TurnTrace | None = None,
+        llm_span: dict[str, Any] | None = None,
+    ) -> tuple[str, list[dict[str, Any]], list[asyncio.Task[ToolResult]]]:
+        """Consume el stream del LLM y entrega cada fragmento al ChatLog de HA.
+
+        El pipeline de Assist escucha los deltas del ChatLog, por lo que el TTS
+        puede empezar a hablar antes de que termine la generación. Las tool calls
+        se ejecutan apenas llegan completas (si start_tools), sin esperar al final
+        del stream; las tareas se devuelven en el mismo orden que las llamadas.
+        En `llm_span` se anotan el TTFT y los tokens informados por el servidor.
+        """
+        started = time.monotonic()
+        span = llm_span if llm_span is not None else {}
+        parts: list[str] = []
+        tool_calls: list[dict[str, Any]] = []
+        tool_tasks: list[asyncio.Task[ToolResult]] = []
+
+        async def _deltas():
+            yield {"role": "assistant"}
+            async for event in self._client.async_chat_stream(
+                model=self.model,
+                messages=messages,
+                tools=tools,
+                tool_choice="auto" if tools else None,
+                temperature=self.temperature,
+                top_p=self.top_p,
+                max_tokens=self.max_tokens,
+            ):
+                if "usage" in event:
+                    _record_usage(span, event["usage"])
+                    continue
+                if "ttft_ms" not in span:
+                    span["ttft_ms"] = round((time.monotonic() - started) * 1000, 1)
+                content = event.get("content")
+                if content:
+                    parts.append(content)
+                    yield {"content": content}
+                call = event.get("tool_call")
+                if call:
+                    tool_calls.append(call)
+                    if start_tools:
+                        tool_tasks.append(self.hass.async_create_task(self._async_exec_tool(call, user_input, trace)))
+
+        try:
+            if chat_log is None:
+                async for _delta in _deltas():
+                    pass
+            else:
+                async for _content in chat_log.async_add_delta_content_stream(self.entry.entry_id, _deltas()):
+                    pass
+        except Exception:
+            for task in tool_tasks:
+                task.cancel()
+            raise
+        return "".join(parts), tool_calls, tool_tasks
+
+    def _area_hint(self, user_input: ConversationInput) -> str | None:
         if getattr(user_input, "device_id", None):
             from homeassistant.helpers import device_registry as dr, area_registry as ar
             dr_reg = dr.async_get(self.hass)
@@ -314,36 +842,80 @@ class LemonadeConversationAgent(AbstractConversationAgent):
             if dev and dev.area_id:
                 area = ar_reg.async_get_area(dev.area_id)
                 if area:
-                    area_hint = area.name
+                    return area.name
+        return None
+
+    def _compose_system_prompt(self, user_input: ConversationInput) -> str:
+        if self.prompt_layout == PROMPT_LAYOUT_STABLE:
+            # Idéntico en todos los turnos: el servidor puede reutilizar el prefill cacheado
+            return f"{self.system_prompt}\n\n{_PROMPT_RULES}"
 
+        now = dt_util.now()
+        area_hint = self._area_hint(user_input)
         prefix = (
             f"{self.system_prompt}\n\n"
             f"Fecha y hora actual: {now.isoformat()}.\n"
-            "Hablas español de forma natural.\n"
-            "- Para consultas por área, NO pidas permiso. Consulta y responde: usa list_entities con domain='light' y area (nombre o id) y reporta el resultado.\n"
-            "- Si el área no existe o hay ambigüedad, pide aclaración.\n"
-            "- Solo pide confirmación antes de ejecutar acciones (call_service), no antes de consultar estado.\n"
-            "- Para actuar sobre un área completa, usa call_service con area_id (o area_name, que convertimos a area_id).\n"
-            "Evita acciones peligrosas salvo petición explícita y confirma cuando sea necesario.\n"
+            f"{_PROMPT_RULES}"
         )
         if area_hint:
             prefix += f"Contexto: el usuario podría estar en el área '{area_hint}'. Prioriza entidades de esa área cuando haya ambigüedad.\n"
         return prefix
 
+    def _compose_user_message(self, user_input: ConversationInput, text: str, summary: str = "") -> dict[str, Any]:
+        """Mensaje final del usuario; en layout estable lleva el contexto volátil (hora, área, resumen).
+
+        En layout clásico el resumen solo llega aquí si este turno no lleva system prompt.
+        """
+        if self.prompt_layout != PROMPT_LAYOUT_STABLE:
+            if summary:
+                return {"role": "user", "content": f"[Contexto: {_SUMMARY_LABEL}: {summary}]\n{text}"}
+            return {"role": "user", "content": text}
+        context = f"Fecha y hora actual: {dt_util.now().strftime('%Y-%m-%d %H:%M')}."
+        area_hint = self._area_hint(user_input)
+        if area_hint:
+            context += f" El usuario podría estar en el área '{area_hint}'; prioriza sus entidades si hay ambigüedad."
+        if summary:
+            context += f" {_SUMMARY_LABEL}: {summary}"
+        return {"role": "user", "content": f"[Contexto: {context}]\n{text}"}
+
     def _append_history(self, conv_id: str, msg: dict[str, Any]) -> None:
-        hist = self._history.setdefault(conv_id, [])
-        hist.append(msg)
-        limit = max(2 * self.max_history, 2)
-        if len(hist) > limit:
-            del hist[0 : len(hist) - limit]
+        dropped = self._history.append(conv_id, msg)
+        if dropped and self.summarizer is not None:
+            self.summarizer.enqueue(conv_id, dropped)
+
+    async def _async_summarize(self, previous: str, messages: list[dict[str, Any]]) -> str:
+        """Funde los mensajes descartados con el resumen previo.
+
+        Entra como mantenimiento, así que nunca ocupa el último hueco libre
+        del scheduler y, si solo hay uno, se corta cuando llega un turno real:
+        los turnos reales no esperan detrás de un resumen.
+        """
+        # Sin presupuesto ni ventana de contexto conocida, un tope fijo para la entrada
+        max_input = self._prompt_budget() // 2 or _SUMMARY_MAX_INPUT_TOKENS
+        request = [
+            system_message(SUMMARY_INSTRUCTIONS),
+            {"role": "user", "content": truncate_text(summary_request(previous, messages), max_input)},
+        ]
+        async with self.scheduler.slot(PRIORITY_MAINTENANCE):
+            resp = await self._client.async_chat(
+                endpoint=self.endpoint,
+                model=self.model,
+                messages=request,
+                temperature=0.2,
+                max_tokens=_SUMMARY_MAX_TOKENS,
+            )
+        return ((resp.get("choices") or [{}])[0].get("message") or {}).get("content") or ""
 
     def _friendly_entity(self, entity_id: str) -> str:
         st = self.hass.states.get(entity_id)
         return st.attributes.get("friendly_name") if st else entity_id
 
-    def _format_targets(self, target) -> str:
+    def _format_targets(self, target, domain: str | None = None) -> str:
         if not target:
             return "los objetivos indicados"
+        if isinstance(target, dict) and "entity_id" not in target and "area_id" in target:
+            area = self.entity_index.area_name(target["area_id"]) or target["area_id"]
+            return f"{_AREA_TARGET_NOUNS.get(domain, 'todo')} de {area}"
         if isinstance(target, str):
             names = [self._friendly_entity(target)]
         elif isinstance(target, list):
@@ -365,7 +937,7 @@ class LemonadeConversationAgent(AbstractConversationAgent):
         service = result.get("service")
         target = result.get("target")
         data = result.get("data") or {}
-        tgt_txt = self._format_targets(target)
+        tgt_txt = self._format_targets(target, domain)
 
         mapping = {
             ("light", "turn_on"): f"Encendí {tgt_txt}.",
@@ -381,6 +953,9 @@ class LemonadeConversationAgent(AbstractConversationAgent):
             text = f"Listo. Ejecuté {domain}.{service} en {tgt_txt}."
         return text
 
+    def _format_tool_error(self, result: dict[str, Any]) -> str:
+        return f"No pude completarlo: {result.get('error')}."
+
     def _format_get_state(self, result: dict[str, Any]) -> str:
         eid = result.get("entity_id")
         state = result.get("state")
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_API_KEY, DATA_AGENT, DOMAIN
+
+TO_REDACT = {CONF_API_KEY}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    diag: dict[str, Any] = {
+        "data": async_redact_data(dict(entry.data), TO_REDACT),
+        "options": async_redact_data(dict(entry.options), TO_REDACT),
+    }
+    agent = hass.data.get(DOMAIN, {}).get(entry.entry_id, {}).get(DATA_AGENT)
+    if agent is None:
+        return diag
+
+    model_info = agent.client.catalog.get(agent.model)
+    diag.update(
+        {
+            "metrics": agent.metrics.summary(),
+            "scheduler": agent.scheduler.stats,
+            "backends": agent.client.backend_stats,
+            "model": asdict(model_info) if model_info else None,
+            "history": agent.history_stats,
+            "response_cache": agent.response_cache.stats if agent.response_cache is not None else None,
+            "summarizer": agent.summarizer.stats if agent.summarizer is not None else None,
+            "warmup": agent.warmer.stats if agent.warmer is not None else None,
+        }
+    )
+    return diag
@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    # orjson vía Home Assistant: serializa a bytes directamente y mucho más rápido
+    from homeassistant.helpers.json import json_bytes
+except ImportError:  # Home Assistant antiguo
+
+    def json_bytes(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers import area_registry as ar, device_registry as dr, entity_registry as er
+
+
+class EntityIndex:
+    """Índice de entidades por dominio y área, mantenido con los eventos de los registros.
+
+    Evita recorrer todo el entity registry en cada tool call: una consulta
+    filtrada cuesta lo que mide su resultado. `generation` se incrementa con
+    cada cambio para que otros cachés puedan invalidarse.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self.generation = 0
+        self._entity_domain: dict[str, str] = {}
+        self._entity_area: dict[str, str | None] = {}
+        self._entity_device: dict[str, str | None] = {}
+        self._by_domain: dict[str, set[str]] = {}
+        self._by_area: dict[str | None, set[str]] = {}
+        self._by_device: dict[str, set[str]] = {}
+        self._area_names: dict[str, str] = {}
+        self._area_ids_by_name: dict[str, str] = {}
+        self._unsubs: list[CALLBACK_TYPE] = []
+
+    @callback
+    def async_setup(self) -> CALLBACK_TYPE:
+        """Construye el índice y se suscribe a los cambios. Devuelve la función para desuscribirse."""
+        self._rebuild_areas()
+        er_reg = er.async_get(self.hass)
+        for entry in er_reg.entities.values():
+            self._index_entry(entry)
+
+        bus = self.hass.bus
+        self._unsubs = [
+            bus.async_listen(er.EVENT_ENTITY_REGISTRY_UPDATED, self._handle_entity_event),
+            bus.async_listen(dr.EVENT_DEVICE_REGISTRY_UPDATED, self._handle_device_event),
+            bus.async_listen(ar.EVENT_AREA_REGISTRY_UPDATED, self._handle_area_event),
+        ]
+        return self.async_shutdown
+
+    @callback
+    def async_shutdown(self) -> None:
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs = []
+
+    def resolve_area(self, area: str | None) -> str | None:
+        """Acepta un area_id o un nombre de área (sin distinguir mayúsculas)."""
+        if not area:
+            return None
+        if area in self._area_names:
+            return area
+        return self._area_ids_by_name.get(area.lower())
+
+    def area_name(self, area_id: str | None) -> str | None:
+        return self._area_names.get(area_id) if area_id else None
+
+    def entity_area(self, entity_id: str) -> str | None:
+        return self._entity_area.get(entity_id)
+
+    def area_names(self) -> dict[str, str]:
+        """area_id -> nombre."""
+        return dict(self._area_names)
+
+    def query(self, domain: str | None = None, area_id: str | None = None) -> list[str]:
+        """Entity ids habilitados que cumplen los filtros, ordenados."""
+        if domain and area_id:
+            by_domain = self._by_domain.get(domain, set())
+            by_area = self._by_area.get(area_id, set())
+            small, big = (by_domain, by_area) if len(by_domain) <= len(by_area) else (by_area, by_domain)
+            result = [eid for eid in small if eid in big]
+        elif domain:
+            result = list(self._by_domain.get(domain, ()))
+        elif area_id:
+            result = list(self._by_area.get(area_id, ()))
+        else:
+            result = list(self._entity_domain)
+        result.sort()
+        return result
+
+    def _rebuild_areas(self) -> None:
+        ar_reg = ar.async_get(self.hass)
+        self._area_names = {a.id: a.name for a in ar_reg.async_list_areas()}
+        self._area_ids_by_name = {name.lower(): area_id for area_id, name in self._area_names.items()}
+
+    def _index_entry(self, entry: er.RegistryEntry) -> None:
+        if entry.disabled_by:
+            return
+        entity_id = entry.entity_id
+        area_id = entry.area_id
+        if not area_id and entry.device_id:
+            device = dr.async_get(self.hass).async_get(entry.device_id)
+            if device and device.area_id:
+                area_id = device.area_id
+
+        self._entity_domain[entity_id] = entry.domain
+        self._entity_area[entity_id] = area_id
+        self._entity_device[entity_id] = entry.device_id
+        self._by_domain.setdefault(entry.domain, set()).add(entity_id)
+        self._by_area.setdefault(area_id, set()).add(entity_id)
+        if entry.device_id:
+            self._by_device.setdefault(entry.device_id, set()).add(entity_id)
+
+    def _remove_entity(self, entity_id: str) -> None:
+        domain = self._entity_domain.pop(entity_id, None)
+        if domain is None:
+            return
+        area_id = self._entity_area.pop(entity_id, None)
+        device_id = self._entity_device.pop(entity_id, None)
+        self._discard(self._by_domain, domain, entity_id)
+        self._discard(self._by_area, area_id, entity_id)
+        if device_id:
+            self._discard(self._by_device, device_id, entity_id)
+
+    @staticmethod
+    def _discard(index: dict[Any, set[str]], key: Any, entity_id: str) -> None:
+        bucket = index.get(key)
+        if bucket is None:
+            return
+        bucket.discard(entity_id)
+        if not bucket:
+            del index[key]
+
+    def _reindex(self, entity_id: str) -> None:
+        self._remove_entity(entity_id)
+        entry = er.async_get(self.hass).async_get(entity_id)
+        if entry is not None:
+            self._index_entry(entry)
+
+    @callback
+    def _handle_entity_event(self, event: Event) -> None:
+        data = event.data
+        entity_id = data.get("entity_id")
+        if not entity_id:
+            return
+        if data.get("old_entity_id"):
+            self._remove_entity(data["old_entity_id"])
+        if data.get("action") == "remove":
+            self._remove_entity(entity_id)
+        else:
+            self._reindex(entity_id)
+        self.generation += 1
+
+    @callback
+    def _handle_device_event(self, event: Event) -> None:
+        device_id = event.data.get("device_id")
+        if not device_id or device_id not in self._by_device:
+            return
+        for entity_id in list(self._by_device[device_id]):
+            self._reindex(entity_id)
+        self.generation += 1
+
+    @callback
+    def _handle_area_event(self, event: Event) -> None:
+        self._rebuild_areas()
+        self.generation += 1
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import re
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any
+
+from homeassistant.const import ATTR_FRIENDLY_NAME
+from homeassistant.core import HomeAssistant
+
+from .entity_index import EntityIndex
+
+# Dominios que el atajo sabe encender/apagar/consultar
+FAST_PATH_DOMAINS = ("light", "switch", "fan", "input_boolean")
+
+# Los friendly_name pueden cambiar sin evento de registro: refresco periódico
+_NAMES_MAX_AGE = 300
+
+_ON_VERBS = r"enciende|encender|prende|prender|activa|activar|turn on|switch on"
+_OFF_VERBS = r"apaga|apagar|desactiva|desactivar|turn off|switch off"
+_ON_STATES = r"encendid[oa]s?|prendid[oa]s?|activad[oa]s?|on"
+_OFF_STATES = r"apagad[oa]s?|desactivad[oa]s?|off"
+
+_ACTION_RE = re.compile(rf"^(?:por favor )?(?:please )?(?P<verb>{_ON_VERBS}|{_OFF_VERBS}) (?P<target>.+?)(?: por favor| please)?$")
+_QUERY_ES_RE = re.compile(rf"^(?:esta|estan) (?:(?:{_ON_STATES}|{_OFF_STATES}) (?P<t1>.+)|(?P<t2>.+) (?:{_ON_STATES}|{_OFF_STATES}))$")
+_QUERY_EN_RE = re.compile(r"^(?:is|are) (?P<target>.+) (?:on|off)$")
+_ARTICLE_RE = re.compile(r"^(?:el|la|los|las|lo|the|my|mi|mis) ")
+_NOUN_AREA_ES_RE = re.compile(r"^(?P<noun>\w+) (?:de|del|en) (?P<area>.+)$")
+_AREA_NOUN_EN_RE = re.compile(r"^(?P<area>.+) (?P<noun>\w+)$")
+
+_NOUNS = {
+    "luz": "light",
+    "luces": "light",
+    "lampara": "light",
+    "lamparas": "light",
+    "light": "light",
+    "lights": "light",
+    "lamp": "light",
+    "lamps": "light",
+    "ventilador": "fan",
+    "ventiladores": "fan",
+    "fan": "fan",
+    "fans": "fan",
+    "enchufe": "switch",
+    "enchufes": "switch",
+    "interruptor": "switch",
+    "interruptores": "switch",
+    "switch": "switch",
+    "switches": "switch",
+}
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sin tildes ni puntuación, espacios simples."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
+
+
+def _strip_article(text: str) -> str:
+    return _ARTICLE_RE.sub("", text, count=1)
+
+
+@dataclass
+class FastPathMatch:
+    tool_name: str
+    arguments: dict[str, Any] = field(default_factory=dict)
+
+
+class FastPathMatcher:
+    """Reconoce órdenes simples (encender, apagar, consultar) sin pasar por el LLM.
+
+    Usa los nombres de entidades y áreas conocidos por el EntityIndex. Ante
+    cualquier duda (nombre desconocido, varias entidades para una consulta,
+    dominio no permitido) no hay match y el turno sigue hacia el LLM.
+    """
+
+    def __init__(self, hass: HomeAssistant, entity_index: EntityIndex, allowed_domains: list[str]) -> None:
+        self.hass = hass
+        self.entity_index = entity_index
+        self.allowed_domains = allowed_domains
+        self._names: dict[str, list[str]] = {}
+        self._areas: dict[str, str] = {}
+        self._built_generation = -1
+        self._built_at = 0.0
+
+    def match(self, text: str) -> FastPathMatch | None:
+        norm = normalize(text)
+        if not norm:
+            return None
+        self._ensure_names()
+
+        if m := _ACTION_RE.match(norm):
+            service = "turn_on" if re.fullmatch(_ON_VERBS, m["verb"]) else "turn_off"
+            return self._match_action(service, m["target"])
+
+        if m := _QUERY_ES_RE.match(norm):
+            return self._match_query(m["t1"] or m["t2"])
+        if m := _QUERY_EN_RE.match(norm):
+            return self._match_query(m["target"])
+        return None
+
+    def _match_action(self, service: str, target: str) -> FastPathMatch | None:
+        resolved = self._resolve(target)
+        if resolved is None:
+            return None
+        domain, entity_ids, area_id = resolved
+        if domain not in self.allowed_domains:
+            return None
+        args: dict[str, Any] = {"domain": domain, "service": service}
+        if len(entity_ids) == 1:
+            args["entity_id"] = entity_ids[0]
+        elif area_id:
+            args["area_id"] = area_id
+        else:
+            args["entity_id"] = ",".join(entity_ids)
+        return FastPathMatch("call_service", args)
+
+    def _match_query(self, target: str) -> FastPathMatch | None:
+        resolved = self._resolve(target)
+        if resolved is None or len(resolved[1]) != 1:
+            return None
+        return FastPathMatch("get_state", {"entity_id": resolved[1][0]})
+
+    def _resolve(self, target: str) -> tuple[str, list[str], str | None] | None:
+        """(dominio, entidades, área) para el objetivo, o None si es desconocido o ambiguo."""
+        target = _strip_article(target)
+
+        entity_ids = self._names.get(target)
+        if entity_ids:
+            domains = {eid.split(".", 1)[0] for eid in entity_ids}
+            if len(domains) != 1:
+                return None
+            return domains.pop(), entity_ids, None
+
+        noun = area = None
+        if m := _NOUN_AREA_ES_RE.match(target):
+            noun, area = m["noun"], _strip_article(m["area"])
+        elif m := _AREA_NOUN_EN_RE.match(target):
+            noun, area = m["noun"], m["area"]
+        domain = _NOUNS.get(noun or "")
+        area_id = self._areas.get(area or "")
+        if not domain or not area_id:
+            return None
+        entity_ids = [eid for eid in self.entity_index.query(domain, area_id) if self.hass.states.get(eid)]
+        if not entity_ids:
+            return None
+        return domain, entity_ids, area_id
+
+    def _ensure_names(self) -> None:
+        if (
+            self._built_generation == self.entity_index.generation
+            and time.monotonic() - self._built_at < _NAMES_MAX_AGE
+        ):
+            return
+        names: dict[str, list[str]] = {}
+        for domain in FAST_PATH_DOMAINS:
+            for entity_id in self.entity_index.query(domain):
+                state = self.hass.states.get(entity_id)
+                if state is None:
+                    continue
+                name = _strip_article(normalize(str(state.attributes.get(ATTR_FRIENDLY_NAME) or "")))
+                if name:
+                    names.setdefault(name, []).append(entity_id)
+        self._names = names
+        self._areas = {
+            _strip_article(normalize(name)): area_id for area_id, name in self.entity_index.area_names().items()
+        }
+        self._built_generation = self.entity_index.generation
+        self._built_at = time.monotonic()
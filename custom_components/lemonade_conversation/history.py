@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+# Sobrecarga aproximada por mensaje (dict, claves, rol) además del contenido
+_MESSAGE_OVERHEAD = 64
+
+
+def _message_size(msg: dict[str, Any]) -> int:
+    content = msg.get("content")
+    if not isinstance(content, str):
+        content = str(content or "")
+    return len(content.encode("utf-8")) + _MESSAGE_OVERHEAD
+
+
+@dataclass
+class _Conversation:
+    messages: list[dict[str, Any]] = field(default_factory=list)
+    initialized: bool = False
+    summary: str = ""
+    size: int = 0
+    last_used: float = 0.0
+
+
+class ConversationStore:
+    """Historial por conversation_id con expulsión LRU + TTL y límite de memoria.
+
+    Las conversaciones se mantienen en orden de último uso, así que tanto la
+    expiración por TTL como la expulsión por tamaño solo miran el principio.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_messages: int,
+        max_conversations: int,
+        max_bytes: int,
+        ttl: float,
+    ) -> None:
+        self.max_messages = max(max_messages, 2)
+        self.max_conversations = max(max_conversations, 1)
+        self.max_bytes = max(max_bytes, 0)
+        self.ttl = ttl
+        self._convs: OrderedDict[str, _Conversation] = OrderedDict()
+        self._resident_bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __contains__(self, conv_id: str) -> bool:
+        self._purge_expired()
+        return conv_id in self._convs
+
+    def __len__(self) -> int:
+        return len(self._convs)
+
+    @property
+    def resident_bytes(self) -> int:
+        return self._resident_bytes
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "conversations": len(self._convs),
+            "resident_bytes": self._resident_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def get_messages(self, conv_id: str) -> list[dict[str, Any]]:
+        conv = self._touch(conv_id, create=False)
+        return list(conv.messages) if conv else []
+
+    def get_summary(self, conv_id: str) -> str:
+        # Solo lectura: no cuenta como uso (la lee también el resumidor en segundo plano)
+        self._purge_expired()
+        conv = self._convs.get(conv_id)
+        return conv.summary if conv else ""
+
+    def set_summary(self, conv_id: str, summary: str) -> bool:
+        """Sustituye el resumen de los turnos ya descartados; False si la conversación ya no existe."""
+        # Sin _touch: un resumen en segundo plano no cuenta como uso ni resucita conversaciones
+        conv = self._convs.get(conv_id)
+        if conv is None:
+            return False
+        delta = len(summary.encode("utf-8")) - len(conv.summary.encode("utf-8"))
+        conv.summary = summary
+        conv.size += delta
+        self._resident_bytes += delta
+        self._enforce_limits(keep=conv_id)
+        return True
+
+    def is_initialized(self, conv_id: str) -> bool:
+        conv = self._touch(conv_id, create=False)
+        return bool(conv and conv.initialized)
+
+    def mark_initialized(self, conv_id: str) -> None:
+        conv = self._touch(conv_id, create=True)
+        conv.initialized = True
+        self._enforce_limits(keep=conv_id)
+
+    def append(self, conv_id: str, msg: dict[str, Any]) -> list[dict[str, Any]]:
+        """Agrega un mensaje y devuelve los que se descartaron por el límite de la conversación."""
+        conv = self._touch(conv_id, create=True)
+        size = _message_size(msg)
+        conv.messages.append(msg)
+        conv.size += size
+        self._resident_bytes += size
+
+        dropped: list[dict[str, Any]] = []
+        if len(conv.messages) > self.max_messages:
+            cut = len(conv.messages) - self.max_messages
+            dropped = conv.messages[:cut]
+            del conv.messages[:cut]
+            freed = sum(_message_size(m) for m in dropped)
+            conv.size -= freed
+            self._resident_bytes -= freed
+
+        self._enforce_limits(keep=conv_id)
+        return dropped
+
+    def clear(self) -> None:
+        self._convs.clear()
+        self._resident_bytes = 0
+
+    def _touch(self, conv_id: str, *, create: bool) -> _Conversation | None:
+        self._purge_expired()
+        conv = self._convs.get(conv_id)
+        if conv is None:
+            if not create:
+                return None
+            conv = self._convs[conv_id] = _Conversation()
+        else:
+            self._convs.move_to_end(conv_id)
+        conv.last_used = time.monotonic()
+        return conv
+
+    def _purge_expired(self) -> None:
+        if self.ttl <= 0:
+            return
+        deadline = time.monotonic() - self.ttl
+        while self._convs:
+            conv_id, conv = next(iter(self._convs.items()))
+            if conv.last_used >= deadline:
+                break
+            self._drop(conv_id)
+            self.expirations += 1
+
+    def _enforce_limits(self, *, keep: str) -> None:
+        while len(self._convs) > self.max_conversations or (
+            self.max_bytes and self._resident_bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._convs))
+            if oldest == keep:
+                break
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, conv_id: str) -> None:
+        conv = self._convs.pop(conv_id)
+        self._resident_bytes -= conv.size
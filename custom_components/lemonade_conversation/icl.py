@@ -1,30 +1,285 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import hashlib
+import heapq
+import json
+import logging
+import math
+import re
 import time
-from typing import Any, List, Dict
+import unicodedata
+from array import array
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, Any, Deque
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.storage import Store
 
+try:
+    import numpy as np
+except ImportError:  # sin NumPy: similitud coseno en Python puro
+    np = None
+
+if TYPE_CHECKING:
+    from .api import LemonadeClient
+
+_LOGGER = logging.getLogger(__name__)
+
+_QUERY_CACHE_SIZE = 256
+_EMBEDDING_TIMEOUT = 5
+# Tras un fallo de /embeddings se usa solo BM25 durante este tiempo (s)
+_EMBEDDING_BACKOFF = 300
+
+# Resultados de tools más largos no se guardan en el ejemplo (el prompt usa uno genérico)
+_MAX_TOOL_RESULT_CHARS = 300
+
+# Parámetros BM25 habituales
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+_WORD_RE = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    (
+        "el la los las un una unos unas de del al a en y o que por para con se me mi tu su es "
+        "lo le les ya no si the a an of to in on and or is are it my please"
+    ).split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Minúsculas, sin tildes, sin stopwords."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [t for t in _WORD_RE.findall(text) if len(t) > 1 and t not in _STOPWORDS]
+
+
+def _example_tool_calls(calls: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Tool calls de un turno como se guardan en el ejemplo: argumentos JSON y resultado breve."""
+    out: list[dict[str, Any]] = []
+    for call in calls:
+        args = call.get("arguments")
+        result = call.get("result")
+        out.append(
+            {
+                "name": call.get("name"),
+                "arguments": args if isinstance(args, str) else json.dumps(args or {}, ensure_ascii=False),
+                "result": result if isinstance(result, str) and len(result) <= _MAX_TOOL_RESULT_CHARS else None,
+            }
+        )
+    return out
+
+
+def _normalize(vec: list[float]) -> array:
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return array("f", (v / norm for v in vec))
+
+
+class ICLVectorIndex:
+    """Embeddings de los ejemplos ICL (endpoint /embeddings) para búsqueda semántica.
+
+    Los vectores se guardan normalizados en float32 en un Store propio junto
+    al de ejemplos; la consulta es un producto matricial (NumPy si está
+    disponible). Los embeddings de consultas se cachean por hash del texto.
+    Si el endpoint falla se deja de consultar durante un rato, para que un
+    servidor de embeddings caído no sume su timeout a cada turno.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str, client: LemonadeClient, model: str) -> None:
+        self.hass = hass
+        self.client = client
+        self.model = model
+        self._store = Store(hass, 1, f"lemonade_conversation_icl_vectors_{entry_id}.json")
+        self._loaded = False
+        self._ids: list[int] = []
+        self._id_set: set[int] = set()
+        self._rows: list[array] = []
+        self._matrix: Any = None  # np.ndarray (n, dim) reconstruido perezosamente
+        self._dim = 0
+        self._query_cache: OrderedDict[str, array] = OrderedDict()
+        self._unavailable_until = 0.0
+        self._dirty = False
+
+    def __contains__(self, ex_id: int) -> bool:
+        return ex_id in self._id_set
+
+    async def async_ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        data = await self._store.async_load()
+        if isinstance(data, dict) and data.get("model") == self.model and data.get("dim"):
+            dim = int(data["dim"])
+            flat = array("f")
+            flat.frombytes(base64.b64decode(data.get("vectors", "")))
+            ids = [int(i) for i in data.get("ids", [])]
+            if len(flat) == dim * len(ids):
+                self._dim = dim
+                self._ids = ids
+                self._id_set = set(ids)
+                self._rows = [flat[i * dim : (i + 1) * dim] for i in range(len(ids))]
+        self._loaded = True
+
+    async def async_add(self, items: list[tuple[int, str]]) -> None:
+        """Calcula y guarda el embedding de (id, texto) para cada ejemplo."""
+        if not items:
+            return
+        await self.async_ensure_loaded()
+        vectors = await self.client.async_embeddings(
+            model=self.model, inputs=[text for _, text in items], request_timeout=_EMBEDDING_TIMEOUT * 4
+        )
+        for (ex_id, _), vec in zip(items, vectors):
+            if not vec or (self._dim and len(vec) != self._dim):
+                continue
+            self._dim = len(vec)
+            self._ids.append(ex_id)
+            self._id_set.add(ex_id)
+            self._rows.append(_normalize(vec))
+        self._matrix = None
+        self._schedule_save()
+
+    def remove(self, ex_ids: set[int]) -> None:
+        keep = [(i, row) for i, row in zip(self._ids, self._rows) if i not in ex_ids]
+        if len(keep) == len(self._ids):
+            return
+        self._ids = [i for i, _ in keep]
+        self._id_set -= ex_ids
+        self._rows = [row for _, row in keep]
+        self._matrix = None
+        self._schedule_save()
+
+    def clear(self) -> None:
+        self._ids, self._rows, self._matrix, self._dim = [], [], None, 0
+        self._id_set = set()
+        self._schedule_save()
+
+    async def async_search(self, query_text: str, k: int) -> list[int] | None:
+        """Ids de los k ejemplos más similares, o None si no se pudo consultar."""
+        await self.async_ensure_loaded()
+        if not self._ids:
+            return None
+        query = await self._async_query_vector(query_text)
+        if query is None or len(query) != self._dim:
+            return None
+
+        if np is not None:
+            if self._matrix is None:
+                self._matrix = np.frombuffer(b"".join(r.tobytes() for r in self._rows), dtype=np.float32).reshape(
+                    len(self._rows), self._dim
+                )
+            scores = self._matrix @ np.frombuffer(query.tobytes(), dtype=np.float32)
+            k = min(k, len(self._ids))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [self._ids[i] for i in top.tolist()]
+
+        scored = ((sum(a * b for a, b in zip(row, query)), ex_id) for ex_id, row in zip(self._ids, self._rows))
+        return [ex_id for _, ex_id in heapq.nlargest(k, scored)]
+
+    async def _async_query_vector(self, text: str) -> array | None:
+        key = hashlib.sha1(text.strip().lower().encode("utf-8")).hexdigest()
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            self._query_cache.move_to_end(key)
+            return cached
+        if time.monotonic() < self._unavailable_until:
+            return None
+        try:
+            vectors = await self.client.async_embeddings(
+                model=self.model, inputs=[text], request_timeout=_EMBEDDING_TIMEOUT
+            )
+        except Exception as err:  # noqa: BLE001
+            _LOGGER.debug("Embeddings no disponibles (%s); se usa BM25 durante %d s", err, _EMBEDDING_BACKOFF)
+            self._unavailable_until = time.monotonic() + _EMBEDDING_BACKOFF
+            return None
+        if not vectors or not vectors[0]:
+            self._unavailable_until = time.monotonic() + _EMBEDDING_BACKOFF
+            return None
+        vec = _normalize(vectors[0])
+        self._query_cache[key] = vec
+        if len(self._query_cache) > _QUERY_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
+        return vec
+
+    async def async_flush(self) -> None:
+        """Escribe ya el guardado diferido pendiente, si lo hay."""
+        if self._dirty:
+            await self._store.async_save(self._data_to_save())
+
+    def _schedule_save(self) -> None:
+        self._dirty = True
+        self._store.async_delay_save(self._data_to_save, 10)
+
+    def _data_to_save(self) -> dict[str, Any]:
+        self._dirty = False
+        flat = array("f")
+        for row in self._rows:
+            flat.extend(row)
+        return {
+            "model": self.model,
+            "dim": self._dim,
+            "ids": self._ids,
+            "vectors": base64.b64encode(flat.tobytes()).decode("ascii"),
+        }
+
 
 class ICLStore:
-    """Almacenamiento simple de ejemplos ICL por entry."""
+    """Almacenamiento simple de ejemplos ICL por entry.
 
-    def __init__(self, hass: HomeAssistant, entry_id: str, *, max_store: int = 200) -> None:
+    Mantiene un índice invertido (BM25) sobre el texto del usuario que se
+    actualiza al agregar o recortar ejemplos, así la búsqueda solo recorre
+    los ejemplos que comparten algún término con la consulta.
+
+    Con save_delay > 0 las escrituras se difieren y agrupan (Store.async_delay_save);
+    los ejemplos viven en un deque acotado, así que agregar cuesta O(1).
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        *,
+        max_store: int = 200,
+        save_delay: float = 0,
+        vector_index: ICLVectorIndex | None = None,
+    ) -> None:
         self.hass = hass
+        self.vector_index = vector_index
         self.entry_id = entry_id
         self.max_store = max_store
+        self.save_delay = save_delay
         self._store = Store(hass, 1, f"lemonade_conversation_icl_{entry_id}.json")
         self._loaded = False
-        self._data: dict[str, Any] = {"examples": []}
+        self._dirty = False
+        self._examples: Deque[dict[str, Any]] = deque(maxlen=max_store)
+        self._next_id = 0
+        self._examples_by_id: dict[int, dict[str, Any]] = {}
+        self._postings: dict[str, dict[int, int]] = {}
+        self._doc_len: dict[int, int] = {}
+        self._total_len = 0
 
     async def async_ensure_loaded(self) -> None:
         if self._loaded:
             return
         data = await self._store.async_load()
         if isinstance(data, dict) and "examples" in data and isinstance(data["examples"], list):
-            self._data = data
+            self._examples = deque(data["examples"], maxlen=self.max_store)
+            self._next_id = int(data.get("next_id", 0))
+        self._reindex()
         self._loaded = True
+        if self.vector_index is not None:
+            self.hass.async_create_background_task(
+                self._async_backfill_vectors(), f"lemonade_conversation_icl_vectors_{self.entry_id}"
+            )
+
+    async def _async_backfill_vectors(self) -> None:
+        """Calcula embeddings de ejemplos que aún no los tienen (p. ej. al activar la función)."""
+        try:
+            await self.vector_index.async_ensure_loaded()
+            missing = [(e["id"], str(e.get("user", ""))) for e in self._examples if e["id"] not in self.vector_index]
+            await self.vector_index.async_add(missing)
+        except Exception as err:  # noqa: BLE001
+            _LOGGER.debug("No se pudieron calcular embeddings ICL: %s", err)
 
     async def async_add_example(
         self,
@@ -32,38 +287,209 @@ class ICLStore:
         user_text: str,
         assistant_text: str,
         tools_used: list[str] | None = None,
+        tool_calls: list[dict[str, Any]] | None = None,
         tags: list[str] | None = None,
     ) -> None:
+        """Guarda un ejemplo; tool_calls lleva name, arguments y result de cada llamada del turno."""
         await self.async_ensure_loaded()
+        calls = _example_tool_calls(tool_calls or [])
         ex = {
+            "id": self._next_id,
             "ts": time.time(),
             "user": user_text,
             "assistant": assistant_text,
-            "tools": tools_used or [],
+            "tools": tools_used or [c["name"] for c in calls],
+            "tool_calls": calls,
             "tags": tags or [],
         }
-        self._data["examples"].append(ex)
-        # recortar
-        if len(self._data["examples"]) > self.max_store:
-            self._data["examples"] = self._data["examples"][-self.max_store :]
-        await self._store.async_save(self._data)
+        self._next_id += 1
+        # recortar: el deque descarta el más antiguo al llenarse
+        if len(self._examples) == self._examples.maxlen:
+            evicted = self._examples[0]
+            self._unindex(evicted)
+            if self.vector_index is not None:
+                self.vector_index.remove({evicted["id"]})
+        self._examples.append(ex)
+        self._index(ex)
+        await self._async_schedule_save()
+        if self.vector_index is not None:
+            # Embedding calculado una sola vez, al capturar
+            try:
+                await self.vector_index.async_add([(ex["id"], user_text)])
+            except Exception as err:  # noqa: BLE001
+                _LOGGER.debug("No se pudo calcular el embedding del ejemplo: %s", err)
 
     async def async_clear(self) -> None:
-        self._data = {"examples": []}
-        await self._store.async_save(self._data)
+        self._examples.clear()
+        if self.vector_index is not None:
+            self.vector_index.clear()
+        self._reindex()
+        await self._store.async_save(self._data_to_save())
+        self._dirty = False
+
+    async def async_flush(self) -> None:
+        """Escribe ya cualquier guardado diferido pendiente (ejemplos y vectores)."""
+        if self._dirty:
+            await self._store.async_save(self._data_to_save())
+            self._dirty = False
+        if self.vector_index is not None:
+            await self.vector_index.async_flush()
+
+    async def _async_schedule_save(self) -> None:
+        if self.save_delay <= 0:
+            await self._store.async_save(self._data_to_save())
+            return
+        self._dirty = True
+        self._store.async_delay_save(self._data_to_save, self.save_delay)
+
+    def _data_to_save(self) -> dict[str, Any]:
+        self._dirty = False
+        return {"examples": list(self._examples), "next_id": self._next_id}
+
+    async def async_get_examples(self, query_text: str, k: int) -> list[dict[str, Any]]:
+        """Retorna hasta k ejemplos, del más relevante al menos relevante.
+
+        Cada ejemplo trae id, user, assistant y, si el turno usó tools, tool_calls.
 
-    async def async_get_examples(self, query_text: str, k: int) -> list[dict[str, str]]:
-        """Retorna hasta k ejemplos. Estrategia simple: más recientes.
-        Si querés algo mejor, se puede hacer keyword overlap sin dependencias.
+        Con índice vectorial usa similitud coseno de embeddings; si no hay o falla,
+        puntúa con BM25 solo los ejemplos que comparten términos con la consulta.
+        Si no alcanzan k, completa con los más recientes.
         """
         await self.async_ensure_loaded()
-        exs = list(self._data.get("examples", []))
-        exs.sort(key=lambda e: e.get("ts", 0), reverse=True)
+        if k <= 0:
+            return []
+        ranked: list[int] | None = None
+        if self.vector_index is not None:
+            ranked = await self.vector_index.async_search(query_text, k)
+            if ranked is not None:
+                ranked = [ex_id for ex_id in ranked if ex_id in self._examples_by_id]
+        if ranked is None:
+            ranked = self._search(query_text, k)
+        if len(ranked) < k:
+            chosen = set(ranked)
+            for e in reversed(self._examples):
+                if len(ranked) >= k:
+                    break
+                if e["id"] not in chosen:
+                    ranked.append(e["id"])
         # devolver como pares chat-style
-        out: list[dict[str, str]] = []
-        for e in exs[: max(k, 0)]:
+        out: list[dict[str, Any]] = []
+        for ex_id in ranked:
+            e = self._examples_by_id[ex_id]
             u = str(e.get("user", "")).strip()
             a = str(e.get("assistant", "")).strip()
             if u and a:
-                out.append({"user": u, "assistant": a})
+                example: dict[str, Any] = {"id": ex_id, "user": u, "assistant": a}
+                if e.get("tool_calls"):
+                    example["tool_calls"] = e["tool_calls"]
+                out.append(example)
         return out
+
+    async def async_has_similar(self, user_text: str, threshold: float) -> bool:
+        """True si ya hay un ejemplo casi idéntico (Jaccard de términos >= threshold)."""
+        await self.async_ensure_loaded()
+        terms = set(tokenize(user_text))
+        if not terms:
+            return True
+        candidates: set[int] = set()
+        for term in terms:
+            candidates.update(self._postings.get(term, ()))
+        for ex_id in candidates:
+            other = set(tokenize(str(self._examples_by_id[ex_id].get("user", ""))))
+            if len(terms & other) / len(terms | other) >= threshold:
+                return True
+        return False
+
+    def _search(self, query_text: str, k: int) -> list[int]:
+        n_docs = len(self._doc_len)
+        if not n_docs:
+            return []
+        avg_len = self._total_len / n_docs or 1.0
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query_text)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for ex_id, tf in postings.items():
+                norm = tf + _BM25_K1 * (1 - _BM25_B + _BM25_B * self._doc_len[ex_id] / avg_len)
+                scores[ex_id] = scores.get(ex_id, 0.0) + idf * tf * (_BM25_K1 + 1) / norm
+        return [ex_id for ex_id, _ in heapq.nlargest(k, scores.items(), key=lambda item: item[1])]
+
+    def _reindex(self) -> None:
+        self._postings = {}
+        self._doc_len = {}
+        self._total_len = 0
+        self._examples_by_id = {}
+        examples = self._examples
+        # Ejemplos guardados por versiones anteriores no tienen id
+        # Los ids nunca se reutilizan (ni tras borrar), porque el índice vectorial los referencia
+        self._next_id = max(
+            self._next_id, max((e["id"] for e in examples if isinstance(e.get("id"), int)), default=-1) + 1
+        )
+        for e in examples:
+            if not isinstance(e.get("id"), int):
+                e["id"] = self._next_id
+                self._next_id += 1
+            self._index(e)
+
+    def _index(self, ex: dict[str, Any]) -> None:
+        ex_id = ex["id"]
+        terms = tokenize(str(ex.get("user", "")))
+        self._examples_by_id[ex_id] = ex
+        self._doc_len[ex_id] = len(terms)
+        self._total_len += len(terms)
+        for term in terms:
+            postings = self._postings.setdefault(term, {})
+            postings[ex_id] = postings.get(ex_id, 0) + 1
+
+    def _unindex(self, ex: dict[str, Any]) -> None:
+        ex_id = ex["id"]
+        self._examples_by_id.pop(ex_id, None)
+        self._total_len -= self._doc_len.pop(ex_id, 0)
+        for term in set(tokenize(str(ex.get("user", "")))):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(ex_id, None)
+            if not postings:
+                del self._postings[term]
+
+
+class ICLCaptureQueue:
+    """Captura turnos exitosos como ejemplos ICL fuera del camino de respuesta.
+
+    enqueue() no bloquea: el turno se encola y un worker en segundo plano
+    descarta casi-duplicados antes de guardarlo en el ICLStore. Los turnos
+    que usaron tools guardan también sus llamadas, para que el ejemplo
+    enseñe a actuar y no solo a contestar "Listo, encendí…".
+    """
+
+    def __init__(self, store: ICLStore, *, maxsize: int = 64, similarity: float = 0.85) -> None:
+        self._store = store
+        self._similarity = similarity
+        self._queue: asyncio.Queue[tuple[str, str, list[dict[str, Any]]]] = asyncio.Queue(maxsize=maxsize)
+
+    @callback
+    def enqueue(self, user_text: str, assistant_text: str, tool_calls: list[dict[str, Any]]) -> None:
+        try:
+            self._queue.put_nowait((user_text, assistant_text, tool_calls))
+        except asyncio.QueueFull:
+            _LOGGER.debug("Cola de captura ICL llena; se descarta el turno")
+
+    async def async_run(self) -> None:
+        while True:
+            user_text, assistant_text, tool_calls = await self._queue.get()
+            try:
+                if await self._store.async_has_similar(user_text, self._similarity):
+                    continue
+                await self._store.async_add_example(
+                    user_text=user_text,
+                    assistant_text=assistant_text,
+                    tool_calls=tool_calls,
+                    tags=["auto"],
+                )
+            except Exception:  # noqa: BLE001
+                _LOGGER.exception("Error capturando ejemplo ICL")
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, callback
+
+# Turnos recientes sobre los que se calculan los percentiles
+METRICS_WINDOW = 500
+
+# Series agregadas: las latencias en ms, los tokens en unidades
+SERIES = (
+    "turn_ms",
+    "admission_ms",
+    "icl_ms",
+    "prompt_build_ms",
+    "llm_ms",
+    "llm_ttft_ms",
+    "tool_ms",
+    "prompt_tokens",
+    "completion_tokens",
+)
+
+
+@dataclass
+class Span:
+    name: str
+    duration_ms: float
+    attrs: dict[str, Any] = field(default_factory=dict)
+
+
+class TurnTrace:
+    """Spans de un turno: construcción del prompt, ICL, cada llamada al LLM y cada tool."""
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.spans: list[Span] = []
+        self.outcome = "llm"
+
+    def add(self, name: str, duration_ms: float, **attrs: Any) -> None:
+        self.spans.append(Span(name, duration_ms, attrs))
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[dict[str, Any]]:
+        """Mide el bloque; el dict devuelto admite atributos adicionales (tokens, TTFT...)."""
+        started = time.monotonic()
+        try:
+            yield attrs
+        finally:
+            self.add(name, (time.monotonic() - started) * 1000, **attrs)
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self.started) * 1000
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "outcome": self.outcome,
+            "total_ms": round(self.elapsed_ms, 1),
+            "spans": [{"name": s.name, "ms": round(s.duration_ms, 1), **s.attrs} for s in self.spans],
+        }
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not values:
+        return 0.0
+    idx = min(len(values) - 1, max(0, round(pct / 100 * len(values) + 0.5) - 1))
+    return values[idx]
+
+
+class MetricsRecorder:
+    """Agrega los TurnTrace en ventanas deslizantes y notifica a los sensores."""
+
+    def __init__(self, window: int = METRICS_WINDOW) -> None:
+        self._series: dict[str, deque[float]] = {name: deque(maxlen=window) for name in SERIES}
+        self._listeners: list[Callable[[], None]] = []
+        self.turns = 0
+        self.outcomes: dict[str, int] = {}
+        self.last_turn: dict[str, Any] | None = None
+
+    @callback
+    def async_add_listener(self, update_callback: Callable[[], None]) -> CALLBACK_TYPE:
+        self._listeners.append(update_callback)
+
+        @callback
+        def _remove() -> None:
+            self._listeners.remove(update_callback)
+
+        return _remove
+
+    @callback
+    def async_record(self, trace: TurnTrace) -> None:
+        self.turns += 1
+        self.outcomes[trace.outcome] = self.outcomes.get(trace.outcome, 0) + 1
+        self._series["turn_ms"].append(trace.elapsed_ms)
+        for span in trace.spans:
+            if span.name == "llm":
+                self._series["llm_ms"].append(span.duration_ms)
+                for key in ("llm_ttft_ms", "prompt_tokens", "completion_tokens"):
+                    value = span.attrs.get(key.removeprefix("llm_"))
+                    if isinstance(value, (int, float)):
+                        self._series[key].append(value)
+            elif (key := f"{span.name}_ms") in self._series:
+                self._series[key].append(span.duration_ms)
+        self.last_turn = trace.as_dict()
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    def percentiles(self, series: str) -> dict[str, float]:
+        values = sorted(self._series[series])
+        return {
+            "count": len(values),
+            "p50": round(_percentile(values, 50), 1),
+            "p95": round(_percentile(values, 95), 1),
+            "p99": round(_percentile(values, 99), 1),
+        }
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "turns": self.turns,
+            "outcomes": dict(self.outcomes),
+            "series": {name: self.percentiles(name) for name in SERIES},
+            "last_turn": self.last_turn,
+        }
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    DATA_MODEL_CATALOGS,
+    DEFAULT_MODEL_SUPPORTS_TOOLS,
+    DOMAIN,
+    MODEL_TOOLS_AUTO,
+    MODEL_TOOLS_OFF,
+    MODEL_TOOLS_ON,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Tras este tiempo el catálogo se sirve igualmente pero se refresca en segundo plano
+CATALOG_TTL = 300
+
+_TOOL_LABELS = frozenset(("tool-calling", "tool_calling", "tools", "function-calling"))
+
+
+@dataclass
+class ModelInfo:
+    """Modelo publicado por /models y sus capacidades conocidas (None = desconocida)."""
+
+    id: str
+    recipe: str = "unknown"
+    context_length: int | None = None
+    tool_calling: bool | None = None
+    streaming: bool | None = None
+    probed: bool = False
+
+
+def tools_option(value: Any) -> str:
+    """Normaliza CONF_MODEL_SUPPORTS_TOOLS; los booleanos de entries antiguas se respetan tal cual."""
+    if isinstance(value, bool):
+        return MODEL_TOOLS_ON if value else MODEL_TOOLS_OFF
+    if value in (MODEL_TOOLS_AUTO, MODEL_TOOLS_ON, MODEL_TOOLS_OFF):
+        return value
+    return DEFAULT_MODEL_SUPPORTS_TOOLS
+
+
+def _parse_models(data: Any) -> list[ModelInfo]:
+    models: list[ModelInfo] = []
+    if isinstance(data, dict) and isinstance(data.get("data"), list):
+        for item in data["data"]:
+            if not isinstance(item, dict) or not isinstance(item.get("id"), str):
+                continue
+            info = ModelInfo(id=item["id"], recipe=item.get("recipe") or "unknown")
+            labels = item.get("labels")
+            if isinstance(labels, list) and labels:
+                info.tool_calling = any(str(label).lower() in _TOOL_LABELS for label in labels)
+            meta = item.get("meta") if isinstance(item.get("meta"), dict) else {}
+            for ctx in (item.get("context_length"), item.get("max_context_length"), meta.get("n_ctx_train")):
+                if isinstance(ctx, int) and ctx > 0:
+                    info.context_length = ctx
+                    break
+            models.append(info)
+    if not models and isinstance(data, list):
+        models = [ModelInfo(id=str(m)) for m in data]
+    return models
+
+
+class ModelCatalog:
+    """Catálogo de modelos de un servidor, cacheado con TTL y compartido por todo HA.
+
+    Una única descarga de /models sirve al config flow, al options flow y a
+    los agentes. Cuando caduca se sigue sirviendo mientras se refresca en
+    segundo plano; las capacidades sondeadas sobreviven a los refrescos.
+    """
+
+    def __init__(self, hass: HomeAssistant, base_url: str) -> None:
+        self.hass = hass
+        self.base_url = base_url
+        self._models: dict[str, ModelInfo] = {}
+        self._fetched_at: float | None = None
+        self._inflight: asyncio.Future[list[ModelInfo]] | None = None
+
+    def get(self, model_id: str) -> ModelInfo | None:
+        return self._models.get(model_id)
+
+    async def async_get_models(
+        self, fetch: Callable[[], Awaitable[Any]], *, force: bool = False
+    ) -> list[ModelInfo]:
+        if self._fetched_at is None or force:
+            return await self._async_refresh(fetch)
+        if time.monotonic() - self._fetched_at > CATALOG_TTL and self._inflight is None:
+            self.hass.async_create_background_task(
+                self._async_refresh_quietly(fetch), f"{DOMAIN}_models_refresh"
+            )
+        return list(self._models.values())
+
+    async def _async_refresh(self, fetch: Callable[[], Awaitable[Any]]) -> list[ModelInfo]:
+        # Peticiones concurrentes comparten una única descarga
+        if self._inflight is not None:
+            return await asyncio.shield(self._inflight)
+        self._inflight = self.hass.loop.create_future()
+        try:
+            models = _parse_models(await fetch())
+        except BaseException as err:
+            self._inflight.set_exception(err)
+            # Marcar la excepción como recuperada si nadie más esperaba
+            self._inflight.exception()
+            raise
+        else:
+            for info in models:
+                if (old := self._models.get(info.id)) is not None and old.probed:
+                    # Lo sondeado manda sobre las etiquetas; si el sondeo no concluyó, quedan las etiquetas
+                    info.tool_calling = old.tool_calling if old.tool_calling is not None else info.tool_calling
+                    info.streaming = old.streaming
+                    info.probed = True
+            self._models = {info.id: info for info in models}
+            self._fetched_at = time.monotonic()
+            self._inflight.set_result(models)
+            return list(models)
+        finally:
+            self._inflight = None
+
+    async def _async_refresh_quietly(self, fetch: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            await self._async_refresh(fetch)
+        except Exception as err:  # noqa: BLE001
+            _LOGGER.debug("No se pudo refrescar el catálogo de %s: %s", self.base_url, err)
+
+    def record_probe(self, model_id: str, *, tool_calling: bool | None, streaming: bool | None) -> None:
+        info = self._models.setdefault(model_id, ModelInfo(id=model_id))
+        if tool_calling is not None:
+            info.tool_calling = tool_calling
+        if streaming is not None:
+            info.streaming = streaming
+        info.probed = True
+
+
+def async_get_catalog(hass: HomeAssistant, base_url: str) -> ModelCatalog:
+    catalogs: dict[str, ModelCatalog] = hass.data.setdefault(DATA_MODEL_CATALOGS, {})
+    base_url = base_url.rstrip("/")
+    if base_url not in catalogs:
+        catalogs[base_url] = ModelCatalog(hass, base_url)
+    return catalogs[base_url]
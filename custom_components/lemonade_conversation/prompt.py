@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from typing import Any
+
+from .encoding import json_bytes
+
+# Heurística sin tokenizer: ~4 caracteres por token en español/inglés
+_CHARS_PER_TOKEN = 4
+# Tokens de plantilla por mensaje (rol, separadores)
+_MESSAGE_OVERHEAD = 4
+_TRUNCATION_MARK = " …[recortado]"
+# Resultado que se muestra en un ejemplo ICL cuando no se guardó el real (era largo)
+_ICL_TOOL_RESULT = '{"result":"ok"}'
+
+
+def estimate_tokens(text: str | None) -> int:
+    if not text:
+        return 0
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+
+def estimate_message_tokens(msg: dict[str, Any]) -> int:
+    content = msg.get("content")
+    tokens = _MESSAGE_OVERHEAD + estimate_tokens(content if isinstance(content, str) else None)
+    for call in msg.get("tool_calls") or []:
+        fn = call.get("function") or {}
+        tokens += estimate_tokens(fn.get("name")) + estimate_tokens(str(fn.get("arguments") or ""))
+    return tokens
+
+
+def estimate_tools_tokens(tools: list[dict[str, Any]] | None) -> int:
+    if not tools:
+        return 0
+    return (len(json_bytes(tools)) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+
+def system_message(content: str) -> dict[str, Any]:
+    return {"role": "system", "content": content}
+
+
+def _icl_messages(ex: dict[str, Any]) -> list[dict[str, Any]]:
+    """Mensajes de un ejemplo ICL; si usó tools, la llamada y su resultado van antes de la respuesta."""
+    messages: list[dict[str, Any]] = [{"role": "user", "content": ex["user"]}]
+    calls = ex.get("tool_calls") or []
+    if calls:
+        ids = [f"icl_{ex.get('id', 0)}_{i}" for i in range(len(calls))]
+        messages.append(
+            {
+                "role": "assistant",
+                "content": "",
+                "tool_calls": [
+                    {"id": call_id, "type": "function", "function": {"name": c["name"], "arguments": c["arguments"]}}
+                    for call_id, c in zip(ids, calls)
+                ],
+            }
+        )
+        for call_id, c in zip(ids, calls):
+            messages.append(
+                {"role": "tool", "tool_call_id": call_id, "name": c["name"], "content": c.get("result") or _ICL_TOOL_RESULT}
+            )
+    messages.append({"role": "assistant", "content": ex["assistant"]})
+    return messages
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """Recorta un texto a max_tokens (aprox.), marcando el corte."""
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text
+    keep = max(max_tokens * _CHARS_PER_TOKEN - len(_TRUNCATION_MARK), 0)
+    return text[:keep] + _TRUNCATION_MARK
+
+
+def _truncate_message(msg: dict[str, Any], max_tokens: int) -> dict[str, Any]:
+    content = msg.get("content")
+    # Los resultados de tools son JSON: recortarlos a medias los vuelve inválidos
+    if msg.get("role") == "tool" or not isinstance(content, str) or estimate_tokens(content) <= max_tokens:
+        return msg
+    return {**msg, "content": truncate_text(content, max_tokens)}
+
+
+def assemble_prompt(
+    *,
+    head: list[dict[str, Any]],
+    icl_examples: list[dict[str, Any]],
+    history: list[dict[str, Any]],
+    user_message: dict[str, Any],
+    tools: list[dict[str, Any]] | None,
+    budget: int,
+    max_message_tokens: int,
+    icl_after_history: bool = False,
+) -> list[dict[str, Any]]:
+    """Arma los mensajes respetando un presupuesto de tokens del prompt.
+
+    Prioridad: system (head), mensaje del usuario y esquema de tools siempre
+    entran; luego el historial del más reciente al más antiguo y por último los
+    ejemplos ICL (recibidos del mejor al peor). Lo de menor prioridad es lo
+    primero en quedar fuera. Con budget <= 0 no se recorta nada.
+
+    Los ejemplos ICL cambian con cada consulta; con icl_after_history van
+    detrás del historial, junto al mensaje del usuario, para que todo lo
+    anterior sea un prefijo idéntico entre turnos (caché de prefijo). Sin
+    tools en la petición se omiten los ejemplos que las usaron.
+    """
+    if not tools:
+        icl_examples = [ex for ex in icl_examples if not ex.get("tool_calls")]
+    if budget <= 0:
+        icl_messages = [m for ex in reversed(icl_examples) for m in _icl_messages(ex)]
+        if icl_after_history:
+            return [*head, *history, *icl_messages, user_message]
+        return [*head, *icl_messages, *history, user_message]
+
+    remaining = budget - estimate_tools_tokens(tools) - estimate_message_tokens(user_message)
+    remaining -= sum(estimate_message_tokens(m) for m in head)
+
+    kept_history: list[dict[str, Any]] = []
+    for msg in reversed(history):
+        msg = _truncate_message(msg, max_message_tokens)
+        cost = estimate_message_tokens(msg)
+        if cost > remaining:
+            break
+        kept_history.append(msg)
+        remaining -= cost
+    kept_history.reverse()
+    # No empezar el historial con una respuesta huérfana del asistente
+    while kept_history and kept_history[0].get("role") != "user":
+        remaining += estimate_message_tokens(kept_history.pop(0))
+
+    icl_blocks: list[list[dict[str, Any]]] = []
+    for ex in icl_examples:
+        block = _icl_messages(ex)
+        cost = sum(estimate_message_tokens(m) for m in block)
+        if cost > remaining:
+            continue
+        icl_blocks.append(block)
+        remaining -= cost
+    # El mejor ejemplo queda más cerca de la pregunta del usuario
+    icl_messages = [m for block in reversed(icl_blocks) for m in block]
+
+    if icl_after_history:
+        return [*head, *kept_history, *icl_messages, user_message]
+    return [*head, *icl_messages, *kept_history, user_message]
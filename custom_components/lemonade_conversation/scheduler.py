@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from homeassistant.exceptions import HomeAssistantError
+
+# Menor valor = más prioridad
+PRIORITY_INTERACTIVE = 0  # voz / usuario en la UI
+PRIORITY_AUTOMATION = 1  # conversation.process desde automatizaciones
+PRIORITY_MAINTENANCE = 2  # trabajo propio en segundo plano (warmup, resúmenes)
+
+# Con un único hueco, margen que conserva un mantenimiento en curso cuando llega tráfico real (s)
+MAINTENANCE_GRACE = 5
+
+
+class SchedulerBusyError(HomeAssistantError):
+    """La petición no fue admitida: cola llena, desplazada o espera agotada."""
+
+
+class RequestScheduler:
+    """Control de admisión por entry delante del LLM.
+
+    Como mucho `max_concurrency` turnos usan el modelo a la vez; el resto
+    espera en una cola ordenada por prioridad y llegada. La cola está acotada:
+    si está llena, una petición entrante desplaza a la última de menor
+    prioridad o, si no la hay, se rechaza. Ninguna espera más de `max_wait`.
+
+    El mantenimiento ocupa como mucho `max_concurrency - 1` huecos, de modo
+    que siempre queda uno libre para el tráfico real. Con un único hueco solo
+    se admite si no hay nada más en cola, y en cuanto llega una petición de
+    más prioridad le quedan MAINTENANCE_GRACE segundos antes de cortarse con
+    TimeoutError.
+    """
+
+    def __init__(self, *, max_concurrency: int, max_queue: int, max_wait: float) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.max_maintenance = max(1, self.max_concurrency - 1)
+        self._active = 0
+        self._maintenance_active = 0
+        self._queue: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._maintenance_deadlines: set[asyncio.Timeout] = set()
+        self._seq = itertools.count()
+        self._waits: deque[float] = deque(maxlen=256)
+        self.admitted = 0
+        self.shed = 0
+        self.timeouts = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, fut in self._queue if not fut.done())
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        waits = sorted(self._waits)
+        return {
+            "active": self._active,
+            "maintenance_active": self._maintenance_active,
+            "queue_depth": self.queue_depth,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "timeouts": self.timeouts,
+            "wait_ms_p50": round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+            "wait_ms_max": round(waits[-1] * 1000, 1) if waits else 0.0,
+        }
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_AUTOMATION) -> AsyncIterator[None]:
+        await self.async_acquire(priority)
+        try:
+            if priority != PRIORITY_MAINTENANCE or self.max_concurrency > 1:
+                yield
+                return
+            # Único hueco: el tráfico real que llegue acorta este plazo (_preempt_maintenance)
+            async with asyncio.timeout(None) as deadline:
+                self._maintenance_deadlines.add(deadline)
+                try:
+                    yield
+                finally:
+                    self._maintenance_deadlines.discard(deadline)
+        finally:
+            self.release(priority)
+
+    async def async_acquire(self, priority: int = PRIORITY_AUTOMATION) -> None:
+        started = time.monotonic()
+        if self._can_admit(priority) and not any(e[0] <= priority for e in self._queue if not e[2].done()):
+            self._admit(priority)
+            self._waits.append(time.monotonic() - started)
+            return
+
+        if self.queue_depth >= self.max_queue:
+            self._shed_for(priority)
+
+        fut: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._seq), fut)
+        heapq.heappush(self._queue, entry)
+        if priority < PRIORITY_MAINTENANCE:
+            self._preempt_maintenance()
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), self.max_wait)
+        except (TimeoutError, asyncio.CancelledError) as err:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                # Admitida justo al expirar: ceder el hueco al siguiente
+                self.release(priority)
+            else:
+                fut.cancel()
+            self._discard(entry)
+            if isinstance(err, asyncio.CancelledError):
+                raise
+            self.timeouts += 1
+            raise SchedulerBusyError("Tiempo de espera en cola agotado") from None
+        self._waits.append(time.monotonic() - started)
+
+    def release(self, priority: int = PRIORITY_AUTOMATION) -> None:
+        self._active -= 1
+        if priority == PRIORITY_MAINTENANCE:
+            self._maintenance_active -= 1
+        while self._queue:
+            entry_priority, _, fut = self._queue[0]
+            if fut.done():
+                heapq.heappop(self._queue)
+                continue
+            # La cola va por prioridad: si la primera no cabe, las siguientes tampoco
+            if not self._can_admit(entry_priority):
+                break
+            heapq.heappop(self._queue)
+            self._admit(entry_priority)
+            fut.set_result(None)
+
+    def _can_admit(self, priority: int) -> bool:
+        if self._active >= self.max_concurrency:
+            return False
+        if priority == PRIORITY_MAINTENANCE:
+            return self._maintenance_active < self.max_maintenance
+        return True
+
+    def _admit(self, priority: int) -> None:
+        self._active += 1
+        self.admitted += 1
+        if priority == PRIORITY_MAINTENANCE:
+            self._maintenance_active += 1
+
+    def _preempt_maintenance(self) -> None:
+        limit = asyncio.get_running_loop().time() + MAINTENANCE_GRACE
+        for deadline in self._maintenance_deadlines:
+            if (when := deadline.when()) is None or when > limit:
+                deadline.reschedule(limit)
+
+    def _shed_for(self, priority: int) -> None:
+        """Hace sitio en la cola llena o rechaza al entrante."""
+        pending = [e for e in self._queue if not e[2].done()]
+        victim = max(pending, key=lambda e: (e[0], e[1]), default=None)
+        self.shed += 1
+        if victim is None or victim[0] <= priority:
+            raise SchedulerBusyError("Cola de peticiones llena")
+        victim[2].set_exception(SchedulerBusyError("Desplazada por una petición de mayor prioridad"))
+        self._discard(victim)
+
+    def _discard(self, entry: tuple[int, int, asyncio.Future[None]]) -> None:
+        try:
+            self._queue.remove(entry)
+        except ValueError:
+            return
+        heapq.heapify(self._queue)
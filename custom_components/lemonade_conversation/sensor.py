@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.components.sensor import SensorEntity, SensorEntityDescription, SensorStateClass
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN
+from .conversation import LemonadeConversationAgent, async_get_agent_for_entry
+
+
+@dataclass(frozen=True, kw_only=True)
+class LemonadeMetricDescription(SensorEntityDescription):
+    series: str
+
+
+# Estado = p50 de la ventana; p95/p99 y el número de muestras como atributos
+SENSORS: tuple[LemonadeMetricDescription, ...] = (
+    LemonadeMetricDescription(key="turn_latency", translation_key="turn_latency", series="turn_ms"),
+    LemonadeMetricDescription(key="llm_latency", translation_key="llm_latency", series="llm_ms"),
+    LemonadeMetricDescription(key="llm_ttft", translation_key="llm_ttft", series="llm_ttft_ms"),
+    LemonadeMetricDescription(key="tool_latency", translation_key="tool_latency", series="tool_ms"),
+    LemonadeMetricDescription(key="queue_wait", translation_key="queue_wait", series="admission_ms"),
+    LemonadeMetricDescription(
+        key="prompt_tokens", translation_key="prompt_tokens", series="prompt_tokens", native_unit_of_measurement="tokens"
+    ),
+    LemonadeMetricDescription(
+        key="completion_tokens",
+        translation_key="completion_tokens",
+        series="completion_tokens",
+        native_unit_of_measurement="tokens",
+    ),
+)
+
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback) -> None:
+    agent = async_get_agent_for_entry(hass, entry)
+    async_add_entities(LemonadeMetricSensor(agent, entry, description) for description in SENSORS)
+
+
+class LemonadeMetricSensor(SensorEntity):
+    """Percentiles de una serie de MetricsRecorder; se actualiza al terminar cada turno."""
+
+    entity_description: LemonadeMetricDescription
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, agent: LemonadeConversationAgent, entry: ConfigEntry, description: LemonadeMetricDescription) -> None:
+        self.entity_description = description
+        self._agent = agent
+        self._attr_unique_id = f"{entry.entry_id}_{description.key}"
+        if description.native_unit_of_measurement is None:
+            self._attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=entry.title,
+            manufacturer="Lemonade",
+            model=agent.model or None,
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(self._agent.metrics.async_add_listener(self.async_write_ha_state))
+
+    @property
+    def native_value(self) -> float | None:
+        stats = self._agent.metrics.percentiles(self.entity_description.series)
+        return stats["p50"] if stats["count"] else None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        stats = self._agent.metrics.percentiles(self.entity_description.series)
+        return {"p95": stats["p95"], "p99": stats["p99"], "samples": stats["count"]}
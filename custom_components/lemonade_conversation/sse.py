@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+
+try:
+    # orjson vía Home Assistant: bastante más rápido que json.loads en chunks pequeños
+    from homeassistant.util.json import json_loads
+except ImportError:  # Home Assistant antiguo
+    json_loads = json.loads
+
+
+class SSEDecoder:
+    """Decodificador incremental de Server-Sent Events sobre un buffer de bytes.
+
+    Admite trozos de cualquier tamaño (un evento puede llegar partido entre
+    varios paquetes TCP, o varios eventos en uno), terminadores LF, CRLF o CR,
+    comentarios y campos `data:` de varias líneas, que se unen con "\\n" como
+    indica la especificación. Solo se decodifica UTF-8 una vez por evento
+    completo, así que un carácter multibyte partido no se pierde.
+    """
+
+    __slots__ = ("_buf", "_data")
+
+    def __init__(self) -> None:
+        self._buf = b""
+        self._data: list[bytes] = []
+
+    def feed(self, chunk: bytes) -> list[str]:
+        """Añade bytes recibidos y devuelve el `data` de cada evento completado."""
+        buf = self._buf + chunk if self._buf else bytes(chunk)
+        hold = b""
+        if b"\r" in buf:
+            if buf[-1:] == b"\r":
+                # Puede ser la primera mitad de un CRLF: decidir con el siguiente trozo
+                buf, hold = buf[:-1], b"\r"
+            buf = buf.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        # split() en C es mucho más rápido que buscar línea a línea en Python
+        lines = buf.split(b"\n")
+        self._buf = lines.pop() + hold
+        return self._dispatch(lines)
+
+    def flush(self) -> list[str]:
+        """Cierra el stream: procesa la última línea sin terminar y despacha lo pendiente."""
+        lines = [self._buf.rstrip(b"\r")] if self._buf else []
+        self._buf = b""
+        return self._dispatch([*lines, b""])
+
+    def _dispatch(self, lines: list[bytes]) -> list[str]:
+        events: list[str] = []
+        data = self._data
+        for line in lines:
+            if not line:
+                # Línea en blanco: fin de evento
+                if data:
+                    events.append((data[0] if len(data) == 1 else b"\n".join(data)).decode("utf-8", "replace"))
+                    data = []
+            elif line.startswith(b"data:"):
+                value = line[5:]
+                data.append(value[1:] if value.startswith(b" ") else value)
+            elif line == b"data":
+                data.append(b"")
+            # Comentarios (":...") y los campos event/id/retry no se usan
+        self._data = data
+        return events
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from homeassistant.core import callback
+
+from .history import ConversationStore
+
+_LOGGER = logging.getLogger(__name__)
+
+# Mensajes descartados que se guardan como máximo por conversación si el resumen se retrasa
+_MAX_PENDING_MESSAGES = 24
+
+SUMMARY_INSTRUCTIONS = (
+    "Resume la conversación entre un usuario y un asistente de Home Assistant. "
+    "Conserva solo lo útil para continuarla: dispositivos y áreas mencionados, acciones "
+    "realizadas, preferencias del usuario y preguntas pendientes. Responde únicamente con "
+    "el resumen, en un párrafo breve y en el idioma de la conversación."
+)
+
+
+def summary_request(previous: str, messages: list[dict[str, Any]]) -> str:
+    """Texto para el LLM: el resumen acumulado más los turnos que acaban de salir del historial."""
+    lines = [
+        f"{'USUARIO' if m.get('role') == 'user' else 'ASISTENTE'}: {m.get('content') or ''}"
+        for m in messages
+    ]
+    return f"Resumen previo:\n{previous or '(ninguno)'}\n\nMensajes nuevos:\n" + "\n".join(lines)
+
+
+class HistorySummarizer:
+    """Resume en segundo plano los turnos que salen del historial de cada conversación.
+
+    enqueue() no bloquea: acumula los mensajes descartados y un worker los
+    funde con el resumen previo mediante `summarize`. Los descartes de una
+    misma conversación que llegan mientras tanto se agrupan en una sola
+    llamada. Si el resumen falla, los mensajes se conservan para el siguiente
+    intento (con un tope).
+    """
+
+    def __init__(
+        self,
+        store: ConversationStore,
+        summarize: Callable[[str, list[dict[str, Any]]], Awaitable[str]],
+    ) -> None:
+        self._store = store
+        self._summarize = summarize
+        self._pending: dict[str, list[dict[str, Any]]] = {}
+        # Mensajes de resúmenes fallidos: vuelven con el próximo descarte de su conversación
+        self._carry: dict[str, list[dict[str, Any]]] = {}
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self.summaries = 0
+        self.failures = 0
+        self.dropped = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending_conversations": len(self._pending),
+            "summaries": self.summaries,
+            "failures": self.failures,
+            "dropped": self.dropped,
+        }
+
+    @callback
+    def enqueue(self, conv_id: str, messages: list[dict[str, Any]]) -> None:
+        pending = self._pending.get(conv_id)
+        if pending is None:
+            if len(self._pending) >= self._store.max_conversations:
+                self.dropped += len(messages)
+                return
+            pending = self._pending[conv_id] = self._carry.pop(conv_id, [])
+            self._queue.put_nowait(conv_id)
+        pending.extend(messages)
+        self._trim(pending)
+
+    def _trim(self, pending: list[dict[str, Any]]) -> None:
+        if len(pending) > _MAX_PENDING_MESSAGES:
+            self.dropped += len(pending) - _MAX_PENDING_MESSAGES
+            del pending[: len(pending) - _MAX_PENDING_MESSAGES]
+
+    async def async_run(self) -> None:
+        while True:
+            conv_id = await self._queue.get()
+            messages = self._pending.pop(conv_id, [])
+            try:
+                if not messages or conv_id not in self._store:
+                    continue
+                summary = (await self._summarize(self._store.get_summary(conv_id), messages)).strip()
+                if summary and self._store.set_summary(conv_id, summary):
+                    self.summaries += 1
+            except Exception as err:  # noqa: BLE001
+                self.failures += 1
+                _LOGGER.debug("No se pudo resumir el historial de %s: %s", conv_id, err)
+                # Se reintenta junto con el próximo descarte de la misma conversación
+                if (pending := self._pending.get(conv_id)) is not None:
+                    pending[:0] = messages
+                    self._trim(pending)
+                elif len(self._carry) < self._store.max_conversations:
+                    self._trim(messages)
+                    self._carry[conv_id] = messages
+                else:
+                    self.dropped += len(messages)
+            finally:
+                self._queue.task_done()
@@ -1,12 +1,65 @@
 from __future__ import annotations
 
 import json
+from dataclasses import dataclass
 from typing import Any
 
 from homeassistant.core import HomeAssistant, Context
 from homeassistant.const import ATTR_FRIENDLY_NAME
 from homeassistant.helpers import area_registry as ar, device_registry as dr, entity_registry as er
 
+from .entity_index import EntityIndex
+
+
+DEFAULT_LIST_LIMIT = 50
+MAX_LIST_LIMIT = 200
+ENTITY_FIELDS = ("entity_id", "friendly_name", "state", "area", "domain")
+DEFAULT_ENTITY_FIELDS = ("entity_id", "friendly_name", "state")
+
+# Atributos que get_state devuelve por defecto, por dominio. Para dominios sin
+# entrada se devuelven solo los atributos escalares (se omiten listas como
+# effect_list o source_list, que inflan el contexto sin aportar).
+STATE_ATTRIBUTE_ALLOWLIST: dict[str, tuple[str, ...]] = {
+    "light": ("brightness", "color_mode", "color_temp_kelvin", "rgb_color"),
+    "climate": ("hvac_action", "current_temperature", "temperature", "target_temp_low", "target_temp_high", "preset_mode", "fan_mode"),
+    "media_player": ("volume_level", "is_volume_muted", "media_title", "media_artist", "source"),
+    "cover": ("current_position", "current_tilt_position"),
+    "fan": ("percentage", "preset_mode", "oscillating", "direction"),
+    "vacuum": ("battery_level", "status"),
+    "lock": ("changed_by",),
+    "sensor": ("unit_of_measurement", "device_class"),
+    "binary_sensor": ("device_class",),
+    "weather": ("temperature", "humidity", "wind_speed", "temperature_unit"),
+}
+
+# Encoder compacto: sin espacios tras separadores
+_COMPACT = {"ensure_ascii": False, "separators": (",", ":"), "default": str}
+
+
+@dataclass
+class ToolResult:
+    """Resultado de una tool: el JSON que recibe el modelo y el mismo contenido ya parseado."""
+
+    content: str
+    data: dict[str, Any]
+
+    @property
+    def ok(self) -> bool:
+        return "error" not in self.data
+
+    @classmethod
+    def from_content(cls, content: str) -> ToolResult:
+        try:
+            data = json.loads(content)
+        except ValueError:
+            data = {"error": content}
+        return cls(content, data if isinstance(data, dict) else {})
+
+    @classmethod
+    def error(cls, message: str) -> ToolResult:
+        data = {"error": message}
+        return cls(json.dumps(data, ensure_ascii=False), data)
+
 
 def build_tools_schema() -> list[dict[str, Any]]:
     return [
@@ -22,12 +75,22 @@ def build_tools_schema() -> list[dict[str, Any]]:
             "type": "function",
             "function": {
                 "name": "list_entities",
-                "description": "Lista entidades con área, dominio, friendly_name y estado.",
+                "description": (
+                    "Lista entidades en forma de tabla (columns + rows), paginada. "
+                    "Si next_offset no es null hay más resultados."
+                ),
                 "parameters": {
                     "type": "object",
                     "properties": {
                         "domain": {"type": "string", "description": "Filtra por dominio (light, switch, climate, etc.)."},
-                        "area": {"type": "string", "description": "Nombre o ID de área para filtrar (opcional)."}
+                        "area": {"type": "string", "description": "Nombre o ID de área para filtrar (opcional)."},
+                        "limit": {"type": "integer", "description": f"Máximo de filas (por defecto {DEFAULT_LIST_LIMIT}, máx. {MAX_LIST_LIMIT})."},
+                        "offset": {"type": "integer", "description": "Filas a saltar (paginación)."},
+                        "fields": {
+                            "type": "array",
+                            "items": {"type": "string", "enum": list(ENTITY_FIELDS)},
+                            "description": "Columnas a devolver (entity_id siempre incluido). Por defecto: entity_id, friendly_name, state.",
+                        },
                     },
                     "additionalProperties": False,
                 },
@@ -37,11 +100,16 @@ def build_tools_schema() -> list[dict[str, Any]]:
             "type": "function",
             "function": {
                 "name": "get_state",
-                "description": "Obtiene el estado y atributos de una entidad.",
+                "description": "Obtiene el estado y los atributos relevantes de una entidad.",
                 "parameters": {
                     "type": "object",
                     "properties": {
                         "entity_id": {"type": "string", "description": "ID de entidad (ej.: light.cocina)"},
+                        "attributes": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Atributos concretos a devolver (opcional; por defecto solo los relevantes del dominio).",
+                        },
                     },
                     "required": ["entity_id"],
                     "additionalProperties": False,
@@ -76,6 +144,62 @@ def _is_domain_allowed(domain: str, allowed_domains: list[str]) -> bool:
     return domain in allowed_domains
 
 
+def _as_int(value: Any, default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _entity_page(
+    hass: HomeAssistant,
+    matches: list[tuple[str, str, str | None]],
+    args: dict[str, Any],
+) -> str:
+    """Codifica (entity_id, domain, area) como tabla paginada con las columnas pedidas."""
+    requested = args.get("fields")
+    if isinstance(requested, str):
+        requested = [f.strip() for f in requested.split(",")]
+    if isinstance(requested, list):
+        fields = ["entity_id"] + [f for f in ENTITY_FIELDS if f in requested and f != "entity_id"]
+    else:
+        fields = list(DEFAULT_ENTITY_FIELDS)
+    limit = min(max(_as_int(args.get("limit"), DEFAULT_LIST_LIMIT), 1), MAX_LIST_LIMIT)
+    offset = max(_as_int(args.get("offset"), 0), 0)
+
+    page = matches[offset : offset + limit]
+    rows = []
+    for entity_id, domain, area in page:
+        state = hass.states.get(entity_id)
+        values = {
+            "entity_id": entity_id,
+            "friendly_name": state.attributes.get(ATTR_FRIENDLY_NAME) if state else None,
+            "state": state.state if state else None,
+            "area": area,
+            "domain": domain,
+        }
+        rows.append([values[f] for f in fields])
+
+    next_offset = offset + len(page) if offset + len(page) < len(matches) else None
+    return json.dumps(
+        {"columns": fields, "rows": rows, "total": len(matches), "next_offset": next_offset}, **_COMPACT
+    )
+
+
+def _state_attributes(domain: str, attributes: dict[str, Any], requested: Any) -> dict[str, Any]:
+    if isinstance(requested, list) and requested:
+        return {k: attributes[k] for k in requested if k in attributes}
+    allowlist = STATE_ATTRIBUTE_ALLOWLIST.get(domain)
+    out: dict[str, Any] = {}
+    if ATTR_FRIENDLY_NAME in attributes:
+        out[ATTR_FRIENDLY_NAME] = attributes[ATTR_FRIENDLY_NAME]
+    if allowlist is not None:
+        out.update({k: attributes[k] for k in allowlist if k in attributes})
+    else:
+        out.update({k: v for k, v in attributes.items() if isinstance(v, (str, int, float, bool)) or v is None})
+    return out
+
+
 def _split_entities(value: str | None) -> list[str]:
     if not value:
         return []
@@ -89,6 +213,7 @@ async def exec_tool_call(
     *,
     allowed_domains: list[str],
     context: Context | None = None,
+    entity_index: EntityIndex | None = None,
 ) -> str:
     try:
         args = json.loads(arguments_json) if isinstance(arguments_json, str) else (arguments_json or {})
@@ -103,6 +228,18 @@ async def exec_tool_call(
         areas = [{"area_id": a.id, "name": a.name} for a in ar_reg.async_list_areas()]
         return json.dumps({"areas": areas}, ensure_ascii=False)
 
+    if tool_name == "list_entities" and entity_index is not None:
+        domain_filter = args.get("domain")
+        area_filter = args.get("area")
+        area_id_filter = entity_index.resolve_area(area_filter) if isinstance(area_filter, str) else None
+
+        matches = [
+            (entity_id, entity_id.split(".", 1)[0], entity_index.area_name(entity_index.entity_area(entity_id)))
+            for entity_id in entity_index.query(domain_filter, area_id_filter)
+            if hass.states.get(entity_id) is not None
+        ]
+        return _entity_page(hass, matches, args)
+
     if tool_name == "list_entities":
         domain_filter = args.get("domain")
         area_filter = args.get("area")
@@ -118,7 +255,7 @@ async def exec_tool_call(
                         area_id_filter = a.id
                         break
 
-        items = []
+        matches: list[tuple[str, str, str | None]] = []
         for ent in er_reg.entities.values():
             if ent.disabled_by:
                 continue
@@ -142,16 +279,8 @@ async def exec_tool_call(
                 area = ar_reg.async_get_area(ent_area_id)
                 area_name = area.name if area else None
 
-            items.append(
-                {
-                    "entity_id": ent.entity_id,
-                    "domain": ent.domain,
-                    "area": area_name,
-                    "friendly_name": state.attributes.get(ATTR_FRIENDLY_NAME),
-                    "state": state.state,
-                }
-            )
-        return json.dumps({"entities": items}, ensure_ascii=False)
+            matches.append((ent.entity_id, ent.domain, area_name))
+        return _entity_page(hass, matches, args)
 
     if tool_name == "get_state":
         entity_id = args.get("entity_id")
@@ -160,9 +289,8 @@ async def exec_tool_call(
         st = hass.states.get(entity_id)
         if st is None:
             return json.dumps({"error": f"Entidad no encontrada: {entity_id}"}, ensure_ascii=False)
-        return json.dumps(
-            {"entity_id": entity_id, "state": st.state, "attributes": st.attributes}, ensure_ascii=False
-        )
+        attributes = _state_attributes(st.domain, dict(st.attributes), args.get("attributes"))
+        return json.dumps({"entity_id": entity_id, "state": st.state, "attributes": attributes}, **_COMPACT)
 
     if tool_name == "call_service":
         domain = args.get("domain")
@@ -179,7 +307,9 @@ async def exec_tool_call(
         if not _is_domain_allowed(domain, allowed_domains):
             return json.dumps({"error": f"Dominio no permitido: {domain}"}, ensure_ascii=False)
 
-        if area_name and not area_id:
+        if area_name and not area_id and entity_index is not None:
+            area_id = entity_index.resolve_area(str(area_name))
+        elif area_name and not area_id:
             found = None
             for a in ar_reg.async_list_areas():
                 if a.name.lower() == str(area_name).lower():
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Callable
+from datetime import datetime, time as dt_time, timedelta
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util
+
+from .api import LemonadeClient
+from .const import DOMAIN
+from .scheduler import PRIORITY_MAINTENANCE, RequestScheduler, SchedulerBusyError
+
+_LOGGER = logging.getLogger(__name__)
+
+# La primera carga de un modelo grande puede tardar bastante más que CONF_TIMEOUT
+_WARMUP_TIMEOUT = 180
+
+
+def parse_time(value: str | None, default: str) -> dt_time:
+    """'HH:MM[:SS]' del selector de hora; el valor por defecto si está vacío o no es válido."""
+    return (dt_util.parse_time(value) if value else None) or dt_util.parse_time(default)
+
+
+class ModelWarmer:
+    """Precarga el modelo al arrancar y lo mantiene cargado durante las horas activas.
+
+    Lemonade carga los modelos bajo demanda y puede descargar los que quedan
+    ociosos, así que la primera orden tras un rato pagaría la carga entera.
+    Cada calentamiento es una petición de 1 token con el system prompt y las
+    tools reales, para que el servidor deje además ese prefijo en su caché de
+    prompt. Los pings se saltan si ha habido tráfico real reciente.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        client: LemonadeClient,
+        scheduler: RequestScheduler,
+        *,
+        model: str,
+        build_prefix: Callable[[], tuple[list[dict[str, Any]], list[dict[str, Any]] | None]],
+        interval: timedelta | None,
+        active_start: dt_time,
+        active_end: dt_time,
+    ) -> None:
+        self.hass = hass
+        self._client = client
+        self._scheduler = scheduler
+        self.model = model
+        self._build_prefix = build_prefix
+        self.interval = interval
+        self.active_start = active_start
+        self.active_end = active_end
+        self._last_activity = 0.0
+        self._running = False
+        self.warmups = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_warmup: datetime | None = None
+        self.last_results: dict[str, float | None] = {}
+
+    @callback
+    def async_setup(self, entry: ConfigEntry) -> CALLBACK_TYPE | None:
+        """Lanza el calentamiento inicial y, si hay intervalo, programa los pings."""
+        entry.async_create_background_task(
+            self.hass, self.async_warm("setup"), f"{DOMAIN}_warmup_{entry.entry_id}"
+        )
+        if not self.interval:
+            return None
+        return async_track_time_interval(self.hass, self._async_keep_alive, self.interval)
+
+    @callback
+    def touch(self) -> None:
+        """Anota que el modelo acaba de atender una petición real."""
+        self._last_activity = time.monotonic()
+
+    def is_active(self, now: datetime) -> bool:
+        current = now.time()
+        if self.active_start == self.active_end:
+            return True
+        if self.active_start < self.active_end:
+            return self.active_start <= current < self.active_end
+        # Franja que cruza la medianoche (p. ej. 18:00-02:00)
+        return current >= self.active_start or current < self.active_end
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return {
+            "interval_s": self.interval.total_seconds() if self.interval else None,
+            "active_hours": f"{self.active_start.isoformat('minutes')}-{self.active_end.isoformat('minutes')}",
+            "warmups": self.warmups,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "last_warmup": self.last_warmup.isoformat() if self.last_warmup else None,
+            "last_results_ms": self.last_results,
+        }
+
+    async def _async_keep_alive(self, now: datetime) -> None:
+        if not self.is_active(dt_util.as_local(now)):
+            return
+        if time.monotonic() - self._last_activity < self.interval.total_seconds():
+            # Una petición real ya mantuvo el modelo cargado en este intervalo
+            self.skipped += 1
+            return
+        await self.async_warm("keep-alive")
+
+    async def async_warm(self, reason: str) -> None:
+        if self._running or not self.model:
+            return
+        self._running = True
+        try:
+            messages, tools = self._build_prefix()
+            async with self._scheduler.slot(PRIORITY_MAINTENANCE):
+                results = await self._client.async_warm_up(self.model, messages, tools, _WARMUP_TIMEOUT)
+        except SchedulerBusyError:
+            # Hay tráfico real en cola: el modelo ya está cargado o lo estará enseguida
+            self.skipped += 1
+            return
+        except Exception as err:  # noqa: BLE001
+            self.failures += 1
+            _LOGGER.debug("Warm-up (%s) de %s falló: %s", reason, self.model, err)
+            return
+        finally:
+            self._running = False
+
+        self.last_warmup = dt_util.utcnow()
+        self.last_results = results
+        if not results or all(ms is None for ms in results.values()):
+            self.failures += 1
+            return
+        self.warmups += 1
+        self.touch()
+        _LOGGER.debug("Warm-up (%s) de %s: %s", reason, self.model, results)
@@ -0,0 +1,95 @@
+"""Entorno de tests: sin Home Assistant instalado se registran módulos mínimos.
+
+Los módulos de la integración que se prueban aquí (SSE, scheduler,
+historial, prompt, BM25, fast path, caché, circuit breaker) solo usan de HA
+tipos, constantes y el Store; con estos sustitutos se pueden importar y
+probar sin instalar homeassistant. Si HA está instalado se usa el real.
+"""
+from __future__ import annotations
+
+import sys
+import types
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def _module(name: str, *, package: bool = False, **attrs: Any) -> types.ModuleType:
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    if package:
+        module.__path__ = []
+    sys.modules[name] = module
+    return module
+
+
+class _HomeAssistantError(Exception):
+    pass
+
+
+class _Platform(str, Enum):
+    CONVERSATION = "conversation"
+    SENSOR = "sensor"
+
+
+class _Event:
+    def __init__(self, event_type: str, data: dict[str, Any] | None = None) -> None:
+        self.event_type = event_type
+        self.data = data or {}
+
+
+class _Store:
+    """Store en memoria con la misma API asíncrona que helpers.storage.Store."""
+
+    def __init__(self, hass: Any, version: int, key: str, *args: Any, **kwargs: Any) -> None:
+        self.key = key
+        self.data: Any = None
+        self.saves = 0
+
+    async def async_load(self) -> Any:
+        return self.data
+
+    async def async_save(self, data: Any) -> None:
+        self.data = data
+        self.saves += 1
+
+    def async_delay_save(self, data_func: Callable[[], Any], delay: float = 0) -> None:
+        self.data = data_func()
+
+
+def _not_available(*args: Any, **kwargs: Any) -> Any:
+    raise RuntimeError("No disponible en los tests sin Home Assistant")
+
+
+def _install_stubs() -> None:
+    _module("homeassistant", package=True)
+    _module(
+        "homeassistant.core",
+        HomeAssistant=type("HomeAssistant", (), {}),
+        Context=type("Context", (), {}),
+        Event=_Event,
+        CALLBACK_TYPE=Callable[[], None],
+        callback=lambda func: func,
+    )
+    _module("homeassistant.exceptions", HomeAssistantError=_HomeAssistantError)
+    _module("homeassistant.config_entries", ConfigEntry=type("ConfigEntry", (), {}))
+    _module(
+        "homeassistant.const",
+        Platform=_Platform,
+        ATTR_FRIENDLY_NAME="friendly_name",
+        EVENT_STATE_CHANGED="state_changed",
+    )
+    helpers = _module("homeassistant.helpers", package=True)
+    _module("homeassistant.helpers.event", async_call_later=_not_available, async_track_time_interval=_not_available)
+    _module("homeassistant.helpers.aiohttp_client", async_get_clientsession=_not_available)
+    _module("homeassistant.helpers.storage", Store=_Store)
+    for registry in ("area_registry", "device_registry", "entity_registry"):
+        setattr(helpers, registry, _module(f"homeassistant.helpers.{registry}", async_get=_not_available))
+
+
+try:
+    import homeassistant  # noqa: F401
+except ImportError:
+    _install_stubs()
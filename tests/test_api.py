@@ -0,0 +1,152 @@
+"""Cliente Lemonade: circuit breaker y ensamblado de tool_calls del stream."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from custom_components.lemonade_conversation import api  # noqa: E402
+from custom_components.lemonade_conversation.api import (  # noqa: E402
+    CircuitBreaker,
+    LemonadeClient,
+    LemonadeUnavailableError,
+    ToolCallAssembler,
+)
+
+
+class _FakeResponse:
+    def __init__(self, status: int) -> None:
+        self.status = status
+
+    def release(self) -> None:
+        pass
+
+
+class _FakeSession:
+    def __init__(self, handler) -> None:
+        self._handler = handler
+
+    async def request(self, method, url, **kwargs):
+        return await self._handler()
+
+
+def _client(handler) -> LemonadeClient:
+    client = LemonadeClient(None, "http://lemonade.invalid/api/v1")
+    client._session = lambda: _FakeSession(handler)
+    return client
+
+
+class _Clock:
+    """Sustituye al módulo `time` de api.py: reloj del breaker controlado por el test."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def _open_breaker(breaker: CircuitBreaker, monkeypatch) -> _Clock:
+    """Abre el circuito y adelanta el reloj hasta que admite la prueba half-open."""
+    clock = _Clock()
+    monkeypatch.setattr(api, "time", clock)
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    assert breaker.is_open
+    clock.now += breaker.reset_timeout + 1
+    return clock
+
+
+def test_probe_with_retryable_status_reopens_and_allows_next_probe(monkeypatch) -> None:
+    async def _reply():
+        return _FakeResponse(503)
+
+    client = _client(_reply)
+    breaker = client.backends[0].breaker
+    clock = _open_breaker(breaker, monkeypatch)
+    monkeypatch.setattr(api, "_MAX_RETRIES", 0)
+
+    with pytest.raises(LemonadeUnavailableError):
+        asyncio.run(client._async_open("post", "/chat/completions", {}, 5))
+
+    assert breaker.is_open
+    assert client.backends[0].outstanding == 0
+    # El 503 resolvió la prueba como fallo: pasado reset_timeout se admite otra
+    assert not breaker.allow()
+    clock.now += breaker.reset_timeout + 1
+    assert breaker.allow()
+
+
+def test_cancelled_probe_releases_half_open_slot(monkeypatch) -> None:
+    async def _hang():
+        await asyncio.sleep(3600)
+
+    client = _client(_hang)
+    breaker = client.backends[0].breaker
+    _open_breaker(breaker, monkeypatch)
+
+    async def _run() -> None:
+        task = asyncio.create_task(client._async_open("post", "/chat/completions", {}, 5))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(_run())
+
+    assert client.backends[0].outstanding == 0
+    assert breaker.is_open
+    assert breaker.allow()
+
+
+def test_unresolved_probe_expires() -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    # La prueba anterior nunca informó resultado: con reset_timeout=0 ya caducó
+    assert breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open
+
+
+def _frag(index=None, id=None, name=None, arguments=None) -> dict:
+    frag: dict = {"function": {}}
+    if index is not None:
+        frag["index"] = index
+    if id is not None:
+        frag["id"] = id
+    if name is not None:
+        frag["function"]["name"] = name
+    if arguments is not None:
+        frag["function"]["arguments"] = arguments
+    return frag
+
+
+def test_assembler_emits_call_once_arguments_are_complete_json() -> None:
+    assembler = ToolCallAssembler()
+    assert assembler.add([_frag(0, "c1", "get_state", '{"entity_')]) == []
+    done = assembler.add([_frag(0, arguments='id": "light.sala"}')])
+    assert [(c["id"], c["function"]["name"], c["function"]["arguments"]) for c in done] == [
+        ("c1", "get_state", '{"entity_id": "light.sala"}')
+    ]
+    # Fragmentos tardíos de una llamada ya entregada se ignoran
+    assert assembler.add([_frag(0, arguments=" ")]) == []
+    assert assembler.flush() == []
+
+
+def test_assembler_completes_previous_call_when_next_starts() -> None:
+    assembler = ToolCallAssembler()
+    assert assembler.add([_frag(0, "c1", "list_areas")]) == []
+    done = assembler.add([_frag(1, "c2", "get_state", '{"entity_id"')])
+    assert [(c["id"], c["function"]["arguments"]) for c in done] == [("c1", "{}")]
+    flushed = assembler.flush()
+    assert [(c["id"], c["function"]["arguments"]) for c in flushed] == [("c2", '{"entity_id"')]
+
+
+def test_assembler_without_index_uses_ids() -> None:
+    assembler = ToolCallAssembler()
+    assembler.add([_frag(id="a", name="get_state", arguments='{"entity_id": "light.a"')])
+    done = assembler.add([_frag(id="b", name="get_state", arguments='{"entity_id": "light.b"}')])
+    assert [c["id"] for c in done] == ["a", "b"]
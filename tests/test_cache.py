@@ -0,0 +1,66 @@
+"""ResponseCache: clave por texto/idioma/área e invalidación por estado y registros."""
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+from homeassistant.core import Event
+
+from custom_components.lemonade_conversation.cache import ResponseCache, entities_read
+
+
+def _cache(max_entries: int = 8) -> ResponseCache:
+    return ResponseCache(object(), SimpleNamespace(generation=0), max_entries=max_entries)
+
+
+def _state_changed(entity_id: str) -> Event:
+    return Event("state_changed", {"entity_id": entity_id})
+
+
+def test_key_normalizes_text_and_includes_area() -> None:
+    cache = _cache()
+    cache.put("¿Qué temperatura hace?", "es", "salon", "22 grados", {"sensor.salon"})
+    assert cache.get("que temperatura hace", "es", "salon") == "22 grados"
+    assert cache.get("que temperatura hace", "es", "cocina") is None
+    assert cache.get("que temperatura hace", "en", "salon") is None
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 2
+
+
+def test_state_change_invalidates_only_dependent_entries() -> None:
+    cache = _cache()
+    cache.put("temperatura salon", "es", None, "22", {"sensor.salon"})
+    cache.put("luces encendidas", "es", None, "ninguna", {"light.a", "light.b"})
+    cache._handle_state_changed(_state_changed("light.b"))
+    cache._handle_state_changed(_state_changed("sensor.otro"))
+    assert cache.get("luces encendidas", "es") is None
+    assert cache.get("temperatura salon", "es") == "22"
+    assert cache.invalidations == 1
+    assert "light.a" not in cache._by_entity
+
+
+def test_registry_change_invalidates_everything() -> None:
+    cache = _cache()
+    cache.put("lista de areas", "es", None, "salón, cocina", set())
+    cache.entity_index.generation += 1
+    assert cache.get("lista de areas", "es") is None
+    assert cache.stats["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = _cache(max_entries=2)
+    cache.put("a", "es", None, "A", {"sensor.a"})
+    cache.put("b", "es", None, "B", set())
+    cache.get("a", "es")
+    cache.put("c", "es", None, "C", set())
+    assert cache.get("b", "es") is None
+    assert cache.get("a", "es") == "A"
+    assert cache.get("c", "es") == "C"
+
+
+def test_entities_read_from_tool_results() -> None:
+    assert entities_read("get_state", {"entity_id": "light.a", "state": "on"}) == {"light.a"}
+    assert entities_read(
+        "list_entities", {"columns": ["entity_id", "state"], "rows": [["light.a", "on"], ["light.b", "off"]]}
+    ) == {"light.a", "light.b"}
+    assert entities_read("call_service", {"result": "ok"}) == set()
+    assert entities_read("get_state", {"error": "Entidad no encontrada"}) == set()
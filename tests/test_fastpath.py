@@ -0,0 +1,76 @@
+"""FastPathMatcher: órdenes simples reconocidas sin LLM y casos que van al LLM."""
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+from custom_components.lemonade_conversation.fastpath import FastPathMatch, FastPathMatcher, normalize
+
+_ENTITIES = {
+    "light.salon": ("Luz del salón", "salon"),
+    "light.lampara_salon": ("Lámpara de pie", "salon"),
+    "light.cocina": ("Luz cocina", "cocina"),
+    "switch.cafetera": ("Cafetera", "cocina"),
+    "fan.techo": ("Ventilador", "dormitorio"),
+    "light.duplicada": ("Cafetera", "cocina"),
+}
+_AREAS = {"salon": "Salón", "cocina": "Cocina", "dormitorio": "Dormitorio"}
+
+
+class _EntityIndex:
+    generation = 0
+
+    def query(self, domain: str | None = None, area_id: str | None = None) -> list[str]:
+        return [
+            eid
+            for eid, (_, area) in _ENTITIES.items()
+            if (domain is None or eid.startswith(f"{domain}.")) and (area_id is None or area == area_id)
+        ]
+
+    def area_names(self) -> dict[str, str]:
+        return dict(_AREAS)
+
+
+def _matcher(domains: tuple[str, ...] = ("light", "switch")) -> FastPathMatcher:
+    states = {
+        eid: SimpleNamespace(attributes={"friendly_name": name}) for eid, (name, _) in _ENTITIES.items()
+    }
+    hass = SimpleNamespace(states=SimpleNamespace(get=states.get))
+    return FastPathMatcher(hass, _EntityIndex(), list(domains))
+
+
+def test_normalize() -> None:
+    assert normalize("¡Enciende   la LUZ del Salón!") == "enciende la luz del salon"
+
+
+def test_action_by_friendly_name() -> None:
+    assert _matcher().match("Enciende la luz cocina, por favor") == FastPathMatch(
+        "call_service", {"domain": "light", "service": "turn_on", "entity_id": "light.cocina"}
+    )
+
+
+def test_action_by_noun_and_area() -> None:
+    assert _matcher().match("apaga las luces del salón") == FastPathMatch(
+        "call_service", {"domain": "light", "service": "turn_off", "area_id": "salon"}
+    )
+    assert _matcher().match("turn off kitchen lights") is None
+    assert _matcher().match("turn off dormitorio fan") is None
+    assert _matcher(("fan",)).match("turn off dormitorio fan") == FastPathMatch(
+        "call_service", {"domain": "fan", "service": "turn_off", "entity_id": "fan.techo"}
+    )
+
+
+def test_state_query() -> None:
+    assert _matcher().match("¿Está encendida la luz cocina?") == FastPathMatch(
+        "get_state", {"entity_id": "light.cocina"}
+    )
+    # Una consulta sobre varias entidades se deja al LLM
+    assert _matcher().match("¿están encendidas las luces del salón?") is None
+
+
+def test_unknown_ambiguous_or_disallowed_targets_fall_through() -> None:
+    matcher = _matcher()
+    assert matcher.match("enciende la tele") is None
+    # Mismo nombre en dos dominios
+    assert matcher.match("enciende la cafetera") is None
+    assert matcher.match("enciende el ventilador") is None
+    assert matcher.match("¿qué tiempo hace mañana?") is None
@@ -0,0 +1,62 @@
+"""ConversationStore: límites por conversación, LRU, memoria y TTL."""
+from __future__ import annotations
+
+from custom_components.lemonade_conversation import history
+from custom_components.lemonade_conversation.history import ConversationStore
+
+
+def _store(**overrides) -> ConversationStore:
+    options = {"max_messages": 4, "max_conversations": 3, "max_bytes": 0, "ttl": 0}
+    options.update(overrides)
+    return ConversationStore(**options)
+
+
+def _msg(text: str, role: str = "user") -> dict:
+    return {"role": role, "content": text}
+
+
+def test_append_returns_dropped_messages() -> None:
+    store = _store()
+    dropped = [store.append("c", _msg(str(i))) for i in range(6)]
+    assert dropped[:4] == [[], [], [], []]
+    assert dropped[4] == [_msg("0")]
+    assert [m["content"] for m in store.get_messages("c")] == ["2", "3", "4", "5"]
+
+
+def test_least_recently_used_conversation_is_evicted() -> None:
+    store = _store(max_conversations=2)
+    store.append("a", _msg("a"))
+    store.append("b", _msg("b"))
+    store.get_messages("a")
+    store.append("c", _msg("c"))
+    assert "a" in store and "c" in store
+    assert "b" not in store
+    assert store.evictions == 1
+
+
+def test_resident_bytes_are_tracked_and_capped() -> None:
+    store = _store(max_bytes=300)
+    store.append("a", _msg("x" * 100))
+    size_a = store.resident_bytes
+    assert store.set_summary("a", "resumen")
+    assert store.resident_bytes == size_a + len("resumen")
+    store.append("b", _msg("y" * 150))
+    assert "a" not in store
+    assert store.resident_bytes == sum(len(m["content"]) for m in store.get_messages("b")) + 64
+    # El resumen de una conversación expulsada no la resucita
+    assert not store.set_summary("a", "tarde")
+
+
+def test_conversations_expire_after_ttl(monkeypatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr(history.time, "monotonic", lambda: now[0])
+    store = _store(ttl=60)
+    store.append("a", _msg("hola"))
+    store.mark_initialized("a")
+    now[0] += 30
+    assert store.is_initialized("a")
+    now[0] += 61
+    assert "a" not in store
+    assert store.get_messages("a") == []
+    assert store.expirations == 1
+    assert store.resident_bytes == 0
@@ -0,0 +1,87 @@
+"""ICLStore: ranking BM25 sobre el índice invertido y recorte de ejemplos."""
+from __future__ import annotations
+
+import asyncio
+
+from custom_components.lemonade_conversation.icl import ICLStore, tokenize
+
+
+def _store(max_store: int = 10) -> ICLStore:
+    return ICLStore(object(), "test", max_store=max_store)
+
+
+async def _add(store: ICLStore, *pairs: tuple[str, str]) -> None:
+    for user, assistant in pairs:
+        await store.async_add_example(user_text=user, assistant_text=assistant)
+
+
+def test_tokenize_strips_accents_and_stopwords() -> None:
+    assert tokenize("Enciende la luz del salón") == ["enciende", "luz", "salon"]
+
+
+def test_examples_are_ranked_by_bm25() -> None:
+    async def scenario() -> list[str]:
+        store = _store()
+        await _add(
+            store,
+            ("enciende la luz del salón", "luz salón"),
+            ("qué temperatura hace en la cocina", "temperatura"),
+            ("apaga la luz de la cocina", "luz cocina"),
+            ("pon música en el salón", "música"),
+        )
+        examples = await store.async_get_examples("apaga la luz del salón", 3)
+        return [ex["assistant"] for ex in examples]
+
+    assert asyncio.run(scenario()) == ["luz cocina", "luz salón", "música"]
+
+
+def test_missing_matches_are_filled_with_most_recent() -> None:
+    async def scenario() -> list[str]:
+        store = _store()
+        await _add(store, ("abre la persiana", "persiana"), ("cierra la puerta", "puerta"), ("hola", "saludo"))
+        examples = await store.async_get_examples("persiana", 3)
+        return [ex["assistant"] for ex in examples]
+
+    assert asyncio.run(scenario()) == ["persiana", "saludo", "puerta"]
+
+
+def test_evicted_examples_leave_the_index() -> None:
+    async def scenario() -> None:
+        store = _store(max_store=2)
+        await _add(store, ("enciende la luz", "primero"), ("abre la persiana", "segundo"), ("cierra la puerta", "tercero"))
+        assert "luz" not in store._postings
+        assert store._search("luz", 5) == []
+        assert store._total_len == sum(store._doc_len.values())
+        assert not await store.async_has_similar("enciende la luz", 0.85)
+        assert await store.async_has_similar("Cierra la puerta", 0.85)
+
+    asyncio.run(scenario())
+
+
+def test_tool_calls_are_kept_with_the_example() -> None:
+    async def scenario() -> list[dict]:
+        store = _store()
+        await store.async_add_example(
+            user_text="enciende la luz de la cocina",
+            assistant_text="Listo, encendí la luz de la cocina.",
+            tool_calls=[
+                {
+                    "name": "call_service",
+                    "arguments": {"domain": "light", "service": "turn_on", "entity_id": "light.cocina"},
+                    "result": '{"result":"ok"}',
+                },
+                {"name": "list_entities", "arguments": "{}", "result": "x" * 1000},
+            ],
+        )
+        return await store.async_get_examples("luz cocina", 1)
+
+    [example] = asyncio.run(scenario())
+    assert example["tool_calls"] == [
+        {
+            "name": "call_service",
+            "arguments": '{"domain": "light", "service": "turn_on", "entity_id": "light.cocina"}',
+            "result": '{"result":"ok"}',
+        },
+        # Un resultado largo no se guarda
+        {"name": "list_entities", "arguments": "{}", "result": None},
+    ]
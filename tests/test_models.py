@@ -0,0 +1,59 @@
+"""ModelCatalog: capacidades sondeadas frente a las publicadas por /models."""
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+from custom_components.lemonade_conversation.models import ModelCatalog, tools_option
+
+
+def _listing(*models: dict) -> dict:
+    return {"data": list(models)}
+
+
+async def _refresh(catalog: ModelCatalog, data: dict) -> None:
+    async def fetch() -> dict:
+        return data
+
+    await catalog.async_get_models(fetch, force=True)
+
+
+def _catalog() -> ModelCatalog:
+    return ModelCatalog(SimpleNamespace(loop=asyncio.get_running_loop()), "http://lemonade")
+
+
+def test_probe_result_survives_refresh_over_labels() -> None:
+    async def scenario() -> None:
+        catalog = _catalog()
+        labelled = _listing({"id": "qwen", "labels": ["tool-calling"]}, {"id": "llama", "labels": ["reasoning"]})
+        await _refresh(catalog, labelled)
+        assert catalog.get("qwen").tool_calling is True
+        assert catalog.get("llama").tool_calling is False
+
+        catalog.record_probe("qwen", tool_calling=False, streaming=True)
+        catalog.record_probe("llama", tool_calling=True, streaming=None)
+        await _refresh(catalog, labelled)
+        assert catalog.get("qwen").tool_calling is False
+        assert catalog.get("qwen").streaming is True
+        assert catalog.get("llama").tool_calling is True
+        assert catalog.get("llama").probed
+
+    asyncio.run(scenario())
+
+
+def test_inconclusive_probe_keeps_labels() -> None:
+    async def scenario() -> None:
+        catalog = _catalog()
+        await _refresh(catalog, _listing({"id": "qwen"}))
+        catalog.record_probe("qwen", tool_calling=None, streaming=None)
+        await _refresh(catalog, _listing({"id": "qwen", "labels": ["tool-calling"]}))
+        assert catalog.get("qwen").tool_calling is True
+
+    asyncio.run(scenario())
+
+
+def test_tools_option_normalizes_legacy_values() -> None:
+    assert tools_option(True) == "on"
+    assert tools_option(False) == "off"
+    assert tools_option("auto") == "auto"
+    assert tools_option(None) == tools_option("desconocido")
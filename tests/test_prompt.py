@@ -0,0 +1,117 @@
+"""assemble_prompt: presupuesto de tokens, orden de ICL y recortes."""
+from __future__ import annotations
+
+from custom_components.lemonade_conversation.prompt import (
+    assemble_prompt,
+    estimate_message_tokens,
+    truncate_text,
+)
+
+_HEAD = [{"role": "system", "content": "Eres un asistente."}]
+_USER = {"role": "user", "content": "enciende la luz"}
+_EXAMPLES = [
+    {"user": "mejor", "assistant": "ejemplo 1"},
+    {"user": "peor", "assistant": "ejemplo 2"},
+]
+
+
+def _history(turns: int) -> list[dict]:
+    msgs = []
+    for i in range(turns):
+        msgs.append({"role": "user", "content": f"pregunta {i}"})
+        msgs.append({"role": "assistant", "content": f"respuesta {i}"})
+    return msgs
+
+
+def _contents(msgs: list[dict]) -> list[str]:
+    return [m["content"] for m in msgs]
+
+
+def test_without_budget_everything_is_kept_in_order() -> None:
+    history = _history(2)
+    msgs = assemble_prompt(
+        head=_HEAD, icl_examples=_EXAMPLES, history=history, user_message=_USER,
+        tools=None, budget=0, max_message_tokens=0,
+    )
+    # El mejor ejemplo queda más cerca de la pregunta
+    assert _contents(msgs) == [
+        "Eres un asistente.", "peor", "ejemplo 2", "mejor", "ejemplo 1",
+        *_contents(history), "enciende la luz",
+    ]
+
+
+def test_icl_after_history_keeps_a_stable_prefix() -> None:
+    history = _history(1)
+    msgs = assemble_prompt(
+        head=_HEAD, icl_examples=_EXAMPLES[:1], history=history, user_message=_USER,
+        tools=None, budget=0, max_message_tokens=0, icl_after_history=True,
+    )
+    assert msgs[: 1 + len(history)] == [*_HEAD, *history]
+    assert _contents(msgs[-3:]) == ["mejor", "ejemplo 1", "enciende la luz"]
+
+
+def test_budget_drops_oldest_history_then_examples() -> None:
+    history = _history(3)
+    fixed = sum(estimate_message_tokens(m) for m in [*_HEAD, _USER])
+    last_turn = sum(estimate_message_tokens(m) for m in history[-2:])
+    msgs = assemble_prompt(
+        head=_HEAD, icl_examples=_EXAMPLES, history=history, user_message=_USER,
+        tools=None, budget=fixed + last_turn + 1, max_message_tokens=0,
+    )
+    assert msgs == [*_HEAD, *history[-2:], _USER]
+
+
+def test_history_never_starts_with_orphan_reply() -> None:
+    history = _history(2)
+    fixed = sum(estimate_message_tokens(m) for m in [*_HEAD, _USER])
+    # Cabe la última respuesta y la anterior pregunta no
+    budget = fixed + estimate_message_tokens(history[-1]) + 1
+    msgs = assemble_prompt(
+        head=_HEAD, icl_examples=[], history=history, user_message=_USER,
+        tools=None, budget=budget, max_message_tokens=0,
+    )
+    assert msgs == [*_HEAD, _USER]
+
+
+def test_long_messages_are_truncated_but_tool_results_are_not() -> None:
+    long_text = "x" * 400
+    tool_result = '{"state": "' + "y" * 400 + '"}'
+    history = [
+        {"role": "user", "content": long_text},
+        {"role": "tool", "tool_call_id": "1", "content": tool_result},
+    ]
+    msgs = assemble_prompt(
+        head=_HEAD, icl_examples=[], history=history, user_message=_USER,
+        tools=None, budget=10_000, max_message_tokens=20,
+    )
+    assert msgs[1]["content"] == truncate_text(long_text, 20)
+    assert msgs[1]["content"].endswith("…[recortado]")
+    assert msgs[2]["content"] == tool_result
+
+
+_TOOL_EXAMPLE = {
+    "id": 7,
+    "user": "enciende la cocina",
+    "assistant": "Listo.",
+    "tool_calls": [{"name": "call_service", "arguments": '{"area_id": "cocina"}', "result": None}],
+}
+
+
+def test_tool_examples_render_the_call_and_its_result() -> None:
+    msgs = assemble_prompt(
+        head=_HEAD, icl_examples=[_TOOL_EXAMPLE], history=[], user_message=_USER,
+        tools=[{"type": "function", "function": {"name": "call_service"}}], budget=10_000, max_message_tokens=0,
+    )
+    assert [m["role"] for m in msgs] == ["system", "user", "assistant", "tool", "assistant", "user"]
+    call = msgs[2]["tool_calls"][0]
+    assert call["function"] == {"name": "call_service", "arguments": '{"area_id": "cocina"}'}
+    assert msgs[3]["tool_call_id"] == call["id"]
+    assert msgs[3]["content"] == '{"result":"ok"}'
+
+
+def test_tool_examples_are_skipped_without_tools() -> None:
+    msgs = assemble_prompt(
+        head=_HEAD, icl_examples=[_TOOL_EXAMPLE, *_EXAMPLES[:1]], history=[], user_message=_USER,
+        tools=None, budget=0, max_message_tokens=0,
+    )
+    assert _contents(msgs) == ["Eres un asistente.", "mejor", "ejemplo 1", "enciende la luz"]
@@ -0,0 +1,126 @@
+"""RequestScheduler: concurrencia, prioridad, desplazamiento y espera máxima."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from custom_components.lemonade_conversation import scheduler as scheduler_module
+from custom_components.lemonade_conversation.scheduler import (
+    PRIORITY_AUTOMATION,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_MAINTENANCE,
+    RequestScheduler,
+    SchedulerBusyError,
+)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_queued_requests_are_admitted_by_priority() -> None:
+    async def scenario() -> list[str]:
+        scheduler = RequestScheduler(max_concurrency=1, max_queue=8, max_wait=5)
+        order: list[str] = []
+        await scheduler.async_acquire(PRIORITY_AUTOMATION)
+
+        async def turn(name: str, priority: int) -> None:
+            async with scheduler.slot(priority):
+                order.append(name)
+
+        tasks = [
+            asyncio.create_task(turn("automatizacion", PRIORITY_AUTOMATION)),
+            asyncio.create_task(turn("voz", PRIORITY_INTERACTIVE)),
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth == 2
+        scheduler.release(PRIORITY_AUTOMATION)
+        await asyncio.gather(*tasks)
+        assert scheduler.stats["active"] == 0
+        return order
+
+    assert _run(scenario()) == ["voz", "automatizacion"]
+
+
+def test_full_queue_sheds_lowest_priority() -> None:
+    async def scenario() -> None:
+        scheduler = RequestScheduler(max_concurrency=1, max_queue=1, max_wait=5)
+        await scheduler.async_acquire(PRIORITY_INTERACTIVE)
+        low = asyncio.create_task(scheduler.async_acquire(PRIORITY_AUTOMATION))
+        await asyncio.sleep(0)
+        high = asyncio.create_task(scheduler.async_acquire(PRIORITY_INTERACTIVE))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerBusyError):
+            await low
+        # Una petición de igual o menor prioridad con la cola llena se rechaza
+        with pytest.raises(SchedulerBusyError):
+            await scheduler.async_acquire(PRIORITY_AUTOMATION)
+        scheduler.release(PRIORITY_INTERACTIVE)
+        await high
+        assert scheduler.shed == 2
+
+    _run(scenario())
+
+
+def test_wait_timeout() -> None:
+    async def scenario() -> None:
+        scheduler = RequestScheduler(max_concurrency=1, max_queue=4, max_wait=0.01)
+        await scheduler.async_acquire(PRIORITY_INTERACTIVE)
+        with pytest.raises(SchedulerBusyError):
+            await scheduler.async_acquire(PRIORITY_AUTOMATION)
+        assert scheduler.timeouts == 1
+        assert scheduler.queue_depth == 0
+
+    _run(scenario())
+
+
+def test_maintenance_leaves_a_slot_for_interactive_requests() -> None:
+    async def scenario() -> None:
+        scheduler = RequestScheduler(max_concurrency=2, max_queue=4, max_wait=5)
+        await scheduler.async_acquire(PRIORITY_MAINTENANCE)
+        second = asyncio.create_task(scheduler.async_acquire(PRIORITY_MAINTENANCE))
+        await asyncio.sleep(0)
+        assert not second.done()
+        # El hueco libre es para el tráfico real, aunque haya mantenimiento esperando
+        await asyncio.wait_for(scheduler.async_acquire(PRIORITY_INTERACTIVE), 0.1)
+        scheduler.release(PRIORITY_INTERACTIVE)
+        await asyncio.sleep(0)
+        assert not second.done()
+        scheduler.release(PRIORITY_MAINTENANCE)
+        await second
+        assert scheduler.stats["maintenance_active"] == 1
+
+    _run(scenario())
+
+
+def test_single_slot_maintenance_yields_to_queued_traffic(monkeypatch) -> None:
+    monkeypatch.setattr(scheduler_module, "MAINTENANCE_GRACE", 0.01)
+
+    async def scenario() -> None:
+        scheduler = RequestScheduler(max_concurrency=1, max_queue=4, max_wait=1)
+        started = asyncio.Event()
+
+        async def maintenance() -> None:
+            async with scheduler.slot(PRIORITY_MAINTENANCE):
+                started.set()
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(maintenance())
+        await started.wait()
+        await asyncio.wait_for(scheduler.async_acquire(PRIORITY_INTERACTIVE), 0.5)
+        with pytest.raises(TimeoutError):
+            await task
+        # Con tráfico real en cola no entra mantenimiento nuevo
+        queued = asyncio.create_task(scheduler.async_acquire(PRIORITY_AUTOMATION))
+        await asyncio.sleep(0)
+        late = asyncio.create_task(scheduler.async_acquire(PRIORITY_MAINTENANCE))
+        scheduler.release(PRIORITY_INTERACTIVE)
+        await queued
+        assert not late.done()
+        scheduler.release(PRIORITY_AUTOMATION)
+        await late
+        scheduler.release(PRIORITY_MAINTENANCE)
+        assert scheduler.stats["active"] == 0
+
+    _run(scenario())
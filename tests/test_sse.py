@@ -0,0 +1,44 @@
+"""SSEDecoder: eventos partidos entre trozos, terminadores y data multilínea."""
+from __future__ import annotations
+
+from custom_components.lemonade_conversation.sse import SSEDecoder
+
+
+def _feed_all(chunks: list[bytes]) -> list[str]:
+    decoder = SSEDecoder()
+    events: list[str] = []
+    for chunk in chunks:
+        events.extend(decoder.feed(chunk))
+    events.extend(decoder.flush())
+    return events
+
+
+def test_events_split_at_every_byte() -> None:
+    stream = 'data: {"a": 1}\n\ndata: {"b": "ñ"}\n\ndata: [DONE]\n\n'.encode()
+    assert _feed_all([stream[i : i + 1] for i in range(len(stream))]) == ['{"a": 1}', '{"b": "ñ"}', "[DONE]"]
+
+
+def test_line_terminators() -> None:
+    for sep in (b"\n", b"\r\n", b"\r"):
+        stream = b"data: uno" + sep + sep + b"data: dos" + sep + sep
+        assert _feed_all([stream]) == ["uno", "dos"], sep
+
+
+def test_crlf_split_between_chunks() -> None:
+    decoder = SSEDecoder()
+    assert decoder.feed(b"data: uno\r") == []
+    # El \n que sigue completa el CRLF anterior: no es una línea en blanco extra
+    assert decoder.feed(b"\ndata: dos\r\n") == []
+    assert decoder.feed(b"\r\n") == ["uno\ndos"]
+
+
+def test_multiline_data_and_comments() -> None:
+    stream = b": keep-alive\nevent: message\ndata: linea 1\ndata:linea 2\ndata\nid: 7\n\n"
+    assert _feed_all([stream]) == ["linea 1\nlinea 2\n"]
+
+
+def test_flush_dispatches_unterminated_event() -> None:
+    decoder = SSEDecoder()
+    assert decoder.feed(b"data: final") == []
+    assert decoder.flush() == ["final"]
+    assert decoder.flush() == []
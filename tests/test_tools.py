@@ -0,0 +1,21 @@
+"""ToolResult: el resultado de una tool se clasifica por su contenido, no por su texto."""
+from __future__ import annotations
+
+from custom_components.lemonade_conversation.tools import ToolResult
+
+
+def test_result_is_parsed_once() -> None:
+    res = ToolResult.from_content('{"entity_id": "light.a", "state": "on"}')
+    assert res.ok
+    assert res.data == {"entity_id": "light.a", "state": "on"}
+
+
+def test_error_detected_regardless_of_key_order_or_spacing() -> None:
+    assert not ToolResult.from_content('{ "detail": 1, "error": "Dominio no permitido" }').ok
+    assert not ToolResult.from_content("no es json").ok
+
+
+def test_error_result_round_trips() -> None:
+    res = ToolResult.error("call_service sigue en curso (tiempo agotado)")
+    assert not res.ok
+    assert ToolResult.from_content(res.content) == res